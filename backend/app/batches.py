@@ -0,0 +1,84 @@
+import csv
+import io
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models import ScrapeBatch, ScrapeTask
+from app.scraper.urls import normalize_url
+
+# CSV header names of the column holding the seeds; otherwise the first column is used.
+SEED_COLUMNS = ("url", "urls", "website", "domain", "site", "homepage")
+FINISHED_STATUSES = ("completed", "failed")
+
+def parse_seeds(seeds: Iterable[str]) -> Tuple[List[str], List[str], int]:
+    """Clean a seed list: returns ``(urls, rejected, duplicates)``.
+
+    Bare domains get ``https://``; blank lines and ``#`` comments are skipped.
+    """
+    urls, rejected, seen = [], [], set()
+    duplicates = 0
+    for seed in seeds:
+        seed = (seed or "").strip()
+        if not seed or seed.startswith("#"):
+            continue
+        url = seed if "://" in seed else f"https://{seed}"
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname or " " in url:
+            rejected.append(seed)
+            continue
+        key = normalize_url(url)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        urls.append(url)
+    return urls, rejected, duplicates
+
+def read_seed_csv(text: str) -> List[str]:
+    """The seed column of an uploaded CSV (or plain list of URLs, one per line)."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().casefold() for cell in rows[0]]
+    column = next((header.index(name) for name in SEED_COLUMNS if name in header), None)
+    if column is None:
+        return [row[0] for row in rows]
+    return [row[column] if column < len(row) else "" for row in rows[1:]]
+
+def batch_progress(batch_id: int, session_factory=SessionLocal) -> Optional[Dict]:
+    """Task counts by status and records found so far, from one grouped query over the batch's tasks."""
+    tasks = ScrapeTask.__table__
+    db = session_factory()
+    try:
+        batch = db.get(ScrapeBatch, batch_id)
+        if batch is None:
+            return None
+        rows = db.execute(
+            select(tasks.c.status, func.count(), func.coalesce(func.sum(tasks.c.record_count), 0))
+            .where(tasks.c.batch_id == batch_id)
+            .group_by(tasks.c.status)
+        ).all()
+    finally:
+        db.close()
+    by_status = {status: count for status, count, _ in rows}
+    finished = sum(by_status.get(status, 0) for status in FINISHED_STATUSES)
+    total = batch.task_count or sum(by_status.values())
+    if finished == total:
+        status = "completed"
+    elif set(by_status) == {"queued"}:
+        status = "queued"
+    else:
+        status = "running"
+    return {
+        "batch_id": batch_id,
+        "status": status,
+        "created_at": batch.created_at,
+        "total": total,
+        "by_status": by_status,
+        "finished": finished,
+        "progress": finished / total if total else 1.0,
+        "records": sum(records for _, _, records in rows),
+    }
@@ -0,0 +1,109 @@
+import os
+
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "10"))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST_LIMIT", "4"))
+SCRAPER_REQUEST_TIMEOUT = float(os.getenv("SCRAPER_REQUEST_TIMEOUT", "10"))
+SCRAPER_POOL_MAX_CONNECTIONS = int(os.getenv("SCRAPER_POOL_MAX_CONNECTIONS", "100"))
+SCRAPER_POOL_MAX_KEEPALIVE = int(os.getenv("SCRAPER_POOL_MAX_KEEPALIVE", "20"))
+SCRAPER_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SCRAPER_POOL_KEEPALIVE_EXPIRY", "30"))
+SCRAPER_USER_AGENT = os.getenv(
+    "SCRAPER_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+)
+SCRAPER_BROWSER_POOL_SIZE = int(os.getenv("SCRAPER_BROWSER_POOL_SIZE", "2"))
+SCRAPER_BROWSER_MAX_PAGES = int(os.getenv("SCRAPER_BROWSER_MAX_PAGES", "50"))
+SCRAPER_RENDER_TIMEOUT = float(os.getenv("SCRAPER_RENDER_TIMEOUT", "15"))
+# One of "dom", "network_idle" or "selector".
+SCRAPER_RENDER_WAIT = os.getenv("SCRAPER_RENDER_WAIT", "dom")
+SCRAPER_RENDER_SCORE_THRESHOLD = int(os.getenv("SCRAPER_RENDER_SCORE_THRESHOLD", "3"))
+SCRAPER_RENDER_LEARN_SAMPLES = int(os.getenv("SCRAPER_RENDER_LEARN_SAMPLES", "3"))
+# One of "html.parser", "lxml" (BeautifulSoup on lxml) or "lxml-html" (raw lxml.html tree).
+SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "html.parser")
+# 0 keeps extraction in the API process (threads); otherwise a process pool of this size.
+SCRAPER_EXTRACTION_WORKERS = int(os.getenv("SCRAPER_EXTRACTION_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+SCRAPER_EXTRACTION_QUEUE_SIZE = int(os.getenv("SCRAPER_EXTRACTION_QUEUE_SIZE", "0"))
+SCRAPER_DATABASE_URL = os.getenv("SCRAPER_DATABASE_URL", "sqlite:///./data/scraper.db")
+# Task queue workers (python -m app.worker).
+SCRAPER_WORKER_CONCURRENCY = int(os.getenv("SCRAPER_WORKER_CONCURRENCY", "2"))
+SCRAPER_QUEUE_POLL_INTERVAL = float(os.getenv("SCRAPER_QUEUE_POLL_INTERVAL", "1"))
+SCRAPER_HEARTBEAT_INTERVAL = float(os.getenv("SCRAPER_HEARTBEAT_INTERVAL", "10"))
+# A running task whose heartbeat is older than this is handed to another worker.
+SCRAPER_STALL_TIMEOUT = float(os.getenv("SCRAPER_STALL_TIMEOUT", "60"))
+SCRAPER_TASK_MAX_ATTEMPTS = int(os.getenv("SCRAPER_TASK_MAX_ATTEMPTS", "3"))
+# "off" keeps any 10-15 digit number; "possible"/"valid" check it with phonenumbers and emit E.164.
+SCRAPER_PHONE_VALIDATION = os.getenv("SCRAPER_PHONE_VALIDATION", "off")
+SCRAPER_PHONE_REGION = os.getenv("SCRAPER_PHONE_REGION", "US")
+# Extracted records are written to scrape_records in batches of this size.
+SCRAPER_RESULT_BATCH_SIZE = int(os.getenv("SCRAPER_RESULT_BATCH_SIZE", "50"))
+# SQLite connection settings (ignored for other databases).
+SCRAPER_DB_JOURNAL_MODE = os.getenv("SCRAPER_DB_JOURNAL_MODE", "WAL")
+SCRAPER_DB_SYNCHRONOUS = os.getenv("SCRAPER_DB_SYNCHRONOUS", "NORMAL")
+SCRAPER_DB_BUSY_TIMEOUT = int(os.getenv("SCRAPER_DB_BUSY_TIMEOUT", "30000"))
+SCRAPER_DB_POOL_SIZE = int(os.getenv("SCRAPER_DB_POOL_SIZE", "10"))
+SCRAPER_DB_MAX_OVERFLOW = int(os.getenv("SCRAPER_DB_MAX_OVERFLOW", "20"))
+# How often the API checks the database for new task progress events.
+SCRAPER_EVENT_POLL_INTERVAL = float(os.getenv("SCRAPER_EVENT_POLL_INTERVAL", "0.2"))
+SCRAPER_EVENT_KEEPALIVE = float(os.getenv("SCRAPER_EVENT_KEEPALIVE", "15"))
+# Progress events of a crawl are written together, at most this many seconds or events apart.
+SCRAPER_EVENT_FLUSH_INTERVAL = float(os.getenv("SCRAPER_EVENT_FLUSH_INTERVAL", "1"))
+SCRAPER_EVENT_FLUSH_EVENTS = int(os.getenv("SCRAPER_EVENT_FLUSH_EVENTS", "50"))
+# Seconds a finished task's events are kept after its last one (0 keeps them forever).
+SCRAPER_EVENT_RETENTION = float(os.getenv("SCRAPER_EVENT_RETENTION", "86400"))
+# Disk cache of fetched pages shared across tasks; an empty directory disables it.
+SCRAPER_HTTP_CACHE_DIR = os.getenv("SCRAPER_HTTP_CACHE_DIR", "./data/http_cache")
+# Seconds a cached page is used without asking the server; after that it is revalidated.
+SCRAPER_HTTP_CACHE_TTL = float(os.getenv("SCRAPER_HTTP_CACHE_TTL", "3600"))
+# Longest a cached page is used without asking the server while its sitemap lastmod says it is unchanged.
+SCRAPER_HTTP_CACHE_LASTMOD_MAX_AGE = float(os.getenv("SCRAPER_HTTP_CACHE_LASTMOD_MAX_AGE", str(7 * 86400)))
+SCRAPER_HTTP_CACHE_MAX_BYTES = int(os.getenv("SCRAPER_HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Politeness: requests per second and burst per host (rate 0 disables the limit).
+SCRAPER_HOST_RATE = float(os.getenv("SCRAPER_HOST_RATE", "5"))
+SCRAPER_HOST_BURST = int(os.getenv("SCRAPER_HOST_BURST", "5"))
+SCRAPER_RESPECT_ROBOTS = os.getenv("SCRAPER_RESPECT_ROBOTS", "1").lower() not in ("0", "false", "no")
+SCRAPER_ROBOTS_TTL = float(os.getenv("SCRAPER_ROBOTS_TTL", "3600"))
+# Back-off after a 429/503 without Retry-After; doubles while the host keeps throttling.
+SCRAPER_THROTTLE_BACKOFF = float(os.getenv("SCRAPER_THROTTLE_BACKOFF", "2"))
+SCRAPER_THROTTLE_MAX_DELAY = float(os.getenv("SCRAPER_THROTTLE_MAX_DELAY", "120"))
+SCRAPER_THROTTLE_RETRIES = int(os.getenv("SCRAPER_THROTTLE_RETRIES", "3"))
+# Crawl frontier budgets: link depth from the start page, pages per task and pages per domain (0: no limit).
+SCRAPER_CRAWL_MAX_DEPTH = int(os.getenv("SCRAPER_CRAWL_MAX_DEPTH", "2"))
+SCRAPER_CRAWL_MAX_PAGES = int(os.getenv("SCRAPER_CRAWL_MAX_PAGES", "100"))
+SCRAPER_CRAWL_MAX_PAGES_PER_DOMAIN = int(os.getenv("SCRAPER_CRAWL_MAX_PAGES_PER_DOMAIN", "0"))
+# Largest max_pages a scrape request may ask for.
+SCRAPER_CRAWL_MAX_PAGES_LIMIT = int(os.getenv("SCRAPER_CRAWL_MAX_PAGES_LIMIT", "10000"))
+# Follow links to other sites; by default a crawl stays on the start URL's site and its subdomains.
+SCRAPER_CRAWL_ALLOW_EXTERNAL = os.getenv("SCRAPER_CRAWL_ALLOW_EXTERNAL", "0").lower() in ("1", "true", "yes")
+# The seen-URL set switches to a Bloom filter past this many URLs.
+SCRAPER_FRONTIER_BLOOM_THRESHOLD = int(os.getenv("SCRAPER_FRONTIER_BLOOM_THRESHOLD", "100000"))
+SCRAPER_FRONTIER_BLOOM_CAPACITY = int(os.getenv("SCRAPER_FRONTIER_BLOOM_CAPACITY", "2000000"))
+SCRAPER_FRONTIER_BLOOM_ERROR = float(os.getenv("SCRAPER_FRONTIER_BLOOM_ERROR", "0.001"))
+# Sitemaps listed in robots.txt (or /sitemap.xml) seed the frontier before any page is parsed.
+SCRAPER_SITEMAPS = os.getenv("SCRAPER_SITEMAPS", "1").lower() not in ("0", "false", "no")
+SCRAPER_SITEMAP_MAX_URLS = int(os.getenv("SCRAPER_SITEMAP_MAX_URLS", "50000"))
+SCRAPER_SITEMAP_MAX_FILES = int(os.getenv("SCRAPER_SITEMAP_MAX_FILES", "20"))
+# Uncompressed size limit per sitemap file (the sitemap protocol allows 50 MB).
+SCRAPER_SITEMAP_MAX_BYTES = int(os.getenv("SCRAPER_SITEMAP_MAX_BYTES", str(50 * 1024 * 1024)))
+# Pagination: pages followed per listing (including the first) and numbered pages fetched at once.
+SCRAPER_PAGINATION_MAX_PAGES = int(os.getenv("SCRAPER_PAGINATION_MAX_PAGES", "50"))
+SCRAPER_PAGINATION_CONCURRENCY = int(os.getenv("SCRAPER_PAGINATION_CONCURRENCY", "4"))
+# Merge the page records of each site and company into one record with unioned contacts.
+# Off by default: merged records are held in memory until the crawl ends.
+SCRAPER_MERGE_RECORDS = os.getenv("SCRAPER_MERGE_RECORDS", "0").lower() in ("1", "true", "yes")
+# PDF reports are rendered by workers after the task completes, in parts of this many records.
+SCRAPER_REPORTS_DIR = os.getenv("SCRAPER_REPORTS_DIR", "reports")
+SCRAPER_REPORT_RECORDS_PER_PART = int(os.getenv("SCRAPER_REPORT_RECORDS_PER_PART", "2000"))
+# Records included in a report (0: all); a task with more gets a report of the first ones.
+SCRAPER_REPORT_MAX_RECORDS = int(os.getenv("SCRAPER_REPORT_MAX_RECORDS", "0"))
+SCRAPER_REPORT_CHUNK_SIZE = int(os.getenv("SCRAPER_REPORT_CHUNK_SIZE", "500"))
+# A report claimed longer ago than this (its worker died) is generated again.
+SCRAPER_REPORT_TIMEOUT = float(os.getenv("SCRAPER_REPORT_TIMEOUT", "900"))
+# Report retention: oldest reports are deleted past this total size or age (0: no limit).
+SCRAPER_REPORTS_MAX_BYTES = int(os.getenv("SCRAPER_REPORTS_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+SCRAPER_REPORTS_MAX_AGE_DAYS = float(os.getenv("SCRAPER_REPORTS_MAX_AGE_DAYS", "30"))
+# Incremental re-scrapes reuse the records of pages unchanged since the site's previous incremental task.
+SCRAPER_INCREMENTAL = os.getenv("SCRAPER_INCREMENTAL", "0").lower() not in ("0", "false", "no")
+# Scheduling shared by all workers: running tasks overall (0: no limit) and per site.
+SCRAPER_MAX_RUNNING_TASKS = int(os.getenv("SCRAPER_MAX_RUNNING_TASKS", "0"))
+SCRAPER_TASKS_PER_HOST = int(os.getenv("SCRAPER_TASKS_PER_HOST", "1"))
+# Most seed URLs one batch request may submit.
+SCRAPER_BATCH_MAX_URLS = int(os.getenv("SCRAPER_BATCH_MAX_URLS", "50000"))
@@ -0,0 +1,55 @@
+import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_db_engine, init_db
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: benchmark-sized test, only run with SCRAPER_BENCHMARKS=1")
+
+def pytest_collection_modifyitems(config, items):
+    # Running a test module directly (python -m app.test_x) still runs its benchmarks.
+    if os.environ.get("SCRAPER_BENCHMARKS") == "1":
+        return
+    skip = pytest.mark.skip(reason="benchmark; set SCRAPER_BENCHMARKS=1 to run it")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+# Shared test helpers. They are plain functions rather than pytest fixtures so the
+# test modules' __main__ blocks can keep calling their tests directly.
+
+def make_session_factory(db_path, **engine_kwargs):
+    """A session factory for a migrated SQLite database at db_path."""
+    engine = create_db_engine(f"sqlite:///{db_path}", **engine_kwargs)
+    init_db(engine)
+    return sessionmaker(bind=engine)
+
+class LocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def start_local_server(handler):
+    """Serves handler on a free local port in a daemon thread; returns (server, base_url)."""
+    server = LocalServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+@contextmanager
+def scraper_events_to(session_factory):
+    """Sends the scraper engine's progress events to a test database instead of the default one."""
+    import app.scraper.engine as scraper_engine
+    from app.events import publish, publish_events
+
+    scraper_engine.publish = partial(publish, session_factory=session_factory)
+    scraper_engine.publish_events = partial(publish_events, session_factory=session_factory)
+    try:
+        yield
+    finally:
+        scraper_engine.publish = publish
+        scraper_engine.publish_events = publish_events
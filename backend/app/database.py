@@ -1,8 +1,103 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, delete, event, insert, inspect, select, text, update
+from sqlalchemy.orm import declarative_base, sessionmaker
+from app.config import (
+    SCRAPER_DATABASE_URL,
+    SCRAPER_DB_BUSY_TIMEOUT,
+    SCRAPER_DB_JOURNAL_MODE,
+    SCRAPER_DB_MAX_OVERFLOW,
+    SCRAPER_DB_POOL_SIZE,
+    SCRAPER_DB_SYNCHRONOUS,
+)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/scraper.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SQLALCHEMY_DATABASE_URL = SCRAPER_DATABASE_URL
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, journal_mode: str = SCRAPER_DB_JOURNAL_MODE,
+                     synchronous: str = SCRAPER_DB_SYNCHRONOUS, busy_timeout: int = SCRAPER_DB_BUSY_TIMEOUT):
+    pool = {"pool_size": SCRAPER_DB_POOL_SIZE, "max_overflow": SCRAPER_DB_MAX_OVERFLOW}
+    if not url.startswith("sqlite"):
+        return create_engine(url, **pool)
+    if ":memory:" in url or url == "sqlite://":
+        # In-memory databases live in a single connection; keep SQLAlchemy's default pool.
+        pool = {}
+
+    engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": busy_timeout / 1000}, **pool)
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # WAL lets API readers run while workers write; NORMAL only syncs at checkpoints.
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.close()
+
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+def get_db():
+    """FastAPI dependency: one session per request, closed afterwards."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def init_db(bind=engine):
+    """Create missing tables and bring an existing database up to the current schema."""
+    import app.models  # noqa: F401  registers the tables on Base
+
+    Base.metadata.create_all(bind=bind)
+    migrate_db(bind)
+
+def migrate_db(bind=engine):
+    """Upgrade a database created by an earlier version in place.
+
+    There is no migration history: every step compares the database with the
+    models and only does what is missing, so it is safe to run on each start.
+
+    1. Add columns the models gained since the table was created. They are
+       added without constraints, so new columns must be nullable.
+    2. Create indexes the models gained since the table was created.
+    3. Move records kept as one ``scrape_results`` blob per task into
+       ``scrape_records``.
+    """
+    _add_missing_columns(bind)
+    _create_missing_indexes(bind)
+    _migrate_result_blobs(bind)
+
+def _add_missing_columns(bind):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def _create_missing_indexes(bind):
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def _migrate_result_blobs(bind):
+    """Move records kept as one ``scrape_results`` blob per task into ``scrape_records``, once."""
+    tables = Base.metadata.tables
+    blobs, records, tasks = tables["scrape_results"], tables["scrape_records"], tables["scrape_tasks"]
+    with bind.connect() as conn:
+        blob_ids = conn.execute(select(blobs.c.id).order_by(blobs.c.id)).scalars().all()
+    for blob_id in blob_ids:
+        with bind.begin() as conn:
+            task_id, data = conn.execute(select(blobs.c.task_id, blobs.c.data).where(blobs.c.id == blob_id)).one()
+            has_records = conn.execute(select(records.c.id).where(records.c.task_id == task_id).limit(1)).first()
+            if data and not has_records:
+                conn.execute(insert(records), [
+                    {"task_id": task_id, "page_number": record.get("page_number"), "url": record.get("url"), "data": record}
+                    for record in data
+                ])
+                conn.execute(update(tasks).where(tasks.c.id == task_id).values(record_count=len(data)))
+            conn.execute(delete(blobs).where(blobs.c.id == blob_id))
@@ -0,0 +1,70 @@
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+READ_CHUNK_SIZE = 64 * 1024
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The inclusive ``(start, end)`` byte range a Range header asks for.
+
+    None means serve the whole file (no header, or one this server does not
+    split, such as several ranges); ``(size, size)`` means it cannot be met.
+    """
+    match = RANGE_PATTERN.fullmatch((header or "").replace(" ", ""))
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # bytes=-500: the last 500 bytes.
+        length = int(last)
+        return (max(0, size - length), size - 1) if length else (size, size)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return (size, size)
+    return start, end
+
+def _read(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+def file_response(
+    request: Request, path: str, media_type: str, filename: str, etag: str, size: Optional[int] = None
+) -> Response:
+    """Serve ``path`` with ETag revalidation and single byte ranges for resumed downloads."""
+    if size is None:
+        size = os.path.getsize(path)
+    etag = f'"{etag}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f"attachment; filename={filename}",
+    }
+    if etag in (request.headers.get("if-none-match") or "").replace("W/", "").split(", "):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    # If-Range: only resume if the file is still the one the client started on.
+    if request.headers.get("if-range", etag) != etag:
+        byte_range = None
+    if byte_range == (size, size):
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        _read(path, start, end), status_code=206 if byte_range else 200, media_type=media_type, headers=headers
+    )
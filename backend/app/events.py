@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import delete, func, insert, select
+
+from app.config import (
+    SCRAPER_EVENT_FLUSH_EVENTS,
+    SCRAPER_EVENT_FLUSH_INTERVAL,
+    SCRAPER_EVENT_KEEPALIVE,
+    SCRAPER_EVENT_POLL_INTERVAL,
+)
+from app.database import SessionLocal
+from app.models import ScrapeTask, TaskEvent
+
+TERMINAL_STATUSES = {"completed", "failed"}
+# Progress events that only report a running count: a newer one replaces an unwritten one.
+COUNT_EVENTS = {"discovered", "records"}
+# Longest wait between event polls while the database keeps failing.
+POLL_MAX_BACKOFF = 30.0
+
+def publish(task_id: int, type: str, data: Optional[dict] = None, session_factory=SessionLocal) -> None:
+    """Record a progress event. Best effort: a failed publish never fails the task."""
+    db = session_factory()
+    try:
+        db.execute(insert(TaskEvent.__table__).values(task_id=task_id, type=type, data=data or {}))
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Could not publish {type} event for task {task_id}: {str(e)}")
+    finally:
+        db.close()
+
+def publish_events(task_id: int, events: List[Tuple[str, dict]], session_factory=SessionLocal) -> None:
+    """Record several ``(type, data)`` events of a task in one INSERT. Best effort, like ``publish``."""
+    if not events:
+        return
+    db = session_factory()
+    try:
+        db.execute(insert(TaskEvent.__table__), [{"task_id": task_id, "type": type, "data": data or {}} for type, data in events])
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Could not publish {len(events)} events for task {task_id}: {str(e)}")
+    finally:
+        db.close()
+
+class ProgressEvents:
+    """Collects the progress events of a crawl and writes them in batches.
+
+    ``add`` returns True once ``max_events`` are waiting or ``interval``
+    seconds have passed since the last write; the caller then calls
+    ``flush``. Of the running counts, only the latest is written.
+    """
+
+    def __init__(
+        self,
+        task_id: int,
+        interval: float = SCRAPER_EVENT_FLUSH_INTERVAL,
+        max_events: int = SCRAPER_EVENT_FLUSH_EVENTS,
+        write=publish_events,
+    ):
+        self.task_id = task_id
+        self.interval = interval
+        self.max_events = max(1, max_events)
+        self.write = write
+        self.pending: List[Tuple[str, dict]] = []
+        self._flushed_at = time.monotonic()
+
+    def add(self, type: str, data: dict) -> bool:
+        if type in COUNT_EVENTS:
+            self.pending = [event for event in self.pending if event[0] != type]
+        self.pending.append((type, data))
+        return len(self.pending) >= self.max_events or time.monotonic() - self._flushed_at >= self.interval
+
+    def flush(self) -> int:
+        events, self.pending = self.pending, []
+        self._flushed_at = time.monotonic()
+        self.write(self.task_id, events)
+        return len(events)
+
+def prune_events(retention: float, session_factory=SessionLocal) -> int:
+    """Delete the events of finished tasks whose last event is older than ``retention`` seconds."""
+    events = TaskEvent.__table__
+    tasks = ScrapeTask.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    finished = select(tasks.c.id).where(tasks.c.status.in_(TERMINAL_STATUSES))
+    quiet = select(events.c.task_id).group_by(events.c.task_id).having(func.max(events.c.created_at) < cutoff)
+    db = session_factory()
+    try:
+        deleted = db.execute(
+            delete(events).where(events.c.task_id.in_(finished), events.c.task_id.in_(quiet))
+        ).rowcount
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+def read_events(
+    task_ids: Optional[List[int]] = None, after_id: int = 0, limit: int = 1000, session_factory=SessionLocal
+) -> List[dict]:
+    table = TaskEvent.__table__
+    query = select(table.c.id, table.c.task_id, table.c.type, table.c.data).where(table.c.id > after_id)
+    if task_ids is not None:
+        query = query.where(table.c.task_id.in_(task_ids))
+    db = session_factory()
+    try:
+        return [dict(row) for row in db.execute(query.order_by(table.c.id).limit(limit)).mappings()]
+    finally:
+        db.close()
+
+def latest_event_id(session_factory=SessionLocal) -> int:
+    db = session_factory()
+    try:
+        return db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+    finally:
+        db.close()
+
+def is_terminal(event: dict) -> bool:
+    return event["type"] == "status" and event["data"].get("status") in TERMINAL_STATUSES
+
+def format_sse(event: dict) -> str:
+    lines = [f"event: {event['type']}", f"data: {json.dumps(event['data'])}"]
+    if event.get("id"):
+        lines.insert(0, f"id: {event['id']}")
+    return "\n".join(lines) + "\n\n"
+
+class EventHub:
+    """Fans task events out to subscribers in this process.
+
+    Workers write events to the database; one poller per API process reads
+    new events for every subscribed task at once and hands them to each
+    subscriber's queue, so the database load does not grow with the number
+    of connected clients.
+    """
+
+    def __init__(self, poll_interval: float = SCRAPER_EVENT_POLL_INTERVAL, session_factory=SessionLocal):
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self.polls = 0
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._last_id: Optional[int] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        backoff = self.poll_interval
+        try:
+            while self._subscribers:
+                try:
+                    events = await loop.run_in_executor(
+                        None, read_events, list(self._subscribers), self._last_id, 1000, self.session_factory
+                    )
+                    self.polls += 1
+                    for event in events:
+                        self._last_id = event["id"]
+                        for queue in self._subscribers.get(event["task_id"], ()):
+                            queue.put_nowait(event)
+                except Exception as e:
+                    # A locked or unreachable database must not end every open stream.
+                    logger.warning(f"Could not poll task events, retrying in {backoff:.1f}s: {str(e)}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, POLL_MAX_BACKOFF)
+                    continue
+                backoff = self.poll_interval
+                if len(events) < 1000:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self._poller = None
+            self._last_id = None
+
+    async def subscribe(
+        self, task_id: int, after_id: int = 0, keepalive: Optional[float] = None
+    ) -> AsyncIterator[Optional[dict]]:
+        """Yield the task's events after ``after_id``, then live ones; None when idle for ``keepalive``."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        if self._last_id is None:
+            self._last_id = await loop.run_in_executor(None, latest_event_id, self.session_factory)
+        self._subscribers[task_id].add(queue)
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll())
+        try:
+            delivered = after_id
+            # Events before the poller's position come from the backlog; the
+            # poller may deliver some of them again, so skip by id.
+            backlog = await loop.run_in_executor(None, read_events, [task_id], after_id, 100000, self.session_factory)
+            for event in backlog:
+                delivered = event["id"]
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= delivered:
+                    continue
+                delivered = event["id"]
+                yield event
+        finally:
+            self._subscribers[task_id].discard(queue)
+            if not self._subscribers[task_id]:
+                del self._subscribers[task_id]
+
+event_hub = EventHub()
+
+async def stream_task_events(
+    task_id: int, status: str, after_id: int = 0, hub: EventHub = event_hub, keepalive: float = SCRAPER_EVENT_KEEPALIVE
+) -> AsyncIterator[str]:
+    """Server-Sent Events for one task, ending after its final status."""
+    if status in TERMINAL_STATUSES:
+        loop = asyncio.get_running_loop()
+        backlog = await loop.run_in_executor(None, read_events, [task_id], after_id, 100000, hub.session_factory)
+        for event in backlog:
+            yield format_sse(event)
+        if not any(is_terminal(event) for event in backlog):
+            # Finished before events existed, or the client already saw them all.
+            yield format_sse({"type": "status", "data": {"status": status}})
+        return
+
+    async for event in hub.subscribe(task_id, after_id, keepalive):
+        if event is None:
+            yield ": keepalive\n\n"
+            continue
+        yield format_sse(event)
+        if is_terminal(event):
+            return
@@ -0,0 +1,134 @@
+import csv
+import io
+from importlib.util import find_spec
+from typing import Iterable, Iterator, List
+
+from app.database import SessionLocal
+from app.result_store import iter_batch_raw_records, iter_batch_records, iter_raw_records, iter_records
+
+# Parquet needs pyarrow, which is not a required dependency.
+PARQUET_AVAILABLE = find_spec("pyarrow") is not None
+
+EXPORT_COLUMNS = [
+    "url", "company", "emails", "phones", "contact_page", "tagline", "services",
+    "social_media", "address", "description", "industry", "page_number", "extracted_at", "source_urls",
+]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Records per yielded chunk; also the Parquet row group size.
+EXPORT_CHUNK_SIZE = 1000
+
+def flatten_record(record: dict) -> List:
+    contacts = record.get("contacts") or {}
+    social = record.get("social_media") or {}
+    return [
+        record.get("url"),
+        record.get("company"),
+        "; ".join(contacts.get("emails") or []),
+        "; ".join(contacts.get("phones") or []),
+        contacts.get("contact_page"),
+        record.get("tagline"),
+        "; ".join(record.get("services") or []),
+        "; ".join(f"{platform}={link}" for platform, link in social.items()),
+        record.get("address"),
+        record.get("description"),
+        record.get("industry"),
+        record.get("page_number"),
+        record.get("extracted_at"),
+        # Merged records list every page they were built from.
+        "; ".join(record.get("source_urls") or []),
+    ]
+
+def _chunks(records: Iterable[dict]) -> Iterator[List[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _write_ndjson(raw_records: Iterable[str]) -> Iterator[bytes]:
+    lines = []
+    for line in raw_records:
+        lines.append(line)
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+def _write_csv(records: Iterable[dict]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunks(records):
+        writer.writerows(flatten_record(record) for record in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller as they arrive."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _write_parquet(records: Iterable[dict]) -> Iterator[bytes]:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.int64() if column == "page_number" else pa.string()) for column in EXPORT_COLUMNS])
+    sink = _StreamSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _chunks(records):
+            frame = pd.DataFrame([flatten_record(record) for record in chunk], columns=EXPORT_COLUMNS)
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+def export_ndjson(task_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_ndjson(iter_raw_records(task_id, EXPORT_CHUNK_SIZE, session_factory))
+
+def export_csv(task_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_csv(iter_records(task_id, EXPORT_CHUNK_SIZE, session_factory))
+
+def export_parquet(task_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_parquet(iter_records(task_id, EXPORT_CHUNK_SIZE, session_factory))
+
+# The records of every task in a batch, as one file.
+def export_batch_ndjson(batch_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_ndjson(iter_batch_raw_records(batch_id, EXPORT_CHUNK_SIZE, session_factory))
+
+def export_batch_csv(batch_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_csv(iter_batch_records(batch_id, EXPORT_CHUNK_SIZE, session_factory))
+
+def export_batch_parquet(batch_id: int, session_factory=SessionLocal) -> Iterator[bytes]:
+    return _write_parquet(iter_batch_records(batch_id, EXPORT_CHUNK_SIZE, session_factory))
+
+EXPORTERS = {"ndjson": export_ndjson, "csv": export_csv, "parquet": export_parquet}
+BATCH_EXPORTERS = {"ndjson": export_batch_ndjson, "csv": export_batch_csv, "parquet": export_batch_parquet}
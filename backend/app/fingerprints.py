@@ -0,0 +1,113 @@
+import hashlib
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from app.config import SCRAPER_RESULT_BATCH_SIZE
+from app.database import SessionLocal
+from app.models import PageFingerprint, ScrapeTask
+from app.scraper.urls import normalize_url
+
+class PagePrint(NamedTuple):
+    """A page as an earlier task saw it: hashes, its next page link and its record."""
+    content_hash: str
+    fingerprint: str
+    next_url: Optional[str]
+    data: Optional[dict]
+
+def content_hash(html: str) -> str:
+    return hashlib.sha1(html.encode()).hexdigest()
+
+def previous_task_id(url: str, task_id: int, session_factory=SessionLocal) -> Optional[int]:
+    """The latest completed task for ``url`` that saved page fingerprints."""
+    tasks, prints = ScrapeTask.__table__, PageFingerprint.__table__
+    db = session_factory()
+    try:
+        return db.execute(
+            select(func.max(tasks.c.id)).where(
+                tasks.c.url == url,
+                tasks.c.id != task_id,
+                tasks.c.status == "completed",
+                select(prints.c.id).where(prints.c.task_id == tasks.c.id).exists(),
+            )
+        ).scalar()
+    finally:
+        db.close()
+
+def load_fingerprints(task_id: int, session_factory=SessionLocal) -> Dict[str, PagePrint]:
+    """The pages of ``task_id`` by normalized URL."""
+    table = PageFingerprint.__table__
+    db = session_factory()
+    try:
+        rows = db.execute(
+            select(table.c.url, table.c.content_hash, table.c.fingerprint, table.c.next_url, table.c.data)
+            .where(table.c.task_id == task_id)
+        ).all()
+    finally:
+        db.close()
+    return {normalize_url(row.url): PagePrint(row.content_hash, row.fingerprint, row.next_url, row.data) for row in rows}
+
+def delete_fingerprints(task_id: int, session_factory=SessionLocal) -> None:
+    db = session_factory()
+    try:
+        db.execute(delete(PageFingerprint.__table__).where(PageFingerprint.task_id == task_id))
+        db.commit()
+    finally:
+        db.close()
+
+class FingerprintWriter:
+    """Buffers the fingerprints of a task's pages and writes them in batches."""
+
+    def __init__(self, task_id: int, batch_size: int = SCRAPER_RESULT_BATCH_SIZE, session_factory=SessionLocal):
+        self.task_id = task_id
+        self.batch_size = max(1, batch_size)
+        self.session_factory = session_factory
+        self.written = 0
+        self._pending: List[dict] = []
+
+    def add(self, url: str, page: PagePrint) -> bool:
+        """Queue a page; returns True once a batch is ready to flush."""
+        self._pending.append({"task_id": self.task_id, "url": url, **page._asdict()})
+        return len(self._pending) >= self.batch_size
+
+    def flush(self) -> int:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        db = self.session_factory()
+        try:
+            db.execute(insert(PageFingerprint.__table__), batch)
+            db.commit()
+        finally:
+            db.close()
+        self.written += len(batch)
+        return len(batch)
+
+class ChangeTracker:
+    """Compares a crawl's pages with the previous task's and counts what changed."""
+
+    def __init__(self, previous: Dict[str, PagePrint], previous_task_id: Optional[int] = None):
+        self.previous = previous
+        self.previous_task_id = previous_task_id
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0}
+        self._seen = set()
+
+    def get(self, url: str) -> Optional[PagePrint]:
+        return self.previous.get(normalize_url(url))
+
+    def record(self, url: str, unchanged: bool) -> str:
+        key = normalize_url(url)
+        if key in self.previous:
+            self._seen.add(key)
+            kind = "unchanged" if unchanged else "changed"
+        else:
+            kind = "new"
+        self.counts[kind] += 1
+        return kind
+
+    def summary(self) -> dict:
+        return {
+            **self.counts,
+            "removed": len(self.previous) - len(self._seen),
+            "previous_task_id": self.previous_task_id,
+        }
@@ -1,19 +1,38 @@
 # python -m uvicorn app.main:app --reload
-from fastapi import FastAPI, BackgroundTasks, Request, HTTPException
-from fastapi.responses import FileResponse
-from app.scraper.engine import run_scraper
-from app.models import ScrapeTask, ScrapeResult
-from app.database import SessionLocal, engine, Base
-from app.schemas import ScrapeRequest, ScrapeResponse, ScrapeResultSchema
-from pathlib import Path
+from fastapi import Depends, FastAPI, File, Form, Header, Request, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.scraper.http_cache import cache_stats
+from app.models import ScrapeTask
+from app.result_store import count_records, read_records
+from app.events import stream_task_events
+from app.exporters import BATCH_EXPORTERS, EXPORTERS, EXPORT_MEDIA_TYPES, PARQUET_AVAILABLE
+from app.batches import batch_progress, parse_seeds, read_seed_csv
+from app.config import SCRAPER_BATCH_MAX_URLS
+from app.database import get_db, init_db
+from app.downloads import file_response
+from app.reports import report_files, report_queue
+from app.task_queue import task_queue
+from app.task_store import cache_totals, get_task, list_tasks, parse_fields, pool_totals, render_totals, task_counts
+from app.schemas import (
+    BatchResponse,
+    BatchScrapeRequest,
+    ScrapeOptions,
+    ScrapeRequest,
+    ScrapeResponse,
+    ScrapeResultSchema,
+)
 from app.logging_config import setup_logging
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
+from pydantic import ValidationError
 import os
+from datetime import datetime
+from typing import Literal, Optional
 
 setup_logging()
-Base.metadata.create_all(bind=engine)
+init_db()
 app = FastAPI()
 
 app.add_middleware(
@@ -24,41 +43,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Endpoints that touch the database are plain functions so FastAPI runs them
+# in its threadpool instead of blocking the event loop.
 @app.post("/scrape", response_model=ScrapeResponse)
-async def scrape(request: ScrapeRequest, background_tasks: BackgroundTasks):
-    db = SessionLocal()
+def scrape(request: ScrapeRequest):
+    # Picked up by a worker process (python -m app.worker).
+    task = task_queue.enqueue(request.url, request.dict())
+    return ScrapeResponse(task_id=task.id, status=task.status)
+
+def _enqueue_batch(seeds, params: dict) -> BatchResponse:
+    urls, rejected, duplicates = parse_seeds(seeds)
+    if not urls:
+        raise HTTPException(status_code=400, detail="No valid seed URLs")
+    if len(urls) > SCRAPER_BATCH_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"A batch can have at most {SCRAPER_BATCH_MAX_URLS} URLs")
+    batch_id, tasks = task_queue.enqueue_batch(urls, params)
+    logger.info(f"Queued batch {batch_id}: {tasks} tasks, {duplicates} duplicates, {len(rejected)} rejected seeds")
+    return BatchResponse(
+        batch_id=batch_id, tasks=tasks, duplicates=duplicates, rejected=len(rejected), rejected_examples=rejected[:20]
+    )
+
+@app.post("/batches", response_model=BatchResponse)
+def create_batch(request: BatchScrapeRequest):
+    """Scrape many seed URLs: one task each, scheduled under the shared running limits."""
+    return _enqueue_batch(request.urls, request.dict(exclude={"urls"}))
+
+@app.post("/batches/upload", response_model=BatchResponse)
+def upload_batch(file: UploadFile = File(...), options: Optional[str] = Form(None)):
+    """A batch from a CSV (a url/website/domain column, or URLs in the first column); ``options`` is ScrapeOptions JSON."""
     try:
-        task = ScrapeTask(url=request.url, status="queued")
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        background_tasks.add_task(run_scraper, task.id, request.dict())
-        return ScrapeResponse(task_id=task.id, status=task.status)
-    finally:
-        db.close()
+        scrape_options = ScrapeOptions.model_validate_json(options) if options else ScrapeOptions()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    text = file.file.read().decode("utf-8-sig", errors="replace")
+    return _enqueue_batch(read_seed_csv(text), scrape_options.dict())
 
-@app.get("/result/{task_id}", response_model=ScrapeResultSchema)
-async def get_result(task_id: int):
-    db = SessionLocal()
+@app.get("/batches/{batch_id}")
+def get_batch(batch_id: int):
+    progress = batch_progress(batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+@app.get("/batches/{batch_id}/tasks")
+def get_batch_tasks(
+    batch_id: int,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
     try:
-        result = db.query(ScrapeResult).filter(ScrapeResult.task_id == task_id).first()
-        if result is None:
-            raise HTTPException(status_code=404, detail="Result not found")
-        return result
-    finally:
-        db.close()
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tasks, next_cursor = list_tasks(
+        columns, status=status.split(",") if status else None, cursor=cursor, limit=limit, batch_id=batch_id
+    )
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
+@app.get("/batches/{batch_id}/export")
+def export_batch(batch_id: int, format: Literal["ndjson", "csv", "parquet"] = "ndjson"):
+    progress = batch_progress(batch_id)
+    if progress is None or not progress["records"]:
+        raise HTTPException(status_code=404, detail="Result not found")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+    return StreamingResponse(
+        BATCH_EXPORTERS[format](batch_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=scraping_results_batch_{batch_id}.{format}"},
+    )
+
+@app.get("/result/{task_id}", response_model=ScrapeResultSchema)
+def get_result(task_id: int, cursor: Optional[int] = None, limit: int = Query(100, ge=1, le=1000)):
+    records, next_cursor = read_records(task_id, cursor, limit)
+    if not records and cursor is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return ScrapeResultSchema(task_id=task_id, data=records, total=count_records(task_id), next_cursor=next_cursor)
+
+@app.get("/export/{task_id}")
+def export_results(task_id: int, format: Literal["ndjson", "csv", "parquet"] = "ndjson"):
+    if not count_records(task_id):
+        raise HTTPException(status_code=404, detail="Result not found")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+    # Rows are read from the database in chunks while the response is sent.
+    return StreamingResponse(
+        EXPORTERS[format](task_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=scraping_results_task_{task_id}.{format}"},
+    )
 
 @app.get("/tasks")
-async def list_tasks():
-    db = SessionLocal()
+def get_tasks(
+    status: Optional[str] = None,
+    url: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    batch_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tasks, next_cursor = list_tasks(
+        columns,
+        status=status.split(",") if status else None,
+        url=url,
+        created_after=created_after,
+        created_before=created_before,
+        cursor=cursor,
+        limit=limit,
+        batch_id=batch_id,
+    )
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
+@app.get("/tasks/counts")
+def get_task_counts():
+    return task_counts()
+
+@app.get("/tasks/{task_id}")
+def get_task_detail(task_id: int, fields: Optional[str] = None):
     try:
-        return db.query(ScrapeTask).all()
-    finally:
-        db.close()
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    task = get_task(task_id, columns)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(task_id: int, last_event_id: Optional[int] = Header(None)):
+    """Server-Sent Events with the task's progress; the stream ends after its final status."""
+    task = await run_in_threadpool(get_task, task_id, ["id", "status"])
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(
+        stream_task_events(task_id, task["status"], last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/download-pdf/{task_id}")
-async def download_pdf(task_id: int):
-    db = SessionLocal()
+def download_pdf(
+    task_id: int, request: Request, part: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)
+):
+    """The task's PDF report: one part, or a zip of all parts when it has several."""
     try:
         task = db.query(ScrapeTask).filter(ScrapeTask.id == task_id).first()
         if not task:
@@ -66,42 +201,70 @@ async def download_pdf(task_id: int):
         
         if task.status != "completed":
             raise HTTPException(status_code=400, detail="Task not completed yet")
-        reports_dir = Path("reports").resolve()
+        # An evicted report is generated again from the stored records.
+        if task.report_status == "evicted" and report_queue.request(task_id):
+            task.report_status = "pending"
+        if task.report_status in ("pending", "generating"):
+            return JSONResponse(
+                status_code=202,
+                content={"status": task.report_status, "detail": "PDF report is still being generated"},
+                headers={"Retry-After": "5"},
+            )
+        if task.report_status == "failed":
+            raise HTTPException(status_code=404, detail="PDF report generation failed")
         
-        pdf_files = list(reports_dir.glob(f"scraping_report_{task_id}_*.pdf"))
-        
-        if not pdf_files:
+        files = {file.part: file for file in report_files(task_id)}
+        if not files and task.pdf_path:
+            # Reports from before report files were tracked: only the path is known.
+            stat = os.stat(task.pdf_path) if os.path.isfile(task.pdf_path) else None
+            if stat is None:
+                raise HTTPException(status_code=404, detail="PDF file not found on disk")
+            return file_response(
+                request, task.pdf_path, "application/pdf", f"scraping_report_task_{task_id}.pdf",
+                etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}", size=stat.st_size,
+            )
+        if not files:
             raise HTTPException(status_code=404, detail="PDF report not found")
         
-        pdf_path = pdf_files[0] 
-        
-        if not pdf_path.exists():
+        parts = len(files) - (0 in files)
+        # Part 0 is the zip of a report with several parts; a single-part report has none.
+        report = files.get(part if part is not None else 0 if 0 in files else 1)
+        if report is None:
+            raise HTTPException(status_code=404, detail=f"The report has {parts} part(s)")
+        if not os.path.isfile(report.path):
             raise HTTPException(status_code=404, detail="PDF file not found on disk")
         
-        if not pdf_path.is_file():
-            raise HTTPException(status_code=400, detail="Path is not a file")
-        
-        download_filename = f"scraping_report_task_{task_id}.pdf"
-        
-        return FileResponse(
-            path=str(pdf_path),
-            media_type="application/pdf",
-            filename=download_filename,
-            headers={
-                "Content-Disposition": f"attachment; filename={download_filename}",
-                "Cache-Control": "no-cache"
-            }
-        )
+        if report.part == 0:
+            media_type, download_filename = "application/zip", f"scraping_report_task_{task_id}.zip"
+        else:
+            suffix = f"_part{report.part}" if parts > 1 else ""
+            media_type, download_filename = "application/pdf", f"scraping_report_task_{task_id}{suffix}.pdf"
+        return file_response(request, report.path, media_type, download_filename, report.checksum, report.size)
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error downloading PDF for task {task_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during PDF download")
-    finally:
-        db.close()
 
 
+# Workers fetch the pages, so the counters come from the tasks they finished.
+@app.get("/stats/http")
+def http_pool_stats():
+    return pool_totals()
+
+@app.get("/stats/http-cache")
+def http_cache_stats():
+    return {**cache_totals(), **cache_stats()}
+
+@app.get("/stats/render")
+def render_stats():
+    return render_totals()
+
+@app.get("/stats/queue")
+def queue_stats():
+    return task_queue.stats()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "Web scraping service is running"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
 from app.database import Base
 from datetime import datetime
 
@@ -6,12 +6,80 @@ class ScrapeTask(Base):
     __tablename__ = "scrape_tasks"
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, index=True)
-    status = Column(String, default="queued")
+    status = Column(String, default="queued", index=True)
     pdf_path = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    params = Column(JSON, nullable=True)
+    worker_id = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)
+    record_count = Column(Integer, default=0)
+    # pending -> generating -> ready | failed; None for tasks without a report.
+    report_status = Column(String, nullable=True, index=True)
+    report_claimed_at = Column(DateTime, nullable=True)
+    # Incremental re-scrapes: {"new", "changed", "unchanged", "removed", "previous_task_id"}.
+    changes = Column(JSON, nullable=True)
+    # Tasks created by a batch request; host caps how many tasks run against one site.
+    batch_id = Column(Integer, nullable=True, index=True)
+    host = Column(String, nullable=True, index=True)
+    # Counters of the finished crawl: page cache and {"http_cache": hits, misses, ...}.
+    stats = Column(JSON, nullable=True)
+
+class ScrapeBatch(Base):
+    """A list of seed URLs submitted at once; each seed is a ScrapeTask with this batch_id."""
+    __tablename__ = "scrape_batches"
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Options shared by every task of the batch.
+    params = Column(JSON, nullable=True)
+    task_count = Column(Integer, default=0)
 
 class ScrapeResult(Base):
     __tablename__ = "scrape_results"
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer)
+    task_id = Column(Integer, index=True)
     data = Column(JSON)
+
+class ScrapeRecord(Base):
+    """One extracted record; tasks used to keep all of them in ScrapeResult.data."""
+    __tablename__ = "scrape_records"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    page_number = Column(Integer)
+    url = Column(String)
+    data = Column(JSON)
+
+    __table_args__ = (Index("ix_scrape_records_task_id_id", "task_id", "id"),)
+
+class PageFingerprint(Base):
+    """What a page looked like in an incremental task, so the next run can reuse its record."""
+    __tablename__ = "page_fingerprints"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    url = Column(String, nullable=False)
+    content_hash = Column(String)
+    fingerprint = Column(String)
+    next_url = Column(String, nullable=True)
+    data = Column(JSON, nullable=True)
+
+    __table_args__ = (Index("ix_page_fingerprints_task_id_url", "task_id", "url"),)
+
+class ReportFile(Base):
+    """A generated report file; part 0 is the zip of all parts of a multi-part report."""
+    __tablename__ = "report_files"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False, index=True)
+    part = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    checksum = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class TaskEvent(Base):
+    """Progress event published by the worker running a task and streamed to API clients."""
+    __tablename__ = "task_events"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False, index=True)
+    type = Column(String, nullable=False)
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
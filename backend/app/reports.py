@@ -0,0 +1,391 @@
+import hashlib
+import math
+import os
+import re
+import unicodedata
+import zipfile
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+from loguru import logger
+from sqlalchemy import delete, func, insert, or_, select, update
+
+from app.config import (
+    SCRAPER_REPORT_CHUNK_SIZE,
+    SCRAPER_REPORT_MAX_RECORDS,
+    SCRAPER_REPORT_RECORDS_PER_PART,
+    SCRAPER_REPORT_TIMEOUT,
+    SCRAPER_REPORTS_DIR,
+    SCRAPER_REPORTS_MAX_AGE_DAYS,
+    SCRAPER_REPORTS_MAX_BYTES,
+)
+from app.database import SessionLocal
+from app.events import publish
+from app.models import ReportFile, ScrapeTask
+from app.result_store import count_records, iter_records
+
+PDF_REPLACEMENTS = str.maketrans({
+    '\u2013': '-',
+    '\u2014': '--',
+    '\u2018': "'",
+    '\u2019': "'",
+    '\u201c': '"',
+    '\u201d': '"',
+    '\u2026': '...',
+    '\u00a0': ' ',
+    '\u00ae': '(R)',
+    '\u00a9': '(C)',
+    '\u2122': '(TM)',
+})
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F1E0-\U0001F1FF"
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA70-\U0001FAFF"
+    "]+"
+)
+COPY_CHUNK_SIZE = 1024 * 1024
+# Control characters the core PDF fonts cannot show.
+NON_PRINTABLE = dict.fromkeys(c for c in range(128) if not 0x20 <= c <= 0x7E)
+
+def sanitize_text_for_pdf(text) -> str:
+    """``text`` reduced to the printable ASCII the core PDF fonts can render."""
+    if not text:
+        return ""
+    text = str(text)
+    # Most scraped text is plain ASCII already and skips the Unicode passes.
+    if not text.isascii():
+        text = EMOJI_PATTERN.sub('', text.translate(PDF_REPLACEMENTS))
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(text.split()).translate(NON_PRINTABLE)
+
+def _clip(text: str, length: int) -> str:
+    return text[:length] + "..." if len(text) > length else text
+
+def _listed(values, limit: int) -> str:
+    text = ", ".join(values[:limit])
+    if len(values) > limit:
+        text += f" (+{len(values) - limit} more)"
+    return text
+
+def _field(pdf: FPDF, label: str, text: str):
+    pdf.set_font('Helvetica', 'B', 10)
+    pdf.cell(30, 6, label)
+    pdf.set_font('Helvetica', '', 10)
+    pdf.cell(0, 6, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+def _render_record(pdf: FPDF, number: int, item: dict):
+    if pdf.get_y() > 250:
+        pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, f'Record {number}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    _field(pdf, 'URL:', _clip(sanitize_text_for_pdf(item.get("url", "N/A")), 60))
+    _field(pdf, 'Company:', sanitize_text_for_pdf(item.get("company", "N/A")))
+
+    contacts = item.get("contacts", {})
+    if isinstance(contacts, dict):
+        emails = contacts.get("emails")
+        if emails and isinstance(emails, list):
+            _field(pdf, 'Emails:', _listed([sanitize_text_for_pdf(email) for email in emails if email], 3))
+        phones = contacts.get("phones")
+        if phones and isinstance(phones, list):
+            _field(pdf, 'Phones:', _listed([sanitize_text_for_pdf(phone) for phone in phones if phone], 3))
+
+    if item.get("tagline"):
+        _field(pdf, 'Tagline:', _clip(sanitize_text_for_pdf(item["tagline"]), 80))
+    if item.get("description"):
+        _field(pdf, 'Description:', _clip(sanitize_text_for_pdf(item["description"]), 100))
+    services = item.get("services")
+    if services and isinstance(services, list):
+        _field(pdf, 'Services:', _listed([sanitize_text_for_pdf(service) for service in services if service], 5))
+    social_media = item.get("social_media", {})
+    if social_media and isinstance(social_media, dict):
+        platforms = [sanitize_text_for_pdf(platform) for platform, link in social_media.items() if link]
+        if platforms:
+            _field(pdf, 'Social:', _listed(platforms, 3))
+    if item.get("industry"):
+        _field(pdf, 'Industry:', sanitize_text_for_pdf(item["industry"]))
+    pdf.ln(5)
+
+class ReportArtifact(NamedTuple):
+    """A written report file; ``part`` 0 is the zip bundling every part."""
+    part: int
+    path: str
+    size: int
+    checksum: str
+
+def _write_atomically(path: Path, data: bytes):
+    # Readers never see a half-written file under the final name.
+    partial = path.with_name(path.name + ".tmp")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+def file_checksum(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def render_report(
+    task_id: int, records: Iterable[dict], path: Path, total: int,
+    part: int = 1, parts: int = 1, first_number: int = 1,
+) -> ReportArtifact:
+    """Write one PDF file of ``records`` to ``path``."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 20)
+    pdf.cell(0, 15, f'Web Scraping Report - Task {task_id}', align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(5)
+    pdf.set_font('Helvetica', 'B', 14)
+    pdf.cell(0, 10, 'Executive Summary', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font('Helvetica', '', 11)
+    pdf.cell(0, 8, f'Total Records Extracted: {total}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if parts > 1:
+        pdf.cell(0, 8, f'Part {part} of {parts}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(0, 8, f'Report Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(10)
+    for number, item in enumerate(records, first_number):
+        _render_record(pdf, number, item)
+
+    # fpdf builds the whole document in memory; hash it there instead of re-reading the file.
+    data = bytes(pdf.output())
+    _write_atomically(path, data)
+    return ReportArtifact(part, str(path), len(data), hashlib.sha256(data).hexdigest())
+
+def bundle_report(parts: List[ReportArtifact], path: Path) -> ReportArtifact:
+    """Zip the parts of a report into one download."""
+    partial = path.with_name(path.name + ".tmp")
+    # The PDFs are compressed already.
+    with zipfile.ZipFile(partial, "w", zipfile.ZIP_STORED) as archive:
+        for artifact in parts:
+            archive.write(artifact.path, Path(artifact.path).name)
+    os.replace(partial, path)
+    return ReportArtifact(0, str(path), path.stat().st_size, file_checksum(path))
+
+def generate_pdf_report(
+    task_id: int,
+    session_factory=SessionLocal,
+    records_per_part: int = SCRAPER_REPORT_RECORDS_PER_PART,
+    max_records: int = SCRAPER_REPORT_MAX_RECORDS,
+    reports_dir: str = SCRAPER_REPORTS_DIR,
+) -> List[ReportArtifact]:
+    """Render a task's stored records into one or more PDF files.
+
+    Records are read from the database in chunks and each file holds at most
+    ``records_per_part`` of them, so memory stays flat for any task size.
+    Several parts are also bundled into a zip, returned last.
+    """
+    directory = Path(reports_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    total = count_records(task_id, session_factory)
+    records: Iterator[dict] = iter_records(task_id, SCRAPER_REPORT_CHUNK_SIZE, session_factory)
+    if max_records and total > max_records:
+        logger.info(f"Report for task {task_id} covers the first {max_records} of {total} records")
+        total = max_records
+        records = islice(records, max_records)
+    records_per_part = max(1, records_per_part)
+    parts = max(1, math.ceil(total / records_per_part))
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    artifacts = []
+    for part in range(1, parts + 1):
+        suffix = f"_part{part}" if parts > 1 else ""
+        path = directory / f"scraping_report_{task_id}_{timestamp}{suffix}.pdf"
+        artifacts.append(render_report(
+            task_id, islice(records, records_per_part), path, total,
+            part=part, parts=parts, first_number=(part - 1) * records_per_part + 1,
+        ))
+    if parts > 1:
+        artifacts.append(bundle_report(artifacts, directory / f"scraping_report_{task_id}_{timestamp}.zip"))
+    logger.info(f"PDF report for task {task_id} generated in {parts} part(s): {artifacts[0].path}")
+    return artifacts
+
+def report_files(task_id: int, session_factory=SessionLocal) -> List[ReportFile]:
+    """The tracked files of a task's report, bundle first, then parts in order."""
+    db = session_factory()
+    try:
+        return db.query(ReportFile).filter(ReportFile.task_id == task_id).order_by(ReportFile.part).all()
+    finally:
+        db.close()
+
+def _remove_files(paths: Iterable[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove report file {path}: {str(e)}")
+
+def evict_reports(
+    session_factory=SessionLocal,
+    max_bytes: int = SCRAPER_REPORTS_MAX_BYTES,
+    max_age_days: float = SCRAPER_REPORTS_MAX_AGE_DAYS,
+    keep: Iterable[int] = (),
+) -> List[int]:
+    """Delete the oldest reports until the rest fit ``max_bytes`` and ``max_age_days``.
+
+    Evicted tasks keep their records and get ``report_status="evicted"``; the
+    next download queues their report again. Returns the evicted task ids.
+    """
+    table = ReportFile.__table__
+    keep = set(keep)
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days) if max_age_days else None
+    db = session_factory()
+    try:
+        reports = db.execute(
+            select(table.c.task_id, func.max(table.c.created_at).label("created_at"), func.sum(table.c.size).label("size"))
+            .group_by(table.c.task_id).order_by("created_at")
+        ).all()
+        total = sum(report.size for report in reports)
+        evicted = []
+        for report in reports:
+            too_old = cutoff is not None and report.created_at < cutoff
+            if not too_old and not (max_bytes and total > max_bytes):
+                # Newer reports are younger still, and the total already fits.
+                break
+            if report.task_id in keep:
+                continue
+            evicted.append(report.task_id)
+            total -= report.size
+        if not evicted:
+            return []
+        paths = db.execute(select(table.c.path).where(table.c.task_id.in_(evicted))).scalars().all()
+        db.execute(delete(table).where(table.c.task_id.in_(evicted)))
+        db.execute(
+            update(ScrapeTask.__table__).where(ScrapeTask.id.in_(evicted)).values(report_status="evicted", pdf_path=None)
+        )
+        db.commit()
+    finally:
+        db.close()
+    _remove_files(paths)
+    logger.info(f"Evicted the reports of {len(evicted)} task(s), {len(paths)} files; {total} bytes of reports kept")
+    return evicted
+
+class ReportQueue:
+    """PDF reports waiting to be generated, tracked on the ``scrape_tasks`` rows.
+
+    A finished task is marked ``report_status="pending"``; workers claim it
+    with a conditional update like tasks themselves, and a report whose claim
+    is older than ``timeout`` (its worker died) can be claimed again.
+    """
+
+    def __init__(self, session_factory=SessionLocal, timeout: float = SCRAPER_REPORT_TIMEOUT):
+        self.session_factory = session_factory
+        self.timeout = timeout
+
+    def _claimable(self, table):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.timeout)
+        return or_(
+            table.c.report_status == "pending",
+            (table.c.report_status == "generating") & (table.c.report_claimed_at < cutoff),
+        )
+
+    def claim(self) -> Optional[int]:
+        """Mark the oldest waiting report as generating and return its task id."""
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            while True:
+                row = db.execute(
+                    select(table.c.id, table.c.report_claimed_at)
+                    .where(self._claimable(table)).order_by(table.c.id).limit(1)
+                ).first()
+                if row is None:
+                    return None
+                claimed = db.execute(
+                    update(table)
+                    .where(table.c.id == row.id, self._claimable(table))
+                    .where(table.c.report_claimed_at.is_(None) if row.report_claimed_at is None
+                           else table.c.report_claimed_at == row.report_claimed_at)
+                    .values(report_status="generating", report_claimed_at=datetime.utcnow())
+                )
+                db.commit()
+                if claimed.rowcount == 1:
+                    return row.id
+        finally:
+            db.close()
+
+    def request(self, task_id: int) -> bool:
+        """Queue the report of a task whose files were evicted; False if it is not evicted."""
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            queued = db.execute(
+                update(table)
+                .where(table.c.id == task_id, table.c.report_status == "evicted")
+                .values(report_status="pending", report_claimed_at=None)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        return bool(queued)
+
+    def complete(self, task_id: int, artifacts: List[ReportArtifact]):
+        """Track the new files of a task's report, replacing any earlier ones."""
+        table = ReportFile.__table__
+        db = self.session_factory()
+        try:
+            replaced = db.execute(select(table.c.path).where(table.c.task_id == task_id)).scalars().all()
+            db.execute(delete(table).where(table.c.task_id == task_id))
+            db.execute(insert(table), [
+                {"task_id": task_id, "part": a.part, "path": a.path, "size": a.size, "checksum": a.checksum}
+                for a in artifacts
+            ])
+            db.execute(
+                update(ScrapeTask.__table__)
+                .where(ScrapeTask.id == task_id)
+                .values(report_status="ready", pdf_path=artifacts[0].path)
+            )
+            db.commit()
+        finally:
+            db.close()
+        _remove_files(set(replaced) - {a.path for a in artifacts})
+        parts = sum(1 for a in artifacts if a.part)
+        publish(task_id, "report", {"ready": True, "parts": parts}, self.session_factory)
+
+    def fail(self, task_id: int):
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            db.execute(update(table).where(table.c.id == task_id).values(report_status="failed"))
+            db.commit()
+        finally:
+            db.close()
+        publish(task_id, "report", {"ready": False}, self.session_factory)
+
+    def generate(self, task_id: int) -> Optional[List[ReportArtifact]]:
+        try:
+            artifacts = generate_pdf_report(task_id, self.session_factory)
+        except Exception as e:
+            logger.error(f"PDF generation failed for task {task_id}: {str(e)}")
+            self.fail(task_id)
+            return None
+        self.complete(task_id, artifacts)
+        try:
+            evict_reports(self.session_factory, keep=[task_id])
+        except Exception as e:
+            logger.error(f"Report eviction failed: {str(e)}")
+        return artifacts
+
+    def pending_count(self) -> int:
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            return db.execute(
+                select(func.count()).where(table.c.report_status.in_(("pending", "generating")))
+            ).scalar()
+        finally:
+            db.close()
+
+report_queue = ReportQueue()
@@ -0,0 +1,159 @@
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import Text, delete, func, insert, select, type_coerce, update
+
+from app.config import SCRAPER_RESULT_BATCH_SIZE
+from app.database import SessionLocal
+from app.models import ScrapeRecord, ScrapeTask
+from app.task_queue import TaskAbandoned, held_by
+
+class ResultWriter:
+    """Buffers extracted records and writes them to ``scrape_records`` in batches.
+
+    With ``check_owner`` a batch is only written while the task is still
+    running under ``worker_id``; otherwise ``flush`` raises TaskAbandoned.
+    """
+
+    def __init__(
+        self,
+        task_id: int,
+        batch_size: int = SCRAPER_RESULT_BATCH_SIZE,
+        session_factory=SessionLocal,
+        check_owner: bool = False,
+        worker_id: Optional[str] = None,
+    ):
+        self.task_id = task_id
+        self.batch_size = max(1, batch_size)
+        self.session_factory = session_factory
+        self.check_owner = check_owner
+        self.worker_id = worker_id
+        self.written = 0
+        self._pending: List[dict] = []
+
+    def reset(self) -> None:
+        """Drop records left by an earlier attempt at this task."""
+        db = self.session_factory()
+        try:
+            db.execute(delete(ScrapeRecord.__table__).where(ScrapeRecord.task_id == self.task_id))
+            db.execute(update(ScrapeTask.__table__).where(ScrapeTask.id == self.task_id).values(record_count=0))
+            db.commit()
+        finally:
+            db.close()
+        self.written = 0
+
+    def add(self, record: dict) -> bool:
+        """Queue ``record``; returns True once a batch is ready to flush."""
+        self._pending.append(record)
+        return len(self._pending) >= self.batch_size
+
+    def flush(self) -> int:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        rows = [
+            {"task_id": self.task_id, "page_number": record.get("page_number"), "url": record.get("url"), "data": record}
+            for record in batch
+        ]
+        tasks = ScrapeTask.__table__
+        owned = [held_by(self.worker_id)] if self.check_owner else []
+        db = self.session_factory()
+        try:
+            # The count update takes the write lock first, so the owner cannot change before the insert commits.
+            counted = db.execute(
+                update(tasks).where(tasks.c.id == self.task_id, *owned).values(record_count=func.coalesce(tasks.c.record_count, 0) + len(rows))
+            ).rowcount
+            if self.check_owner and counted != 1:
+                db.rollback()
+                raise TaskAbandoned(f"Task {self.task_id} was requeued to another worker")
+            db.execute(insert(ScrapeRecord.__table__), rows)
+            db.commit()
+        finally:
+            db.close()
+        self.written += len(rows)
+        return len(rows)
+
+def read_records(
+    task_id: int, cursor: Optional[int] = None, limit: int = 100, session_factory=SessionLocal
+) -> Tuple[List[dict], Optional[int]]:
+    """Return up to ``limit`` records after ``cursor`` and the cursor of the next page."""
+    table = ScrapeRecord.__table__
+    db = session_factory()
+    try:
+        query = select(table.c.id, table.c.data).where(table.c.task_id == task_id)
+        if cursor is not None:
+            query = query.where(table.c.id > cursor)
+        rows = db.execute(query.order_by(table.c.id).limit(limit + 1)).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return [row.data for row in rows[:limit]], next_cursor
+    finally:
+        db.close()
+
+def iter_records(task_id: int, chunk_size: int = 500, session_factory=SessionLocal) -> Iterator[dict]:
+    """Yield every record of a task, holding at most ``chunk_size`` in memory."""
+    cursor = None
+    while True:
+        records, cursor = read_records(task_id, cursor, chunk_size, session_factory)
+        yield from records
+        if cursor is None:
+            return
+
+def iter_raw_records(task_id: int, chunk_size: int = 1000, session_factory=SessionLocal) -> Iterator[str]:
+    """Yield each record as its stored JSON text, skipping the decode/encode round trip."""
+    table = ScrapeRecord.__table__
+    raw = type_coerce(table.c.data, Text)
+    cursor = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(table.c.id, raw)
+                .where(table.c.task_id == task_id, table.c.id > cursor)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+        finally:
+            db.close()
+        for row in rows:
+            yield row[1]
+        if len(rows) < chunk_size:
+            return
+        cursor = rows[-1].id
+
+def _iter_batch_rows(batch_id: int, column, chunk_size: int, session_factory) -> Iterator:
+    """``column`` of every record of a batch's tasks, task by task, read in keyset chunks."""
+    table, tasks = ScrapeRecord.__table__, ScrapeTask.__table__
+    child_ids = select(tasks.c.id).where(tasks.c.batch_id == batch_id)
+    last_task, last_id = 0, 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(table.c.task_id, table.c.id, column)
+                .where(
+                    table.c.task_id.in_(child_ids),
+                    (table.c.task_id > last_task) | ((table.c.task_id == last_task) & (table.c.id > last_id)),
+                )
+                .order_by(table.c.task_id, table.c.id)
+                .limit(chunk_size)
+            ).all()
+        finally:
+            db.close()
+        for row in rows:
+            yield row[2]
+        if len(rows) < chunk_size:
+            return
+        last_task, last_id = rows[-1].task_id, rows[-1].id
+
+def iter_batch_records(batch_id: int, chunk_size: int = 500, session_factory=SessionLocal) -> Iterator[dict]:
+    return _iter_batch_rows(batch_id, ScrapeRecord.__table__.c.data, chunk_size, session_factory)
+
+def iter_batch_raw_records(batch_id: int, chunk_size: int = 1000, session_factory=SessionLocal) -> Iterator[str]:
+    return _iter_batch_rows(batch_id, type_coerce(ScrapeRecord.__table__.c.data, Text), chunk_size, session_factory)
+
+def count_records(task_id: int, session_factory=SessionLocal) -> int:
+    db = session_factory()
+    try:
+        task = db.get(ScrapeTask, task_id)
+        return task.record_count or 0 if task else 0
+    finally:
+        db.close()
@@ -1,17 +1,49 @@
-from pydantic import BaseModel
-from typing import List, Any
+from pydantic import BaseModel, Field
+from typing import List, Any, Optional, Literal
 
-class ScrapeRequest(BaseModel):
+from app.config import SCRAPER_CRAWL_MAX_PAGES_LIMIT, SCRAPER_EXTRACTION_WORKERS, SCRAPER_HOST_RATE
+
+class ScrapeOptions(BaseModel):
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    per_host_limit: Optional[int] = Field(None, ge=1)
+    # Requests per second to any one host; a request can be politer than the configured rate, not less.
+    host_rate: Optional[float] = Field(None, gt=0, le=SCRAPER_HOST_RATE)
+    # Crawl budgets: link depth from the start URL and total pages fetched.
+    max_depth: Optional[int] = Field(None, ge=0)
+    max_pages: Optional[int] = Field(None, ge=1, le=SCRAPER_CRAWL_MAX_PAGES_LIMIT)
+    # Seed the crawl from the site's sitemaps before following links.
+    use_sitemaps: Optional[bool] = None
+    # One record per site and company instead of one per page.
+    merge_records: Optional[bool] = None
+    # Reuse the records of pages unchanged since the previous task for this URL.
+    incremental: Optional[bool] = None
+    previous_task_id: Optional[int] = None
+    parser: Optional[Literal["html.parser", "lxml", "lxml-html"]] = None
+    # 0 extracts in threads; each other size starts a process pool, so sizes stop at the configured one.
+    extraction_workers: Optional[int] = Field(None, ge=0, le=SCRAPER_EXTRACTION_WORKERS)
+
+class ScrapeRequest(ScrapeOptions):
     url: str
 
+class BatchScrapeRequest(ScrapeOptions):
+    # Seed URLs; bare domains are scraped over https.
+    urls: List[str]
+
 class ScrapeResponse(BaseModel):
     task_id: int
     status: str
 
+class BatchResponse(BaseModel):
+    batch_id: int
+    tasks: int
+    duplicates: int = 0
+    # Seeds that are not http(s) URLs or domains; the first few are listed.
+    rejected: int = 0
+    rejected_examples: List[str] = []
+
 class ScrapeResultSchema(BaseModel):
-    id: int
     task_id: int
     data: List[dict]
-
-    class Config:
-        from_attributes = True
+    total: int
+    # Pass back as ?cursor= to get the next page; None on the last page.
+    next_cursor: Optional[int] = None
@@ -0,0 +1,200 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from app.config import (
+    SCRAPER_BROWSER_MAX_PAGES,
+    SCRAPER_BROWSER_POOL_SIZE,
+    SCRAPER_RENDER_TIMEOUT,
+    SCRAPER_RENDER_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+READY_STATE_SCRIPT = "return document.readyState"
+RESOURCE_COUNT_SCRIPT = "return window.performance.getEntriesByType('resource').length"
+NETWORK_IDLE_TIME = 0.5
+POLL_FREQUENCY = 0.05
+
+def create_chrome_driver():
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    # Readiness is decided by the wait strategy, not by the full load event.
+    options.page_load_strategy = "eager"
+
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(SCRAPER_RENDER_TIMEOUT)
+    return driver
+
+def dom_ready(driver) -> bool:
+    return driver.execute_script(READY_STATE_SCRIPT) == "complete"
+
+class NetworkIdle:
+    def __init__(self, idle_time: float = NETWORK_IDLE_TIME):
+        self.idle_time = idle_time
+        self.last_count = None
+        self.stable_since = None
+
+    def __call__(self, driver) -> bool:
+        if not dom_ready(driver):
+            return False
+        count = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+        now = time.monotonic()
+        if count != self.last_count:
+            self.last_count = count
+            self.stable_since = now
+            return False
+        return now - self.stable_since >= self.idle_time
+
+class SelectorPresent:
+    def __init__(self, selector: str):
+        self.selector = selector
+
+    def __call__(self, driver) -> bool:
+        return len(driver.find_elements(By.CSS_SELECTOR, self.selector)) > 0
+
+class _Browser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+class BrowserPool:
+    """Bounded set of long-lived browsers, each reusing a single tab."""
+
+    def __init__(
+        self,
+        size: int = SCRAPER_BROWSER_POOL_SIZE,
+        max_pages: int = SCRAPER_BROWSER_MAX_PAGES,
+        driver_factory: Callable = create_chrome_driver,
+        timeout: float = SCRAPER_RENDER_TIMEOUT,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.driver_factory = driver_factory
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.launches = 0
+        self.recycles = 0
+        self.pages_rendered = 0
+        self.wait_timeouts = 0
+
+    def _launch(self) -> _Browser:
+        driver = self.driver_factory()
+        with self._lock:
+            self.launches += 1
+        logger.info(f"Launched browser {self.launches} for pool")
+        return _Browser(driver)
+
+    def _quit(self, browser: _Browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit browser cleanly: {e}")
+
+    @contextmanager
+    def lease(self):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        self._slots.acquire()
+        browser = None
+        healthy = False
+        try:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                browser = self._launch()
+            yield browser
+            healthy = True
+        finally:
+            if browser is not None:
+                if not healthy or self._closed:
+                    self._quit(browser)
+                elif browser.pages >= self.max_pages:
+                    with self._lock:
+                        self.recycles += 1
+                    self._quit(browser)
+                else:
+                    self._idle.put(browser)
+            self._slots.release()
+
+    def _reset_tabs(self, driver):
+        handles = driver.window_handles
+        if len(handles) > 1:
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+    def render(self, url: str, wait_for: Optional[str] = None, selector: Optional[str] = None) -> str:
+        wait_for = wait_for or SCRAPER_RENDER_WAIT
+        if wait_for == "selector" and not selector:
+            wait_for = "dom"
+        if wait_for == "network_idle":
+            condition = NetworkIdle()
+        elif wait_for == "selector":
+            condition = SelectorPresent(selector)
+        else:
+            condition = dom_ready
+
+        with self.lease() as browser:
+            driver = browser.driver
+            browser.pages += 1
+            driver.get(url)
+            try:
+                WebDriverWait(driver, self.timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+            except TimeoutException:
+                with self._lock:
+                    self.wait_timeouts += 1
+                logger.warning(f"Timed out waiting for {wait_for} on {url}, using current DOM")
+            html = driver.page_source
+            self._reset_tabs(driver)
+            with self._lock:
+                self.pages_rendered += 1
+            return html
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "launches": self.launches,
+                "recycles": self.recycles,
+                "pages_rendered": self.pages_rendered,
+                "wait_timeouts": self.wait_timeouts,
+                "idle": self._idle.qsize(),
+            }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,207 @@
+import asyncio
+from functools import partial
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from app.config import SCRAPER_HOST_RATE, SCRAPER_MAX_CONCURRENCY, SCRAPER_PER_HOST_LIMIT, SCRAPER_RESPECT_ROBOTS
+from app.scraper.dynamic import render_page
+from app.scraper.fetcher import fetch_async, new_async_client
+from app.scraper.frontier import Frontier
+from app.scraper.page_cache import PageCache
+from app.scraper.pagination import next_pages
+from app.scraper.parsers import document_anchors, parse_document
+from app.scraper.politeness import THROTTLE_STATUSES, HostScheduler, Throttled, parse_retry_after
+from app.scraper.render_detection import CHALLENGE_PATTERN, render_decider
+from app.scraper.urls import normalize_url
+
+async def fetch_page(
+    client: httpx.AsyncClient, url: str, cache: Optional[PageCache] = None, throttle: bool = False
+) -> Optional[str]:
+    """Fetch ``url``, rendering it when needed; with ``throttle``, 429/503 raise Throttled."""
+    loop = asyncio.get_running_loop()
+    html = None
+    status_code = None
+    retry_after = None
+    render_stats = cache.render_stats if cache is not None else None
+
+    # Domains where rendering has always changed the result skip the static fetch.
+    if render_decider.remembered(url) is not True:
+        try:
+            response = await (cache.fetch_response_async(client, url) if cache is not None else fetch_async(client, url))
+            html = response.text
+            status_code = response.status_code
+            retry_after = response.headers.get("retry-after")
+        except Exception as e:
+            logger.warning(f"Async fetch failed for {url}: {str(e)}, trying Selenium")
+
+        # A JS challenge page is left to the browser; a plain 429/503 means slow down.
+        if throttle and status_code in THROTTLE_STATUSES and not CHALLENGE_PATTERN.search(html or ""):
+            raise Throttled(url, status_code, parse_retry_after(retry_after))
+
+        if not render_decider.should_render(url, html, status_code, render_stats):
+            if status_code == 200:
+                return html
+            logger.warning(f"Got status {status_code} for {url} and page does not need rendering, skipping")
+            return None
+
+    try:
+        return await loop.run_in_executor(None, partial(render_page, url, html, task_stats=render_stats))
+    except Exception as e:
+        logger.error(f"Selenium fallback failed for {url}: {str(e)}")
+        return html if status_code == 200 else None
+
+def page_anchors(url: str, html: str, cache: Optional[PageCache] = None) -> List[Tuple[str, str]]:
+    document = cache.document(url, html) if cache is not None else parse_document(html)
+    return document_anchors(document) if document is not None else []
+
+def page_links(url: str, html: str, cache: Optional[PageCache] = None) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """The ``(href, text)`` anchors of a page and the pagination pages that follow it."""
+    document = cache.document(url, html) if cache is not None else parse_document(html)
+    if document is None:
+        return [], []
+    return document_anchors(document), next_pages(document, url)
+
+async def crawl(
+    urls: Iterable[str] = (),
+    max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+    per_host_limit: int = SCRAPER_PER_HOST_LIMIT,
+    cache: Optional[PageCache] = None,
+    host_rate: Optional[float] = SCRAPER_HOST_RATE,
+    respect_robots: bool = SCRAPER_RESPECT_ROBOTS,
+    frontier: Optional[Frontier] = None,
+) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """Yield ``(url, html)`` pairs in completion order; ``html`` is None if every fetch failed.
+
+    Requests go through a HostScheduler, which rate-limits each host, follows
+    robots.txt and backs off hosts that answer 429/503. With a ``frontier``,
+    URLs are taken from it best first and the links of every fetched page are
+    fed back into it, so the crawl goes breadth-first within its budgets. The
+    pages a page's pagination leads to are fed back as well, at its depth and
+    ahead of other links, so they share the same politeness and page budget.
+    """
+    loop = asyncio.get_running_loop()
+    urls = list(urls)
+    unique = {}
+    for url in urls:
+        unique.setdefault(normalize_url(url), url)
+    if cache is not None:
+        cache.record_avoided(len(urls) - len(unique))
+    urls = list(unique.values())
+    if not urls and frontier is None:
+        return
+
+    # Bounded so fetching pauses when extraction falls behind.
+    finished: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_concurrency))
+    # Frontier URLs are released a few at a time so later, better links can still jump the queue.
+    buffer = max(1, max_concurrency) * 2
+    depths = {}
+
+    async with new_async_client(max_connections=max(1, max_concurrency)) as client:
+        scheduler = HostScheduler(client, per_host_limit, rate=host_rate, respect_robots=respect_robots)
+
+        async def schedule(batch):
+            # Pages the disk cache still holds fresh cost the host nothing, so they skip the queues.
+            fresh = set()
+            if cache is not None and batch:
+                fresh = await loop.run_in_executor(None, cache.fresh_urls, batch)
+            for url in batch:
+                scheduler.add(url, immediate=url in fresh)
+
+        async def refill():
+            if frontier is None:
+                return
+            batch = []
+            while scheduler.queued + len(batch) < buffer:
+                item = frontier.pop()
+                if item is None:
+                    break
+                url, depths[url] = item
+                batch.append(url)
+            await schedule(batch)
+
+        async def follow_links(url, html):
+            depth = depths.pop(url, None)
+            if frontier is None or depth is None:
+                return
+            try:
+                links, pages = await loop.run_in_executor(None, page_links, url, html, cache)
+            except Exception as e:
+                logger.warning(f"Could not read links from {url}: {str(e)}")
+                return
+            frontier.add_pages(url, pages, depth)
+            if depth < frontier.max_depth:
+                frontier.add_links(links, url, depth + 1)
+
+        async def worker():
+            while True:
+                item = await scheduler.next()
+                if item is None:
+                    return
+                url, attempt, polite = item
+                if not scheduler.allowed(url):
+                    logger.info(f"robots.txt disallows {url}, skipping")
+                    await refill()
+                    scheduler.done(url)
+                    await finished.put((url, None))
+                    continue
+                html = cache.get(url) if cache is not None else None
+                if html is None:
+                    try:
+                        html = await fetch_page(client, url, cache, throttle=polite)
+                    except Throttled as e:
+                        # Like a finished fetch, a throttled one frees its slot only after a refill.
+                        await refill()
+                        if scheduler.throttle(url, attempt, e.retry_after):
+                            continue
+                        logger.warning(f"Giving up on {url} after {attempt + 1} throttled attempts")
+                        await finished.put((url, None))
+                        continue
+                    if cache is not None and html is not None:
+                        cache.put(url, html)
+                if html is not None:
+                    await follow_links(url, html)
+                # New links are released before this fetch counts as done, so idle
+                # workers never see an empty scheduler while the frontier still has work.
+                # Every path that frees a slot (disallowed, throttled) refills first.
+                await refill()
+                scheduler.done(url)
+                await finished.put((url, html))
+
+        cached = []
+        pending = []
+        for url in urls:
+            html = cache.get(url) if cache is not None else None
+            if html is not None:
+                cached.append((url, html))
+            else:
+                pending.append(url)
+        await schedule(pending)
+        await refill()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, max_concurrency))]
+        try:
+            for item in cached:
+                yield item
+            # Pages keep coming until every worker has found the scheduler empty.
+            running = set(workers)
+            while running or not finished.empty():
+                getter = asyncio.ensure_future(finished.get())
+                await asyncio.wait([getter, *running], return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                for task in [task for task in running if task.done()]:
+                    running.discard(task)
+                    if task.exception() is not None:
+                        raise task.exception()
+                if getter.done() and not getter.cancelled():
+                    yield getter.result()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await scheduler.close()
+            logger.info(f"Crawl scheduler stats: {scheduler.stats()}")
+            if frontier is not None:
+                logger.info(f"Crawl frontier stats: {frontier.stats()}")
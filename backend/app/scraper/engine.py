@@ -1,200 +1,228 @@
-from app.scraper.extractors import extract_data
-from app.scraper.dynamic import handle_dynamic
-from app.scraper.pagination import handle_pagination
-from app.scraper.url_discovery import discover_urls
-from app.models import ScrapeTask, ScrapeResult
+from app.scraper.crawler import crawl
+from app.scraper.extraction_stage import ExtractionStage
+from app.scraper.fetcher import new_async_client
+from app.scraper.http_cache import get_http_cache
+from app.scraper.page_cache import PageCache
+from app.scraper.frontier import Frontier
+from app.scraper.merge import RecordMerger
+from app.scraper.sitemaps import sitemap_urls
+from app.models import ScrapeTask
+from app.result_store import ResultWriter
+from app.task_queue import TaskAbandoned, held_by
+from app.fingerprints import (
+    ChangeTracker,
+    FingerprintWriter,
+    PagePrint,
+    content_hash,
+    delete_fingerprints,
+    load_fingerprints,
+    previous_task_id,
+)
+from app.events import ProgressEvents, publish, publish_events
 from app.database import SessionLocal
+from app.config import (
+    SCRAPER_CRAWL_MAX_DEPTH,
+    SCRAPER_CRAWL_MAX_PAGES,
+    SCRAPER_EXTRACTION_WORKERS,
+    SCRAPER_HOST_RATE,
+    SCRAPER_INCREMENTAL,
+    SCRAPER_MAX_CONCURRENCY,
+    SCRAPER_MERGE_RECORDS,
+    SCRAPER_PER_HOST_LIMIT,
+    SCRAPER_SITEMAP_MAX_URLS,
+    SCRAPER_SITEMAPS,
+)
 from loguru import logger
-from pathlib import Path
+from sqlalchemy import update
 from datetime import datetime
-from fpdf import FPDF
+from functools import partial
+import asyncio
+import hashlib
 import json
-import re
-import unicodedata
 
-def sanitize_text_for_pdf(text):
-    if not text:
-        return ""
-    
-    text = str(text)
-    
-    unicode_replacements = {
-        '\u2013': '-', 
-        '\u2014': '--',
-        '\u2018': "'",
-        '\u2019': "'",
-        '\u201c': '"',
-        '\u201d': '"',
-        '\u2026': '...',
-        '\u00a0': ' ',
-        '\u00ae': '(R)',
-        '\u00a9': '(C)',
-        '\u2122': '(TM)',
-    }
-    
-    for unicode_char, ascii_replacement in unicode_replacements.items():
-        text = text.replace(unicode_char, ascii_replacement)
+# Tasks whose worker lost their lease; their scrape stops at the next page.
+_abandoned = set()
 
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F" 
-        "\U0001F300-\U0001F5FF" 
-        "\U0001F680-\U0001F6FF"  
-        "\U0001F1E0-\U0001F1FF" 
-        "\U00002702-\U000027B0" 
-        "\U000024C2-\U0001F251"
-        "\U0001F900-\U0001F9FF" 
-        "\U0001FA70-\U0001FAFF"
-        "]+", 
-        flags=re.UNICODE
-    )
-    text = emoji_pattern.sub('', text)
-    
-    try:
-        text = unicodedata.normalize('NFKD', text)
-        text = text.encode('ascii', 'ignore').decode('ascii')
-    except UnicodeError:
-        text = ''.join(char for char in text if ord(char) < 256)
-    
-    text = ' '.join(text.split())
-    text = re.sub(r'[^\x20-\x7E]', '', text)
-    
-    return text
+def abandon_scrape(task_id):
+    _abandoned.add(task_id)
 
-def generate_pdf_report(task_id: int, scraped_data: list) -> str:    
-    reports_dir = Path("reports")
-    reports_dir.mkdir(exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"scraping_report_{task_id}_{timestamp}.pdf"
-    pdf_path = reports_dir / filename
-    
+def _settle(db, task_id, worker_id, **values):
+    """Write the final state of a task unless another worker has claimed it since; False if one has."""
+    table = ScrapeTask.__table__
+    settled = db.execute(update(table).where(table.c.id == task_id, held_by(worker_id)).values(**values)).rowcount
+    db.commit()
+    return settled == 1
+
+async def _seed_from_sitemaps(frontier, url, cache, host_rate):
+    """Queue the pages the site's sitemaps list, so discovery does not wait on parsing pages."""
     try:
-        pdf = FPDF()
-        pdf.add_page()
-        
-        pdf.set_font('Arial', 'B', 20)
-        header_text = sanitize_text_for_pdf(f'Web Scraping Report - Task {task_id}')
-        pdf.cell(0, 15, header_text, ln=True, align='C')
-        pdf.ln(5)
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, 'Executive Summary', ln=True)
-        pdf.set_font('Arial', '', 11)
-        pdf.cell(0, 8, f'Total Records Extracted: {len(scraped_data)}', ln=True)
-        pdf.cell(0, 8, f'Report Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', ln=True)
-        pdf.ln(10)
-        
-        for i, item in enumerate(scraped_data, 1):
-            if pdf.get_y() > 250:
-                pdf.add_page()
-            
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, f'Record {i}', ln=True)
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(30, 6, 'URL:', 0, 0)
-            pdf.set_font('Arial', '', 10)
-            url_text = sanitize_text_for_pdf(item.get("url", "N/A"))
-            if len(url_text) > 60:
-                url_text = url_text[:60] + "..."
-            pdf.cell(0, 6, url_text, ln=True)
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(30, 6, 'Company:', 0, 0)
-            pdf.set_font('Arial', '', 10)
-            company_text = sanitize_text_for_pdf(item.get("company", "N/A"))
-            pdf.cell(0, 6, company_text, ln=True)
-            contacts = item.get("contacts", {})
-            if isinstance(contacts, dict):
-                emails = contacts.get("emails", [])
-                if emails and isinstance(emails, list) and len(emails) > 0:
-                    pdf.set_font('Arial', 'B', 10)
-                    pdf.cell(30, 6, 'Emails:', 0, 0)
-                    pdf.set_font('Arial', '', 10)
-                    email_list = [sanitize_text_for_pdf(str(email)) for email in emails if email]
-                    emails_text = ", ".join(email_list[:3])
-                    if len(email_list) > 3:
-                        emails_text += f" (+{len(email_list)-3} more)"
-                    pdf.cell(0, 6, emails_text, ln=True)
-                
-                phones = contacts.get("phones", [])
-                if phones and isinstance(phones, list) and len(phones) > 0:
-                    pdf.set_font('Arial', 'B', 10)
-                    pdf.cell(30, 6, 'Phones:', 0, 0)
-                    pdf.set_font('Arial', '', 10)
-                    phone_list = [sanitize_text_for_pdf(str(phone)) for phone in phones if phone]
-                    phones_text = ", ".join(phone_list[:3])
-                    if len(phone_list) > 3:
-                        phones_text += f" (+{len(phone_list)-3} more)"
-                    pdf.cell(0, 6, phones_text, ln=True)
-            
-            tagline = item.get("tagline")
-            if tagline:
-                pdf.set_font('Arial', 'B', 10)
-                pdf.cell(30, 6, 'Tagline:', 0, 0)
-                pdf.set_font('Arial', '', 10)
-                tagline_text = sanitize_text_for_pdf(str(tagline))
-                if len(tagline_text) > 80:
-                    tagline_text = tagline_text[:80] + "..."
-                pdf.cell(0, 6, tagline_text, ln=True)
-            
-            description = item.get("description")
-            if description:
-                pdf.set_font('Arial', 'B', 10)
-                pdf.cell(30, 6, 'Description:', 0, 0)
-                pdf.set_font('Arial', '', 10)
-                desc_text = sanitize_text_for_pdf(str(description))
-                if len(desc_text) > 100:
-                    desc_text = desc_text[:100] + "..."
-                pdf.cell(0, 6, desc_text, ln=True)
-            
-            services = item.get("services", [])
-            if services and isinstance(services, list) and len(services) > 0:
-                pdf.set_font('Arial', 'B', 10)
-                pdf.cell(30, 6, 'Services:', 0, 0)
-                pdf.set_font('Arial', '', 10)
-                service_list = [sanitize_text_for_pdf(str(service)) for service in services if service]
-                services_text = ", ".join(service_list[:5])
-                if len(service_list) > 5:
-                    services_text += f" (+{len(service_list)-5} more)"
-                pdf.cell(0, 6, services_text, ln=True)
-            
-            social_media = item.get("social_media", {})
-            if social_media and isinstance(social_media, dict):
-                social_links = []
-                for platform, link in social_media.items():
-                    if link:
-                        clean_platform = sanitize_text_for_pdf(str(platform))
-                        social_links.append(clean_platform)
-                
-                if social_links:
-                    pdf.set_font('Arial', 'B', 10)
-                    pdf.cell(30, 6, 'Social:', 0, 0)
-                    pdf.set_font('Arial', '', 10)
-                    social_text = ", ".join(social_links[:3])
-                    if len(social_links) > 3:
-                        social_text += f" (+{len(social_links)-3} more)"
-                    pdf.cell(0, 6, social_text, ln=True)
-            
-            industry = item.get("industry")
-            if industry:
-                pdf.set_font('Arial', 'B', 10)
-                pdf.cell(30, 6, 'Industry:', 0, 0)
-                pdf.set_font('Arial', '', 10)
-                industry_text = sanitize_text_for_pdf(str(industry))
-                pdf.cell(0, 6, industry_text, ln=True)
-            
-            pdf.ln(5)
-        
-        pdf.output(str(pdf_path))
-        logger.info(f"PDF report generated successfully: {pdf_path}")
-        return str(pdf_path)
-        
+        async with new_async_client() as client:
+            # No more URLs than the crawl can fetch; the files share the crawl's rate for the host.
+            entries = await sitemap_urls(
+                client, url, max_urls=min(SCRAPER_SITEMAP_MAX_URLS, frontier.max_pages), rate=host_rate,
+                task_stats=cache.pool_stats,
+            )
     except Exception as e:
-        logger.error(f"Failed to generate PDF for task {task_id}: {str(e)}")
-        raise e
+        logger.warning(f"Sitemap discovery failed for {url}: {str(e)}")
+        return 0
+    # lastmod lets the disk cache answer for pages that have not changed since they were stored.
+    cache.note_modified(entries)
+    return frontier.add_sitemap(entries)
+
+async def _scrape_site(task_id, frontier, params, cache, writer, merger=None, changes=None, prints=None):
+    loop = asyncio.get_running_loop()
+    # Progress is written in batches rather than one INSERT per page.
+    progress = ProgressEvents(task_id, write=publish_events)
+    host_rate = SCRAPER_HOST_RATE if params.get("host_rate") is None else params["host_rate"]
+
+    async def report(type, data):
+        if progress.add(type, data):
+            await loop.run_in_executor(None, progress.flush)
+
+    if SCRAPER_SITEMAPS if params.get("use_sitemaps") is None else params["use_sitemaps"]:
+        added = await _seed_from_sitemaps(frontier, params["url"], cache, host_rate)
+        logger.info(f"Queued {added} URLs from sitemaps for task {task_id}")
+        await report("discovered", {"urls": frontier.discovered})
+    successful_extractions = 0
+    failed_extractions = 0
+
+    # Each pool size is a separate process pool; tasks never get more processes than configured.
+    workers = SCRAPER_EXTRACTION_WORKERS if params.get("extraction_workers") is None else params["extraction_workers"]
+    stage = ExtractionStage(
+        workers=min(workers, SCRAPER_EXTRACTION_WORKERS),
+        parser=cache.parser,
+        fingerprints=changes is not None,
+    )
+
+    async def flush_records():
+        if await loop.run_in_executor(None, writer.flush):
+            await report("records", {"count": writer.written})
+
+    async def submit_page(url, page_url, page_index, html):
+        load_document = partial(cache.document, page_url, html)
+        if changes is None:
+            await stage.submit((url, page_url, page_index, html, None), html, url, load_document=load_document)
+            return
+        page_hash = content_hash(html)
+        previous = changes.get(page_url)
+        if previous is not None and previous.content_hash == page_hash:
+            # The same bytes as last time: nothing to parse or extract.
+            await handle_result((url, page_url, page_index, html, page_hash), (None, previous.next_url, previous.fingerprint), None)
+            return
+        await stage.submit(
+            (url, page_url, page_index, html, page_hash), html, url, load_document=load_document,
+            previous_fingerprint=previous.fingerprint if previous is not None else None,
+        )
+
+    async def handle_result(tag, result, error):
+        nonlocal successful_extractions, failed_extractions
+        url, page_url, page_index, html, page_hash = tag
+        # Extraction strips script/style tags, so the tree is not reusable.
+        cache.release(page_url)
+
+        if error is not None:
+            logger.error(f"Data extraction failed for {url} (page {page_index}): {str(error)}")
+            failed_extractions += 1
+            return
+
+        reused = False
+        if changes is None:
+            data, next_url = result
+        else:
+            data, next_url, fingerprint = result
+            reused = data is None
+            kind = changes.record(page_url, unchanged=reused)
+            logger.debug(f"Page {page_url} is {kind} since task {changes.previous_task_id}")
+            if reused:
+                # Unchanged since the previous task: reuse the record extracted then.
+                previous = changes.get(page_url).data
+                data = dict(previous) if previous else None
+        if data and any(data.values()):
+            # Add metadata
+            if not reused:
+                data["extracted_at"] = datetime.now().isoformat()
+            data["page_number"] = page_index
+            data["task_id"] = task_id
+
+            successful_extractions += 1
+            logger.info(f"Successfully extracted data from {url} (page {page_index})")
+            if merger is not None:
+                # Merged records are written once the crawl is done; report how many companies so far.
+                if merger.add(data):
+                    await report("records", {"count": len(merger)})
+            elif writer.add(data):
+                await flush_records()
+        else:
+            logger.warning(f"No meaningful data extracted from {url} (page {page_index})")
+            failed_extractions += 1
+            data = None
+
+        if prints is not None and prints.add(page_url, PagePrint(page_hash, fingerprint, next_url, data)):
+            await loop.run_in_executor(None, prints.flush)
+
+    # Pagination pages come through the crawl like any other page; their content is
+    # checked per listing because sites often answer past-the-end pages with an earlier one.
+    listing_digests = {}
+    pages = crawl(
+        frontier=frontier,
+        max_concurrency=params.get("max_concurrency") or SCRAPER_MAX_CONCURRENCY,
+        per_host_limit=params.get("per_host_limit") or SCRAPER_PER_HOST_LIMIT,
+        cache=cache,
+        host_rate=host_rate,
+    )
+    url_index = 0
+    discovered = 0
+    async for url, html in pages:
+        if task_id in _abandoned:
+            raise TaskAbandoned(f"Task {task_id} was requeued to another worker")
+        url_index += 1
+        listing_url, page_index = frontier.page_of(url)
+        logger.info(f"Processing URL {url_index}/{frontier.discovered}: {url}")
+        if frontier.discovered != discovered:
+            discovered = frontier.discovered
+            await report("discovered", {"urls": discovered})
+        await report("page", {"url": url, "page_number": page_index, "ok": html is not None})
+        if html is None:
+            logger.error(f"Failed to fetch {url}")
+            failed_extractions += 1
+            continue
+        digests = listing_digests.setdefault(listing_url, set())
+        digest = hashlib.sha1(html.encode()).digest()
+        if digest in digests:
+            logger.debug(f"Page {url} repeats an earlier page of {listing_url}, skipping it")
+            continue
+        digests.add(digest)
+
+        # Blocks while the extraction queue is full, which pauses the crawler.
+        await submit_page(listing_url, url, page_index, html)
+        for done in stage.completed():
+            await handle_result(*done)
+
+    async for done in stage.results():
+        await handle_result(*done)
+    if merger is not None:
+        await loop.run_in_executor(None, _add_merged, writer, merger)
+        logger.info(f"Merged {merger.added} page records into {len(merger)} for task {task_id}")
+    await flush_records()
+    await loop.run_in_executor(None, progress.flush)
+    if prints is not None:
+        await loop.run_in_executor(None, prints.flush)
+
+    return successful_extractions, failed_extractions
+
+def _add_merged(writer, merger):
+    for record in merger.records():
+        if writer.add(record):
+            writer.flush()
 
 def run_scraper(task_id, params):
     db = SessionLocal()
     task = None
+    writer = None
+    merger = None
+    changes = None
+    prints = None
+    worker_id = None
     final_status = "failed"
     
     try:
@@ -203,122 +231,99 @@ def run_scraper(task_id, params):
             logger.error(f"Task {task_id} not found")
             return
             
+        worker_id = task.worker_id
         task.status = "running"
         db.commit()
+        publish(task_id, "status", {"status": "running"})
         logger.info(f"Starting scraping task {task_id} for URL: {params['url']}")
         
-        successful_extractions = 0
-        failed_extractions = 0
-        all_data = []
+        cache = PageCache(parser=params.get("parser"), http_cache=get_http_cache())
+        # Links are discovered as pages are fetched, breadth-first from the start URL.
+        frontier = Frontier(
+            [params["url"]],
+            max_depth=SCRAPER_CRAWL_MAX_DEPTH if params.get("max_depth") is None else params["max_depth"],
+            max_pages=params.get("max_pages") or SCRAPER_CRAWL_MAX_PAGES,
+        )
+        publish(task_id, "discovered", {"urls": frontier.discovered})
         
-        try:
-            urls = discover_urls(params["url"])
-            logger.info(f"Discovered {len(urls)} URLs to scrape for task {task_id}")
-        except Exception as e:
-            logger.error(f"URL discovery failed for task {task_id}: {str(e)}")
-            urls = [params["url"]]
+        # Records are saved in batches while the crawl runs, so a crash keeps what was extracted.
+        writer = ResultWriter(task_id, check_owner=True, worker_id=worker_id)
+        writer.reset()
+        # Pages of one company repeat its name, contacts and links; they are merged into one record.
+        if SCRAPER_MERGE_RECORDS if params.get("merge_records") is None else params["merge_records"]:
+            merger = RecordMerger()
+        if SCRAPER_INCREMENTAL if params.get("incremental") is None else params["incremental"]:
+            # Pages whose content matches the previous task's reuse its records instead of extracting again.
+            previous_id = params.get("previous_task_id") or previous_task_id(params["url"], task_id)
+            changes = ChangeTracker(load_fingerprints(previous_id) if previous_id else {}, previous_id)
+            delete_fingerprints(task_id)
+            prints = FingerprintWriter(task_id)
+            logger.info(f"Incremental scrape of task {task_id} against task {previous_id}: {len(changes.previous)} known pages")
+        successful_extractions, failed_extractions = asyncio.run(
+            _scrape_site(task_id, frontier, params, cache, writer, merger, changes, prints)
+        )
         
-        for url_index, url in enumerate(urls, 1):
-            try:
-                logger.info(f"Processing URL {url_index}/{len(urls)}: {url}")
-                
-                try:
-                    html = handle_dynamic(url)
-                    logger.debug(f"Successfully loaded dynamic content for {url}")
-                except Exception as e:
-                    logger.warning(f"Dynamic content loading failed for {url}: {str(e)}")
-                    import requests
-                    try:
-                        response = requests.get(url, timeout=10, headers={
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                        })
-                        html = response.text
-                    except Exception as req_e:
-                        logger.error(f"Requests fallback also failed for {url}: {str(req_e)}")
-                        failed_extractions += 1
-                        continue
-                
-                try:
-                    paginated_htmls = handle_pagination(html, url)
-                    logger.debug(f"Found {len(paginated_htmls)} pages for {url}")
-                except Exception as e:
-                    logger.warning(f"Pagination handling failed for {url}: {str(e)}")
-                    paginated_htmls = [html] 
-                
-                for page_index, page_html in enumerate(paginated_htmls, 1):
-                    try:
-                        data = extract_data(page_html, url)
-                        
-                        if data and any(data.values()):
-                            # Add metadata
-                            data["extracted_at"] = datetime.now().isoformat()
-                            data["page_number"] = page_index
-                            data["task_id"] = task_id
-                            
-                            all_data.append(data)
-                            successful_extractions += 1
-                            logger.info(f"Successfully extracted data from {url} (page {page_index})")
-                        else:
-                            logger.warning(f"No meaningful data extracted from {url} (page {page_index})")
-                            failed_extractions += 1
-                            
-                    except Exception as e:
-                        logger.error(f"Data extraction failed for {url} (page {page_index}): {str(e)}")
-                        failed_extractions += 1
-                        continue
-                        
-            except Exception as e:
-                logger.error(f"Failed to process URL {url}: {str(e)}")
-                failed_extractions += 1
-                continue
+        cache_summary = cache.summary()
+        logger.info(
+            f"Scraping completed. Successful: {successful_extractions}, Failed: {failed_extractions}, "
+            f"Avoided fetches: {cache_summary['avoided_fetches']}, Avoided parses: {cache_summary['avoided_parses']}"
+        )
+        logger.info(f"Crawl frontier stats for task {task_id}: {frontier.stats()}")
+        logger.info(f"HTTP pool stats for task {task_id}: {cache_summary['pool']}")
+        logger.info(f"HTTP cache stats for task {task_id}: {cache_summary['http_cache']}")
+        publish(task_id, "cache", cache_summary["http_cache"])
+        logger.info(f"Render detection stats for task {task_id}: {cache_summary['render']}")
+        values = {"stats": cache_summary}
+        if changes is not None:
+            values["changes"] = changes.summary()
+            logger.info(f"Page changes for task {task_id}: {values['changes']}")
+            publish(task_id, "changes", values["changes"])
         
-        logger.info(f"Scraping completed. Successful: {successful_extractions}, Failed: {failed_extractions}")
-        
-        if all_data:
-            try:
-                result = ScrapeResult(task_id=task_id, data=all_data)
-                db.add(result)
-                db.commit()
-                logger.info(f"Successfully saved {len(all_data)} records for task {task_id}")
-                try:
-                    logger.info(f"Generating PDF report for task {task_id}")
-                    pdf_path = generate_pdf_report(task_id, all_data)
-                    logger.info(f"PDF report generated successfully: {pdf_path}")
-                    task.pdf_path = pdf_path
-                    task.status = "completed"
-                    final_status = "completed"
-                    db.commit()
-                    
-                except Exception as e:
-                    logger.error(f"PDF generation failed for task {task_id}: {str(e)}")
-                    task.status = "completed"
-                    final_status = "completed"
-                    db.commit()
-                
-            except Exception as e:
-                logger.error(f"Failed to save results for task {task_id}: {str(e)}")
-                task.status = "failed"
-                final_status = "failed"
-                db.commit()
+        if writer.written:
+            logger.info(f"Successfully saved {writer.written} records for task {task_id}")
+            # Workers render the PDF as a separate stage; the task does not wait for it.
+            final_status = "completed"
+            if not _settle(db, task_id, worker_id, status="completed", report_status="pending", **values):
+                raise TaskAbandoned(f"Task {task_id} was requeued to another worker")
+            publish(task_id, "report", {"ready": False, "status": "pending"})
+            if changes is not None and changes.previous_task_id:
+                # The next re-scrape compares against this task's pages.
+                delete_fingerprints(changes.previous_task_id)
                 
         else:
             logger.warning(f"No data extracted for task {task_id}")
-            task.status = "failed"
             final_status = "failed"
-            db.commit()
+            if not _settle(db, task_id, worker_id, status="failed", **values):
+                raise TaskAbandoned(f"Task {task_id} was requeued to another worker")
             
+    except TaskAbandoned as e:
+        # The new owner starts over; nothing of this run is saved or reported.
+        logger.warning(f"{str(e)}; abandoning this run")
+        final_status = None
     except Exception as e:
         logger.error(f"Critical error in scraping task {task_id}: {str(e)}")
         try:
+            if writer:
+                # Keep the records extracted before the failure.
+                if merger is not None and not writer.written:
+                    _add_merged(writer, merger)
+                writer.flush()
             if task:
-                task.status = "failed"
                 final_status = "failed"
-                db.commit()
+                db.rollback()
+                if not _settle(db, task_id, worker_id, status="failed"):
+                    final_status = None
+        except TaskAbandoned as abandoned:
+            logger.warning(f"{str(abandoned)}; abandoning this run")
+            final_status = None
         except Exception as db_e:
             logger.error(f"Failed to update task status: {str(db_e)}")
                 
     finally:
+        _abandoned.discard(task_id)
         logger.info(f"Scraping task {task_id} completed with status: {final_status}")
+        if task and final_status is not None:
+            publish(task_id, "status", {"status": final_status, "records": writer.written if writer else 0})
         try:
             db.close()
         except Exception as close_e:
@@ -0,0 +1,145 @@
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.config import SCRAPER_EXTRACTION_QUEUE_SIZE, SCRAPER_EXTRACTION_WORKERS
+from app.scraper.extractors import build_page, extract_data, page_fingerprint
+from app.scraper.pagination import next_page_url
+from app.scraper.parsers import parse_document
+
+def extract_page(html: str, url: str, parser: Optional[str] = None, document=None) -> Tuple[Dict, Optional[str]]:
+    """Extract one page and find its "next" link from the same parse."""
+    if document is None:
+        document = parse_document(html, parser)
+    next_url = next_page_url(document, url)
+    return extract_data(html, url, document=document), next_url
+
+def extract_changed_page(
+    html: str, url: str, parser: Optional[str] = None, document=None, previous_fingerprint: Optional[str] = None
+) -> Tuple[Optional[Dict], Optional[str], str]:
+    """Like extract_page, plus the page's fingerprint; the data is None if it equals ``previous_fingerprint``."""
+    if document is None:
+        document = parse_document(html, parser)
+    next_url = next_page_url(document, url)
+    page = build_page(document)
+    fingerprint = page_fingerprint(page)
+    if fingerprint == previous_fingerprint:
+        return None, next_url, fingerprint
+    return extract_data(html, url, page=page), next_url, fingerprint
+
+def _extract_loaded(html: str, url: str, parser: Optional[str], load_document: Optional[Callable]):
+    return extract_page(html, url, parser, load_document() if load_document else None)
+
+def _extract_loaded_changed(html, url, parser, load_document, previous_fingerprint):
+    return extract_changed_page(html, url, parser, load_document() if load_document else None, previous_fingerprint)
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn: forking a process that already runs uvicorn and worker threads is unsafe.
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+def discard_process_pool(pool: ProcessPoolExecutor):
+    with _pools_lock:
+        for workers, existing in list(_pools.items()):
+            if existing is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+atexit.register(shutdown_pools)
+
+class ExtractionStage:
+    """Runs extract_page off the event loop and hands results back in completion order.
+
+    At most ``max_pending`` pages are queued or running at once; ``submit``
+    waits for a free slot, which in turn stops the caller pulling more pages
+    from the crawler. With ``fingerprints``, pages run through
+    extract_changed_page instead and results are ``(data, next_url, fingerprint)``.
+    """
+
+    def __init__(
+        self,
+        workers: int = SCRAPER_EXTRACTION_WORKERS,
+        max_pending: int = SCRAPER_EXTRACTION_QUEUE_SIZE,
+        parser: Optional[str] = None,
+        fingerprints: bool = False,
+    ):
+        self.workers = max(0, workers)
+        self.fingerprints = fingerprints
+        self.max_pending = max_pending if max_pending > 0 else max(1, self.workers) * 2
+        self.parser = parser
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._done: asyncio.Queue = asyncio.Queue()
+        self.pending = 0
+        self.max_in_flight = 0
+
+    async def submit(
+        self, tag: Any, html: str, url: str, load_document: Optional[Callable] = None,
+        previous_fingerprint: Optional[str] = None,
+    ):
+        """Queue a page; ``load_document`` supplies an already parsed tree when running in-process."""
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        if self.workers:
+            if self.fingerprints:
+                job = partial(extract_changed_page, html, url, self.parser, previous_fingerprint=previous_fingerprint)
+            else:
+                job = partial(extract_page, html, url, self.parser)
+            pool = get_process_pool(self.workers)
+            try:
+                future = loop.run_in_executor(pool, job)
+            except BrokenProcessPool:
+                discard_process_pool(pool)
+                future = loop.run_in_executor(get_process_pool(self.workers), job)
+        elif self.fingerprints:
+            future = loop.run_in_executor(
+                None, _extract_loaded_changed, html, url, self.parser, load_document, previous_fingerprint
+            )
+        else:
+            future = loop.run_in_executor(None, _extract_loaded, html, url, self.parser, load_document)
+        self.pending += 1
+        self.max_in_flight = max(self.max_in_flight, self.pending)
+        future.add_done_callback(partial(self._finished, tag))
+
+    def _finished(self, tag: Any, future: asyncio.Future):
+        self.pending -= 1
+        self._slots.release()
+        if future.cancelled():
+            self._done.put_nowait((tag, None, asyncio.CancelledError()))
+        elif future.exception() is not None:
+            if isinstance(future.exception(), BrokenProcessPool):
+                # A crashed worker poisons the whole executor; start fresh for later pages.
+                with _pools_lock:
+                    broken = _pools.pop(self.workers, None)
+                if broken is not None:
+                    broken.shutdown(wait=False, cancel_futures=True)
+            self._done.put_nowait((tag, None, future.exception()))
+        else:
+            self._done.put_nowait((tag, future.result(), None))
+
+    def completed(self) -> List[Tuple[Any, Optional[Tuple[Dict, Optional[str]]], Optional[BaseException]]]:
+        results = []
+        while not self._done.empty():
+            results.append(self._done.get_nowait())
+        return results
+
+    async def results(self) -> AsyncIterator[Tuple[Any, Optional[Tuple[Dict, Optional[str]]], Optional[BaseException]]]:
+        while self.pending or not self._done.empty():
+            yield await self._done.get()
@@ -1,9 +1,13 @@
-
+import hashlib
 import re
-from bs4 import BeautifulSoup
+from collections import defaultdict
+from bs4 import BeautifulSoup, Tag
+from cssselect import HTMLTranslator
+from lxml import etree
 from urllib.parse import urljoin, urlparse
-import requests
 from typing import List, Dict, Optional, Set
+from app.scraper.phones import find_phones
+from app.scraper.parsers import LxmlNode, TEXT_XPATH, is_lxml_document, parse_document
 
 class EnhancedDataExtractor:
     def __init__(self):
@@ -11,13 +15,6 @@ class EnhancedDataExtractor:
             r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
         )
 
-        self.phone_patterns = [
-            re.compile(r'\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})'),  # US format
-            re.compile(r'\+?[0-9]{1,4}[-.\s]?\(?[0-9]{1,4}\)?[-.\s]?[0-9]{1,4}[-.\s]?[0-9]{1,4}'),  # General
-            re.compile(r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b'),  # Simple US
-            re.compile(r'\(\d{3}\)\s?\d{3}[-.\s]?\d{4}')  # (123) 456-7890
-        ]
-
         self.social_patterns = {
             'linkedin': re.compile(r'linkedin\.com/(?:in|company)/([^/\s]+)', re.IGNORECASE),
             'twitter': re.compile(r'twitter\.com/([^/\s]+)', re.IGNORECASE),
@@ -25,68 +22,340 @@ class EnhancedDataExtractor:
             'instagram': re.compile(r'instagram\.com/([^/\s]+)', re.IGNORECASE)
         }
 
-def extract_data(html: str, url: str) -> Dict:
-    extractor = EnhancedDataExtractor()
-    soup = BeautifulSoup(html, "html.parser")
-
-    for script in soup(["script", "style"]):
-        script.decompose()
-
-    text = soup.get_text()
+# Compiled once at import; extract_data used to rebuild this for every page.
+EXTRACTOR = EnhancedDataExtractor()
+
+ADDRESS_PATTERN = re.compile(r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Road|Nagar|Rasta|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Place|Pl)(?:,\s*[A-Za-z\s]+)*,\s*[A-Z]{2}\s+\d{5}', re.IGNORECASE)
+ABOUT_HEADER_PATTERN = re.compile(r'about|who we are|our story', re.IGNORECASE)
+
+EMAIL_PLACEHOLDERS = ['example', 'test', 'dummy', 'placeholder', 'yourname']
+CONTACT_KEYWORDS = ['contact', 'about', 'reach', 'connect', 'get in touch']
+SERVICE_KEYWORDS = ['service', 'offering', 'product', 'solution']
+TITLE_SEPARATORS = [' | ', ' - ', ' – ', ' :: ']
+INDUSTRIES = [
+    'technology', 'healthcare', 'finance', 'education', 'retail',
+    'manufacturing', 'consulting', 'marketing', 'real estate',
+    'construction', 'automotive', 'food', 'travel', 'entertainment',
+    'software', 'hardware', 'services', 'e-commerce', 'nonprofit'
+]
+
+REMOVED_TAGS = {'script', 'style'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+SELECTOR_PART_PATTERN = re.compile(
+    r'^(?P<tag>[a-z][a-z0-9]*)?(?:\.(?P<cls>[\w-]+))?'
+    r'(?:\[(?P<attr>[\w-]+)(?P<op>\*?=)"(?P<value>[^"]+)"\])?$'
+)
+
+def _attr_text(value) -> str:
+    return value if isinstance(value, str) else ' '.join(value)
+
+class _Compound:
+    """A single compound selector such as ``p.lead`` or ``[class*="brand"]``."""
+
+    def __init__(self, tag=None, cls=None, attr=None, op=None, value=None, css=None):
+        self.css = css
+        self.tag = tag
+        self.cls = cls
+        self.attr = attr
+        self.op = op
+        self.value = value
+
+    def matches(self, element) -> bool:
+        if self.tag and element.name != self.tag:
+            return False
+        if self.cls:
+            classes = element.attrs.get('class')
+            if not classes:
+                return False
+            if isinstance(classes, str):
+                classes = classes.split()
+            if self.cls not in classes:
+                return False
+        if self.attr:
+            value = element.attrs.get(self.attr)
+            if value is None:
+                return False
+            value = _attr_text(value)
+            if self.op == '=':
+                return value == self.value
+            return self.value in value
+        return True
+
+    def candidates(self, page):
+        if self.cls:
+            return page.classes.get(self.cls, ())
+        if self.attr:
+            return page.attrs.get(self.attr, ())
+        return page.tags.get(self.tag, ())
+
+    def select(self, page):
+        for element in self.candidates(page):
+            if self.matches(element):
+                yield element
+
+class _Descendant:
+    def __init__(self, ancestor: _Compound, target: _Compound, css: str):
+        self.css = css
+        self.ancestor = ancestor
+        self.target = target
+
+    def select(self, page):
+        for element in self.target.select(page):
+            parent = element.parent
+            while parent is not None:
+                if self.ancestor.matches(parent):
+                    yield element
+                    break
+                parent = parent.parent
+
+class _SoupSelector:
+    """Fallback for selectors the page index cannot answer."""
+
+    def __init__(self, selector: str):
+        self.css = selector
+
+    def select(self, page):
+        return iter(page.soup.select(self.css))
+
+def compile_selector(selector: str):
+    parts = []
+    for part in selector.split():
+        match = SELECTOR_PART_PATTERN.match(part)
+        if not match or not any(match.group('tag', 'cls', 'attr')):
+            return _SoupSelector(selector)
+        parts.append(_Compound(css=part, **match.groupdict()))
+    if len(parts) == 1:
+        return parts[0]
+    if len(parts) == 2:
+        return _Descendant(*parts, css=selector)
+    return _SoupSelector(selector)
+
+def _compile_all(selectors: List[str]) -> List:
+    return [(selector, compile_selector(selector)) for selector in selectors]
+
+COMPANY_SELECTORS = _compile_all([
+    'h1', '.company-name', '.org-title', '.company-title',
+    '[data-testid*="company"]', '.business-name', '.brand-name',
+    '.site-title', '.logo-text', 'title', '.header-title',
+    '.hero-title', '.main-title', '[class*="company"]',
+    '[class*="brand"]', '[id*="company"]'
+])
+TAGLINE_SELECTORS = _compile_all([
+    '.tagline', '.slogan', '.subtitle', '.hero-subtitle',
+    '.lead', '.description', '.intro', 'p.lead',
+    '.hero-description', '[class*="tagline"]', '[class*="slogan"]',
+    'meta[name="description"]', 'meta[property="og:description"]'
+])
+SERVICE_SELECTORS = _compile_all([
+    '.services li', '.offerings li', '.products li',
+    '.features li', '[class*="service"] li', '[class*="product"] li',
+    '.what-we-do li', '.our-services li', '.capabilities li'
+])
+ADDRESS_SELECTORS = _compile_all([
+    '.address', '.location', '.contact-address',
+    '[itemtype*="PostalAddress"]', '.postal-address',
+    '[class*="address"]', '[class*="location"]'
+])
+OG_SITE_NAME_SELECTOR = compile_selector('meta[property="og:site_name"]')
+TITLE_SELECTOR = compile_selector('title')
+META_DESCRIPTION_SELECTOR = compile_selector('meta[name="description"]')
+
+def _compounds(selector) -> List[_Compound]:
+    if isinstance(selector, _Descendant):
+        return [selector.ancestor, selector.target]
+    if isinstance(selector, _Compound):
+        return [selector]
+    return []
+
+INDEXED_ATTRS = {
+    compound.attr
+    for group in (COMPANY_SELECTORS, TAGLINE_SELECTORS, SERVICE_SELECTORS, ADDRESS_SELECTORS)
+    for _, selector in group
+    for compound in _compounds(selector)
+    if compound.attr
+} | {OG_SITE_NAME_SELECTOR.attr, META_DESCRIPTION_SELECTOR.attr}
+
+class _XPathSelector:
+    def __init__(self, css: str):
+        xpath = HTMLTranslator().css_to_xpath(css)
+        self.all = etree.XPath(xpath)
+        self.first = etree.XPath(f"({xpath})[1]")
+
+_XPATH_SELECTORS: Dict[str, _XPathSelector] = {}
+
+def _xpath_selector(selector) -> _XPathSelector:
+    compiled = _XPATH_SELECTORS.get(selector.css)
+    if compiled is None:
+        compiled = _XPATH_SELECTORS.setdefault(selector.css, _XPathSelector(selector.css))
+    return compiled
+
+for _group in (COMPANY_SELECTORS, TAGLINE_SELECTORS, SERVICE_SELECTORS, ADDRESS_SELECTORS):
+    for _, _selector in _group:
+        _xpath_selector(_selector)
+for _selector in (OG_SITE_NAME_SELECTOR, TITLE_SELECTOR, META_DESCRIPTION_SELECTOR):
+    _xpath_selector(_selector)
+
+class PageIndex:
+    """Everything the field extractors need, collected in one walk of the tree.
+
+    ``script`` and ``style`` elements are skipped by the walk and decomposed
+    afterwards, so the index and ``text`` match the tree ``extract_data`` used
+    to see after stripping them.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.tags = defaultdict(list)
+        self.classes = defaultdict(list)
+        self.attrs = defaultdict(list)
+        self.headings = []
+        self.anchors = []
+
+        removed = []
+        removed_ids = set()
+        strings = []
+        string_types = soup.interesting_string_types
+        single_type = isinstance(string_types, type)
+
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                if node.name in REMOVED_TAGS or id(node.parent) in removed_ids:
+                    if id(node.parent) not in removed_ids:
+                        removed.append(node)
+                    removed_ids.add(id(node))
+                    continue
+
+                name = node.name
+                self.tags[name].append(node)
+                if name in HEADING_TAGS:
+                    self.headings.append(node)
+
+                attrs = node.attrs
+                if not attrs:
+                    continue
+                if name == 'a' and attrs.get('href') is not None:
+                    self.anchors.append(node)
+                classes = attrs.get('class')
+                if classes:
+                    if isinstance(classes, str):
+                        classes = classes.split()
+                    for cls in dict.fromkeys(classes):
+                        self.classes[cls].append(node)
+                for attr in INDEXED_ATTRS:
+                    if attr in attrs:
+                        self.attrs[attr].append(node)
+            else:
+                node_type = type(node)
+                if single_type:
+                    if node_type is not string_types:
+                        continue
+                elif node_type not in string_types:
+                    continue
+                if id(node.parent) in removed_ids:
+                    continue
+                strings.append(node)
+
+        for element in removed:
+            element.decompose()
+
+        self.text = ''.join(strings)
+
+    def select_one(self, selector):
+        for element in selector.select(self):
+            return element
+        return None
+
+    def select(self, selector) -> List:
+        return list(selector.select(self))
+
+    def find_all(self, *names) -> List:
+        if len(names) == 1:
+            return self.tags.get(names[0], [])
+        return [heading for heading in self.headings if heading.name in names]
+
+class LxmlPage:
+    """Same interface as PageIndex over a raw lxml.html tree, with selectors compiled to XPath."""
+
+    def __init__(self, root):
+        etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+        self.root = root
+        self.text = ''.join(TEXT_XPATH(root))
+        self.anchors = [LxmlNode(a) for a in root.iter('a') if a.get('href') is not None]
+
+    def select_one(self, selector):
+        found = _xpath_selector(selector).first(self.root)
+        return LxmlNode(found[0]) if found else None
+
+    def select(self, selector) -> List:
+        return [LxmlNode(element) for element in _xpath_selector(selector).all(self.root)]
+
+    def find_all(self, *names) -> List:
+        return [LxmlNode(element) for element in self.root.iter(*names)]
+
+def build_page(document):
+    """The PageIndex (or LxmlPage) of a parsed document; strips its script and style elements."""
+    return LxmlPage(document) if is_lxml_document(document) else PageIndex(document)
+
+def page_fingerprint(page) -> str:
+    """Hash of what the extractors read: the page text, whitespace collapsed, and its link targets."""
+    digest = hashlib.sha1(" ".join(page.text.split()).encode())
+    for anchor in page.anchors:
+        digest.update(b"\0" + anchor['href'].encode())
+    return digest.hexdigest()
+
+def extract_data(html: str, url: str, document=None, parser: Optional[str] = None, page=None) -> Dict:
+    if page is None:
+        if document is None:
+            document = parse_document(html, parser)
+        page = build_page(document)
+    text = page.text
 
     return {
         "url": url,
-        "company": _extract_company_info(soup, text),
-        "contacts": _extract_contact_info(soup, text, extractor),
-        "tagline": _extract_tagline(soup, text),
-        "services": _extract_services(soup, text),
-        "social_media": _extract_social_media(soup, text, extractor),
-        "address": _extract_address(soup, text),
-        "description": _extract_description(soup, text),
-        "industry": _extract_industry(soup, text)
+        "company": _extract_company_info(page, text),
+        "contacts": _extract_contact_info(page, text, EXTRACTOR),
+        "tagline": _extract_tagline(page, text),
+        "services": _extract_services(page, text),
+        "social_media": _extract_social_media(page, text, EXTRACTOR),
+        "address": _extract_address(page, text),
+        "description": _extract_description(page, text),
+        "industry": _extract_industry(page, text)
     }
 
-def _extract_company_info(soup: BeautifulSoup, text: str) -> Optional[str]:
-    company_selectors = [
-        'h1', '.company-name', '.org-title', '.company-title',
-        '[data-testid*="company"]', '.business-name', '.brand-name',
-        '.site-title', '.logo-text', 'title', '.header-title',
-        '.hero-title', '.main-title', '[class*="company"]',
-        '[class*="brand"]', '[id*="company"]'
-    ]
-
-    for selector in company_selectors:
-        element = soup.select_one(selector)
+def _extract_company_info(page: PageIndex, text: str) -> Optional[str]:
+    for _, selector in COMPANY_SELECTORS:
+        element = page.select_one(selector)
         if element and element.text.strip():
             company_name = element.text.strip()
             if len(company_name) > 2 and len(company_name) < 100:
                 return company_name
 
-    meta_company = soup.select_one('meta[property="og:site_name"]')
+    meta_company = page.select_one(OG_SITE_NAME_SELECTOR)
     if meta_company:
         return meta_company.get('content', '').strip()
 
-    title_tag = soup.select_one('title')
+    title_tag = page.select_one(TITLE_SELECTOR)
     if title_tag:
         title_text = title_tag.text.strip()
-        for separator in [' | ', ' - ', ' – ', ' :: ']:
+        for separator in TITLE_SEPARATORS:
             if separator in title_text:
                 return title_text.split(separator)[0].strip()
 
     return None
 
-def _extract_contact_info(soup: BeautifulSoup, text: str, extractor: EnhancedDataExtractor) -> Dict:
+def _extract_contact_info(page: PageIndex, text: str, extractor: EnhancedDataExtractor) -> Dict:
     contacts = {
-        'emails': _extract_emails(soup, text, extractor),
-        'phones': _extract_phones(soup, text, extractor),
-        'contact_page': _find_contact_page_url(soup)
+        'emails': _extract_emails(page, text, extractor),
+        'phones': _extract_phones(page, text, extractor),
+        'contact_page': _find_contact_page_url(page)
     }
     return contacts
 
-def _extract_emails(soup: BeautifulSoup, text: str, extractor: EnhancedDataExtractor) -> List[str]:
+def _extract_emails(page: PageIndex, text: str, extractor: EnhancedDataExtractor) -> List[str]:
     emails = set()
 
-    for link in soup.find_all('a', href=True):
+    for link in page.anchors:
         href = link['href']
         if href.startswith('mailto:'):
             email = href.replace('mailto:', '').split('?')[0]
@@ -98,76 +367,41 @@ def _extract_emails(soup: BeautifulSoup, text: str, extractor: EnhancedDataExtra
     valid_emails = []
     for email in emails:
         if '@' in email and '.' in email.split('@')[1]:
-            if not any(placeholder in email.lower() for placeholder in 
-                      ['example', 'test', 'dummy', 'placeholder', 'yourname']):
+            if not any(placeholder in email.lower() for placeholder in EMAIL_PLACEHOLDERS):
                 valid_emails.append(email)
 
     return list(set(valid_emails))
 
-def _extract_phones(soup: BeautifulSoup, text: str, extractor: EnhancedDataExtractor) -> List[str]:
-    phones = set()
-
-    for link in soup.find_all('a', href=True):
-        href = link['href']
-        if href.startswith('tel:'):
-            phone = href.replace('tel:', '')
-            phones.add(phone)
-
-    for pattern in extractor.phone_patterns:
-        matches = pattern.findall(text)
-        for match in matches:
-            if isinstance(match, tuple):
-                phone = ''.join(match)
-            else:
-                phone = match
-            phones.add(phone)
-
-    valid_phones = []
-    for phone in phones:
-        try:
-            cleaned = re.sub(r'[^\d+]', '', phone)
-            if len(cleaned) >= 10 and len(cleaned) <= 15:
-                valid_phones.append(phone)
-        except:
-            continue
+def _extract_phones(page: PageIndex, text: str, extractor: EnhancedDataExtractor) -> List[str]:
+    tel_links = [link['href'][4:] for link in page.anchors if link['href'].startswith('tel:')]
+    return find_phones(text, tel_links)
 
-    return list(set(valid_phones))
-
-def _find_contact_page_url(soup: BeautifulSoup) -> Optional[str]:
-    contact_keywords = ['contact', 'about', 'reach', 'connect', 'get in touch']
-
-    for link in soup.find_all('a', href=True):
+def _find_contact_page_url(page: PageIndex) -> Optional[str]:
+    for link in page.anchors:
         link_text = link.text.lower().strip()
         href = link['href']
 
-        if any(keyword in link_text for keyword in contact_keywords):
+        if any(keyword in link_text for keyword in CONTACT_KEYWORDS):
             return href
 
     return None
 
-def _extract_tagline(soup: BeautifulSoup, text: str) -> Optional[str]:
-    tagline_selectors = [
-        '.tagline', '.slogan', '.subtitle', '.hero-subtitle',
-        '.lead', '.description', '.intro', 'p.lead',
-        '.hero-description', '[class*="tagline"]', '[class*="slogan"]',
-        'meta[name="description"]', 'meta[property="og:description"]'
-    ]
-
-    for selector in tagline_selectors:
-        if selector.startswith('meta'):
-            element = soup.select_one(selector)
+def _extract_tagline(page: PageIndex, text: str) -> Optional[str]:
+    for selector_text, selector in TAGLINE_SELECTORS:
+        if selector_text.startswith('meta'):
+            element = page.select_one(selector)
             if element:
                 content = element.get('content', '').strip()
                 if 20 <= len(content) <= 200:
                     return content
         else:
-            element = soup.select_one(selector)
+            element = page.select_one(selector)
             if element and element.text.strip():
                 tagline = element.text.strip()
                 if 10 <= len(tagline) <= 200:
                     return tagline
 
-    paragraphs = soup.find_all('p')
+    paragraphs = page.find_all('p')
     for p in paragraphs[:3]:
         text = p.text.strip()
         if 20 <= len(text) <= 150 and not text.startswith(('The', 'This', 'Our')):
@@ -175,26 +409,20 @@ def _extract_tagline(soup: BeautifulSoup, text: str) -> Optional[str]:
 
     return None
 
-def _extract_services(soup: BeautifulSoup, text: str) -> List[str]:
+def _extract_services(page: PageIndex, text: str) -> List[str]:
     services = set()
 
-    service_selectors = [
-        '.services li', '.offerings li', '.products li',
-        '.features li', '[class*="service"] li', '[class*="product"] li',
-        '.what-we-do li', '.our-services li', '.capabilities li'
-    ]
-
-    for selector in service_selectors:
-        elements = soup.select(selector)
+    for _, selector in SERVICE_SELECTORS:
+        elements = page.select(selector)
         for element in elements:
             service_text = element.text.strip()
             if 3 <= len(service_text) <= 100:
                 services.add(service_text)
 
-    headers = soup.find_all(['h2', 'h3', 'h4'])
+    headers = page.find_all('h2', 'h3', 'h4')
     for header in headers:
         text = header.text.strip().lower()
-        if any(keyword in text for keyword in ['service', 'offering', 'product', 'solution']):
+        if any(keyword in text for keyword in SERVICE_KEYWORDS):
             next_elem = header.find_next_sibling(['ul', 'ol', 'div'])
             if next_elem:
                 items = next_elem.find_all('li') or next_elem.find_all('p')
@@ -205,10 +433,10 @@ def _extract_services(soup: BeautifulSoup, text: str) -> List[str]:
 
     return list(services)[:10]
 
-def _extract_social_media(soup: BeautifulSoup, text: str, extractor: EnhancedDataExtractor) -> Dict[str, str]:
+def _extract_social_media(page: PageIndex, text: str, extractor: EnhancedDataExtractor) -> Dict[str, str]:
     social_media = {}
 
-    for link in soup.find_all('a', href=True):
+    for link in page.anchors:
         href = link['href']
         for platform, pattern in extractor.social_patterns.items():
             match = pattern.search(href)
@@ -218,35 +446,31 @@ def _extract_social_media(soup: BeautifulSoup, text: str, extractor: EnhancedDat
 
     return social_media
 
-def _extract_address(soup: BeautifulSoup, text: str) -> Optional[str]:
-    address_selectors = [
-        '.address', '.location', '.contact-address',
-        '[itemtype*="PostalAddress"]', '.postal-address',
-        '[class*="address"]', '[class*="location"]'
-    ]
-
-    for selector in address_selectors:
-        element = soup.select_one(selector)
+def _extract_address(page: PageIndex, text: str) -> Optional[str]:
+    for _, selector in ADDRESS_SELECTORS:
+        element = page.select_one(selector)
         if element:
             address_text = element.text.strip()
             if len(address_text) > 10:
                 return address_text
 
-    address_pattern = re.compile(r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Road|Nagar|Rasta|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Place|Pl)(?:,\s*[A-Za-z\s]+)*,\s*[A-Z]{2}\s+\d{5}', re.IGNORECASE)
-    match = address_pattern.search(text)
+    match = ADDRESS_PATTERN.search(text)
     if match:
         return match.group(0)
 
     return None
 
-def _extract_description(soup: BeautifulSoup, text: str) -> Optional[str]:
-    meta_desc = soup.select_one('meta[name="description"]')
+def _extract_description(page: PageIndex, text: str) -> Optional[str]:
+    meta_desc = page.select_one(META_DESCRIPTION_SELECTOR)
     if meta_desc:
         desc = meta_desc.get('content', '').strip()
         if 50 <= len(desc) <= 500:
             return desc
 
-    about_headers = soup.find_all(['h1', 'h2', 'h3'], string=re.compile(r'about|who we are|our story', re.IGNORECASE))
+    about_headers = [
+        header for header in page.find_all('h1', 'h2', 'h3')
+        if header.string is not None and ABOUT_HEADER_PATTERN.search(header.string)
+    ]
     for header in about_headers:
         next_elem = header.find_next(['p', 'div'])
         if next_elem:
@@ -256,16 +480,9 @@ def _extract_description(soup: BeautifulSoup, text: str) -> Optional[str]:
 
     return None
 
-def _extract_industry(soup: BeautifulSoup, text: str) -> Optional[str]:
-    industries = [
-        'technology', 'healthcare', 'finance', 'education', 'retail',
-        'manufacturing', 'consulting', 'marketing', 'real estate',
-        'construction', 'automotive', 'food', 'travel', 'entertainment',
-        'software', 'hardware', 'services', 'e-commerce', 'nonprofit'
-    ]
-
+def _extract_industry(page: PageIndex, text: str) -> Optional[str]:
     text_lower = text.lower()
-    for industry in industries:
+    for industry in INDUSTRIES:
         if industry in text_lower:
             return industry.title()
 
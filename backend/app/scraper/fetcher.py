@@ -0,0 +1,144 @@
+import importlib.util
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import (
+    SCRAPER_POOL_KEEPALIVE_EXPIRY,
+    SCRAPER_POOL_MAX_CONNECTIONS,
+    SCRAPER_POOL_MAX_KEEPALIVE,
+    SCRAPER_REQUEST_TIMEOUT,
+    SCRAPER_USER_AGENT,
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': SCRAPER_USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class PoolStats:
+    COUNTERS = ("requests", "connection_hits", "new_connections", "bytes_received", "http2_responses")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._connections = weakref.WeakSet()
+            self._connection_ids = set()
+            self.requests = 0
+            self.connection_hits = 0
+            self.new_connections = 0
+            self.bytes_received = 0
+            self.http2_responses = 0
+
+    def record(self, response: httpx.Response):
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += response.num_bytes_downloaded
+            if response.http_version == "HTTP/2":
+                self.http2_responses += 1
+            if stream is None:
+                return
+            if self._seen(stream):
+                self.connection_hits += 1
+            else:
+                self.new_connections += 1
+
+    def add(self, snapshot: Dict):
+        """Add the counters of another snapshot, e.g. a finished task's."""
+        with self._lock:
+            for field in self.COUNTERS:
+                setattr(self, field, getattr(self, field) + (snapshot.get(field) or 0))
+
+    def _seen(self, stream) -> bool:
+        try:
+            if stream in self._connections:
+                return True
+            self._connections.add(stream)
+        except TypeError:
+            if id(stream) in self._connection_ids:
+                return True
+            self._connection_ids.add(id(stream))
+        return False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connection_hits": self.connection_hits,
+                "new_connections": self.new_connections,
+                "reuse_ratio": round(self.connection_hits / self.requests, 3) if self.requests else 0.0,
+                "bytes_received": self.bytes_received,
+                "http2_responses": self.http2_responses,
+                "http2_available": HTTP2_AVAILABLE,
+            }
+
+stats = PoolStats()
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+def _limits(max_connections: int = SCRAPER_POOL_MAX_CONNECTIONS) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(SCRAPER_POOL_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=SCRAPER_POOL_KEEPALIVE_EXPIRY,
+    )
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    headers=DEFAULT_HEADERS,
+                    timeout=SCRAPER_REQUEST_TIMEOUT,
+                    limits=_limits(),
+                    http2=HTTP2_AVAILABLE,
+                    follow_redirects=True,
+                )
+    return _client
+
+def new_async_client(max_connections: int = SCRAPER_POOL_MAX_CONNECTIONS) -> httpx.AsyncClient:
+    # Async clients are bound to the event loop they were created on, so each
+    # crawl gets its own, configured identically to the shared sync client.
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=SCRAPER_REQUEST_TIMEOUT,
+        limits=_limits(max_connections),
+        http2=HTTP2_AVAILABLE,
+        follow_redirects=True,
+    )
+
+def fetch(url: str, **kwargs) -> httpx.Response:
+    response = get_client().get(url, **kwargs)
+    stats.record(response)
+    return response
+
+async def fetch_async(
+    client: httpx.AsyncClient, url: str, task_stats: Optional[PoolStats] = None, **kwargs
+) -> httpx.Response:
+    response = await client.get(url, **kwargs)
+    stats.record(response)
+    if task_stats is not None:
+        task_stats.record(response)
+    return response
+
+def pool_stats() -> Dict:
+    return stats.snapshot()
+
+def close():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,269 @@
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import (
+    SCRAPER_CRAWL_ALLOW_EXTERNAL,
+    SCRAPER_CRAWL_MAX_DEPTH,
+    SCRAPER_CRAWL_MAX_PAGES,
+    SCRAPER_CRAWL_MAX_PAGES_PER_DOMAIN,
+    SCRAPER_FRONTIER_BLOOM_CAPACITY,
+    SCRAPER_FRONTIER_BLOOM_ERROR,
+    SCRAPER_FRONTIER_BLOOM_THRESHOLD,
+    SCRAPER_PAGINATION_MAX_PAGES,
+)
+from app.scraper.urls import canonicalize_url, site_of
+
+# Links to files that never hold company details are not worth a request.
+SKIPPED_EXTENSION_PATTERN = re.compile(
+    r"\.(?:pdf|jpe?g|png|gif|webp|svg|ico|bmp|tiff?|mp[34]|avi|mov|wmv|webm|wav|ogg|zip|rar|gz|tgz|7z|"
+    r"exe|dmg|msi|apk|iso|docx?|xlsx?|pptx?|odt|ods|csv|css|js|json|woff2?|ttf|eot|rss|atom)$",
+    re.IGNORECASE,
+)
+# (pattern, score) checked against the URL path and the link text. Contact and
+# about pages feed the contact extraction, so they are fetched first.
+PRIORITY_RULES = [
+    (re.compile(r"contact|kontakt|contacto|impressum|imprint|get-in-touch|reach-us", re.IGNORECASE), 10),
+    (re.compile(r"about|who-we-are|our-story|company|team|leadership|people", re.IGNORECASE), 8),
+    (re.compile(r"services?|products?|solutions?|offerings?|what-we-do|industries", re.IGNORECASE), 5),
+    (re.compile(r"locations?|offices?|careers|clients|partners", re.IGNORECASE), 2),
+    (re.compile(r"blog|news|press|articles?|events?|tags?/|category|archive|/\d{4}/\d{2}/", re.IGNORECASE), -4),
+    (re.compile(r"login|sign-?in|sign-?up|register|account|cart|checkout|search|privacy|terms|cookie|legal|feed",
+                re.IGNORECASE), -8),
+]
+DEPTH_PENALTY = 3
+
+def score_url(url: str, anchor: str = "", depth: int = 0) -> int:
+    """Crawl priority of a link; higher is fetched sooner."""
+    path = url.split("://", 1)[-1].partition("/")[2]
+    score = 0
+    for pattern, points in PRIORITY_RULES:
+        if pattern.search(path) or (anchor and pattern.search(anchor)):
+            score += points
+    return score - DEPTH_PENALTY * depth - path.count("/")
+
+class BloomFilter:
+    """Fixed-size set membership test with a small false positive rate and no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        # Double hashing on the two halves of a 64-bit key.
+        first = int.from_bytes(key[:4], "little")
+        second = int.from_bytes(key[4:8], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+class SeenSet:
+    """URLs already queued or fetched, stored as 8-byte hashes.
+
+    Past ``bloom_threshold`` entries the hashes move into a Bloom filter, so
+    memory stays fixed however large the crawl gets; a rare false positive
+    only means one page is skipped.
+    """
+
+    def __init__(
+        self,
+        bloom_threshold: int = SCRAPER_FRONTIER_BLOOM_THRESHOLD,
+        bloom_capacity: int = SCRAPER_FRONTIER_BLOOM_CAPACITY,
+        bloom_error: float = SCRAPER_FRONTIER_BLOOM_ERROR,
+    ):
+        self.bloom_threshold = bloom_threshold
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error = bloom_error
+        self._hashes: Optional[Set[bytes]] = set()
+        self._bloom: Optional[BloomFilter] = None
+        self.count = 0
+
+    @staticmethod
+    def _key(url: str) -> bytes:
+        return hashlib.blake2b(url.encode(), digest_size=8).digest()
+
+    def add(self, url: str) -> bool:
+        """Record ``url``; returns False if it was (probably) seen before."""
+        key = self._key(url)
+        if self._bloom is not None:
+            if key in self._bloom:
+                return False
+            self._bloom.add(key)
+        else:
+            if key in self._hashes:
+                return False
+            self._hashes.add(key)
+            if len(self._hashes) > self.bloom_threshold:
+                self._switch_to_bloom()
+        self.count += 1
+        return True
+
+    def _switch_to_bloom(self):
+        self._bloom = BloomFilter(max(self.bloom_capacity, self.bloom_threshold * 2), self.bloom_error)
+        for key in self._hashes:
+            self._bloom.add(key)
+        self._hashes = None
+
+    def __contains__(self, url: str) -> bool:
+        key = self._key(url)
+        if self._bloom is not None:
+            return key in self._bloom
+        return key in self._hashes
+
+    @property
+    def uses_bloom(self) -> bool:
+        return self._bloom is not None
+
+class Frontier:
+    """URLs a task still has to crawl, best first, within its depth, page and domain budgets.
+
+    Links are canonicalized and deduplicated when added. ``pop`` hands out the
+    highest-scoring URL and counts it against the page budget, so with a small
+    budget the pages most likely to hold contact details are fetched first.
+    Pagination pages go ahead of other links, and ``page_of`` tells which
+    listing each belongs to.
+    """
+
+    def __init__(
+        self,
+        seeds: Iterable[str],
+        max_depth: int = SCRAPER_CRAWL_MAX_DEPTH,
+        max_pages: int = SCRAPER_CRAWL_MAX_PAGES,
+        max_pages_per_domain: int = SCRAPER_CRAWL_MAX_PAGES_PER_DOMAIN,
+        allow_external: bool = SCRAPER_CRAWL_ALLOW_EXTERNAL,
+        seen: Optional[SeenSet] = None,
+    ):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_pages_per_domain = max_pages_per_domain
+        self.allow_external = allow_external
+        self.seen = seen if seen is not None else SeenSet()
+        self._heap: List[Tuple[bool, int, float, int, str, int]] = []
+        self._sequence = 0
+        self._domain_pages: Counter = Counter()
+        self.sites: Set[str] = set()
+        self.released = 0
+        self.stats_counts: Dict[str, int] = Counter()
+        # Pagination page -> (first page of its listing, page number).
+        self.pages: Dict[str, Tuple[str, int]] = {}
+        for seed in seeds:
+            url = canonicalize_url(seed)
+            if url:
+                self.sites.add(site_of(url))
+                self.add(url, depth=0)
+
+    def _in_scope(self, url: str) -> bool:
+        if self.allow_external:
+            return True
+        site = site_of(url)
+        return any(site == allowed or site.endswith("." + allowed) for allowed in self.sites)
+
+    def add(
+        self, url: str, depth: int = 0, anchor: str = "", base: Optional[str] = None, lastmod: Optional[float] = None,
+        pagination: bool = False,
+    ) -> bool:
+        """Queue a link found at ``depth``; returns False if it was filtered out or seen before."""
+        if depth > self.max_depth:
+            self.stats_counts["too_deep"] += 1
+            return False
+        url = canonicalize_url(url, base)
+        if url is None or SKIPPED_EXTENSION_PATTERN.search(url.split("?", 1)[0]):
+            self.stats_counts["skipped"] += 1
+            return False
+        if not self._in_scope(url):
+            self.stats_counts["off_site"] += 1
+            return False
+        if not self.seen.add(url):
+            self.stats_counts["duplicates"] += 1
+            return False
+        # Start URLs and pagination pages always go first, the latter in page order; everything
+        # found later is ordered by score, then by how recently a sitemap says the page changed.
+        if pagination:
+            priority = (False, 0, 0.0)
+        else:
+            priority = (depth > 0, -score_url(url, anchor, depth), -(lastmod or 0.0))
+        heapq.heappush(self._heap, (*priority, self._sequence, url, depth))
+        self._sequence += 1
+        self.stats_counts["admitted"] += 1
+        return True
+
+    def add_links(self, links: Iterable[Tuple[str, str]], base: str, depth: int) -> int:
+        """Queue the ``(href, text)`` links of a page at ``depth``; returns how many were new."""
+        if depth > self.max_depth:
+            return 0
+        return sum(self.add(href, depth, anchor, base) for href, anchor in links)
+
+    def add_sitemap(self, entries: Iterable[Tuple[str, Optional[float]]], depth: int = 1) -> int:
+        """Queue the ``(url, lastmod)`` pages of a sitemap as links of the start page; returns how many were new."""
+        added = sum(self.add(url, depth, lastmod=lastmod) for url, lastmod in entries)
+        self.stats_counts["from_sitemap"] += added
+        return added
+
+    def add_pages(self, url: str, page_urls: Iterable[str], depth: int, max_pages: int = SCRAPER_PAGINATION_MAX_PAGES) -> int:
+        """Queue the pages that follow ``url`` in its pagination; returns how many were new.
+
+        Page numbers continue from ``url``'s own; a listing stops at ``max_pages`` pages.
+        """
+        listing, number = self.page_of(url)
+        added = 0
+        for offset, page_url in enumerate(page_urls, 1):
+            if number + offset > max_pages:
+                break
+            page_url = canonicalize_url(page_url, url)
+            if page_url is not None and self.add(page_url, depth, pagination=True):
+                self.pages[page_url] = (listing, number + offset)
+                added += 1
+        self.stats_counts["pagination"] += added
+        return added
+
+    def page_of(self, url: str) -> Tuple[str, int]:
+        """``(listing URL, page number)`` of a page; pages outside a pagination are their own page 1."""
+        return self.pages.get(url, (url, 1))
+
+    def claim(self, url: str) -> bool:
+        """Mark ``url`` as handled elsewhere (e.g. pagination); False if the frontier already has it."""
+        url = canonicalize_url(url)
+        return url is not None and self.seen.add(url)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Best ``(url, depth)`` left within the budgets, or None."""
+        while self._heap and self.released < self.max_pages:
+            *_, url, depth = heapq.heappop(self._heap)
+            site = site_of(url)
+            if self.max_pages_per_domain and self._domain_pages[site] >= self.max_pages_per_domain:
+                self.stats_counts["over_domain_budget"] += 1
+                continue
+            self._domain_pages[site] += 1
+            self.released += 1
+            return url, depth
+        return None
+
+    def __len__(self) -> int:
+        return len(self._heap) if self.released < self.max_pages else 0
+
+    @property
+    def discovered(self) -> int:
+        """Pages fetched or still to fetch, capped by the page budget."""
+        return min(self.max_pages, self.released + len(self._heap))
+
+    def stats(self) -> Dict:
+        return {
+            "released": self.released,
+            "queued": len(self._heap),
+            "seen": self.seen.count,
+            "bloom": self.seen.uses_bloom,
+            **self.stats_counts,
+        }
@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+from loguru import logger
+
+from app.config import (
+    SCRAPER_HTTP_CACHE_DIR,
+    SCRAPER_HTTP_CACHE_LASTMOD_MAX_AGE,
+    SCRAPER_HTTP_CACHE_MAX_BYTES,
+    SCRAPER_HTTP_CACHE_TTL,
+)
+from app.scraper.fetcher import PoolStats, fetch, fetch_async
+from app.scraper.urls import normalize_url
+
+# Bodies are stored decoded, so Content-Encoding and Content-Length are not kept.
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+# Responses a shared cache must not store, or must check with the server before every use.
+UNCACHEABLE_DIRECTIVES = ("no-store", "private", "no-cache")
+# Eviction frees space down to this fraction of the limit, so it does not run on every store.
+EVICT_LOW_WATER = 0.9
+
+class CacheStats:
+    COUNTERS = ("hits", "revalidated", "misses", "bytes_saved")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.revalidated = 0
+            self.misses = 0
+            self.bytes_saved = 0
+
+    def record(self, outcome: str, bytes_saved: int = 0):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.bytes_saved += bytes_saved
+
+    def add(self, snapshot: Dict):
+        """Add the counters of another snapshot, e.g. a finished task's."""
+        with self._lock:
+            for field in self.COUNTERS:
+                setattr(self, field, getattr(self, field) + (snapshot.get(field) or 0))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            requests = self.hits + self.revalidated + self.misses
+            return {
+                "requests": requests,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.revalidated) / requests, 3) if requests else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+stats = CacheStats()
+
+class CacheEntry:
+    def __init__(self, url: str, body: bytes, headers: Dict[str, str], stored_at: float):
+        self.url = url
+        self.body = body
+        self.headers = headers
+        self.stored_at = stored_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def response(self) -> httpx.Response:
+        return httpx.Response(200, headers=self.headers, content=self.body, request=httpx.Request("GET", self.url))
+
+def cache_directives(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """``"max-age=60, private"`` -> ``{"max-age": "60", "private": None}``."""
+    directives = {}
+    for part in (value or "").lower().split(","):
+        name, _, argument = part.partition("=")
+        if name.strip():
+            directives[name.strip()] = argument.strip().strip('"') or None
+    return directives
+
+def max_age(headers: Dict[str, str]) -> Optional[float]:
+    """The freshness lifetime the server gave, from ``s-maxage`` or ``max-age``."""
+    directives = cache_directives(headers.get("cache-control"))
+    for name in ("s-maxage", "max-age"):
+        try:
+            return max(0.0, float(directives[name]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+def is_cacheable(response: httpx.Response) -> bool:
+    if response.status_code != 200 or response.request.method != "GET":
+        return False
+    directives = cache_directives(response.headers.get("cache-control"))
+    if any(name in directives for name in UNCACHEABLE_DIRECTIVES):
+        return False
+    # Every request sends the same headers, so only "Vary: *" makes a stored copy unusable.
+    return response.headers.get("vary", "").strip() != "*"
+
+class HttpCache:
+    """Disk cache of GET responses shared by every task and worker process.
+
+    Bodies are zlib-compressed files named by a hash of the normalized URL. A
+    SQLite index next to them keeps the validators, age and last access of each
+    entry for TTL expiry, conditional revalidation and LRU eviction. Triggers
+    keep the index's running size in a one-row table, so a store does not sum
+    every entry to check the size limit.
+    """
+
+    def __init__(
+        self,
+        directory,
+        ttl: float = SCRAPER_HTTP_CACHE_TTL,
+        max_bytes: int = SCRAPER_HTTP_CACHE_MAX_BYTES,
+        lastmod_max_age: float = SCRAPER_HTTP_CACHE_LASTMOD_MAX_AGE,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.lastmod_max_age = lastmod_max_age
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._db().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                body_size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at);
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                entries INTEGER NOT NULL,
+                bytes INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS entries_inserted AFTER INSERT ON entries BEGIN
+                UPDATE totals SET entries = entries + 1, bytes = bytes + new.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_deleted AFTER DELETE ON entries BEGIN
+                UPDATE totals SET entries = entries - 1, bytes = bytes - old.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_resized AFTER UPDATE OF size ON entries BEGIN
+                UPDATE totals SET bytes = bytes - old.size + new.size;
+            END;
+            INSERT OR IGNORE INTO totals SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM entries;
+            COMMIT;
+            """
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.directory / "index.sqlite", timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # INSERT OR REPLACE only fires the delete trigger with recursive triggers on.
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.z"
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        key = self._key(url)
+        db = self._db()
+        row = db.execute("SELECT headers, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            body = zlib.decompress(self._path(key).read_bytes())
+        except (OSError, zlib.error):
+            # Evicted by another process between the query and the read, or corrupt.
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(url, body, json.loads(row[0]), row[1])
+
+    def _current(self, stored_at: float, headers: Dict[str, str], lastmod: Optional[float] = None) -> bool:
+        # A sitemap lastmod after the copy was stored means the page changed.
+        if lastmod is not None and lastmod > stored_at:
+            return False
+        # The server's max-age, when it sent one, replaces the configured TTL.
+        lifetime = max_age(headers)
+        if lifetime is None:
+            lifetime = self.ttl
+            if lastmod is not None:
+                # An earlier lastmod stretches the TTL, but only so far: lastmod values are often stale.
+                lifetime = max(lifetime, self.lastmod_max_age)
+        return time.time() - stored_at < lifetime
+
+    def is_fresh(self, url: str, lastmod: Optional[float] = None) -> bool:
+        row = self._db().execute("SELECT headers, stored_at FROM entries WHERE key = ?", (self._key(url),)).fetchone()
+        return row is not None and self._current(row[1], json.loads(row[0]), lastmod)
+
+    def store(self, url: str, response: httpx.Response) -> bool:
+        if not is_cacheable(response):
+            return False
+        body = response.content
+        compressed = zlib.compress(body)
+        if len(compressed) > self.max_bytes:
+            return False
+        key = self._key(url)
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, path)
+
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        now = time.time()
+        self._db().execute(
+            "INSERT OR REPLACE INTO entries (key, url, headers, size, body_size, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, normalize_url(url), json.dumps(headers), len(compressed), len(body), now, now),
+        )
+        self._evict()
+        return True
+
+    def refresh(self, url: str, entry: CacheEntry, response: httpx.Response):
+        """Restart the TTL of an entry the server confirmed with a 304."""
+        for name in ("etag", "last-modified", "cache-control"):
+            if name in response.headers:
+                entry.headers[name] = response.headers[name]
+        now = time.time()
+        self._db().execute(
+            "UPDATE entries SET headers = ?, stored_at = ?, accessed_at = ? WHERE key = ?",
+            (json.dumps(entry.headers), now, now, self._key(url)),
+        )
+
+    def _evict(self):
+        db = self._db()
+        total = db.execute("SELECT bytes FROM totals").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_LOW_WATER
+        evicted = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if total <= target:
+                break
+            evicted.append(key)
+            total -= size
+        db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+        for key in evicted:
+            self._path(key).unlink(missing_ok=True)
+        logger.debug(f"HTTP cache evicted {len(evicted)} entries")
+
+    def usage(self) -> Dict:
+        entries, size = self._db().execute("SELECT entries, bytes FROM totals").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+    def _settle(
+        self, url: str, entry: Optional[CacheEntry], response: httpx.Response, task_stats: Optional[CacheStats]
+    ) -> httpx.Response:
+        if response.status_code == 304 and entry is not None:
+            self.refresh(url, entry, response)
+            self._record("revalidated", len(entry.body), task_stats)
+            return entry.response()
+        try:
+            self.store(url, response)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not cache {url}: {str(e)}")
+        self._record("misses", 0, task_stats)
+        return response
+
+    def _record(self, outcome: str, bytes_saved: int, task_stats: Optional[CacheStats]):
+        stats.record(outcome, bytes_saved)
+        if task_stats is not None:
+            task_stats.record(outcome, bytes_saved)
+
+    def fetch(
+        self, url: str, task_stats: Optional[CacheStats] = None, lastmod: Optional[float] = None
+    ) -> httpx.Response:
+        """GET ``url``, answering from the cache while fresh and revalidating once stale."""
+        entry = self.lookup(url)
+        if entry is not None and self._current(entry.stored_at, entry.headers, lastmod):
+            self._record("hits", len(entry.body), task_stats)
+            return entry.response()
+        response = fetch(url, headers=entry.validators() if entry else None)
+        return self._settle(url, entry, response, task_stats)
+
+    async def fetch_async(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        task_stats: Optional[CacheStats] = None,
+        lastmod: Optional[float] = None,
+        pool_stats: Optional[PoolStats] = None,
+    ) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        # Index queries and body reads are disk I/O, so they stay off the event loop.
+        entry = await loop.run_in_executor(None, self.lookup, url)
+        if entry is not None and self._current(entry.stored_at, entry.headers, lastmod):
+            self._record("hits", len(entry.body), task_stats)
+            return entry.response()
+        response = await fetch_async(client, url, pool_stats, headers=entry.validators() if entry else None)
+        return await loop.run_in_executor(None, self._settle, url, entry, response, task_stats)
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+def get_http_cache() -> Optional[HttpCache]:
+    """The process-wide cache, or None when SCRAPER_HTTP_CACHE_DIR is empty."""
+    global _cache
+    if not SCRAPER_HTTP_CACHE_DIR:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(SCRAPER_HTTP_CACHE_DIR)
+    return _cache
+
+def cache_stats() -> Dict:
+    """Whether the cache is on and its size; hit counts are kept per task."""
+    cache = get_http_cache()
+    return {"enabled": cache is not None, **(cache.usage() if cache else {})}
@@ -0,0 +1,166 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.scraper.urls import site_of
+
+SCALAR_FIELDS = ("company", "tagline", "description", "address", "industry")
+# Dropped from the end of company names before comparing them.
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "gmbh", "plc", "sa", "ag", "bv", "pty", "srl",
+}
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+NON_DIGIT_PATTERN = re.compile(r"\D+")
+
+def company_key(name: Optional[str]) -> Optional[str]:
+    """``name`` in the form two spellings of one company share: "ACME, Inc." -> "acme"."""
+    if not name:
+        return None
+    words = NON_WORD_PATTERN.sub(" ", str(name).casefold()).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words) or None
+
+def _text_key(value) -> str:
+    return " ".join(str(value).casefold().split())
+
+def _phone_key(value) -> str:
+    return NON_DIGIT_PATTERN.sub("", str(value)) or _text_key(value)
+
+class _Group:
+    """One company's fields, each value kept once with the URL it was first seen on.
+
+    The value sets are dicts keyed by a normalized form, so a value seen on
+    every page costs one hash lookup per page and is stored once.
+    """
+
+    __slots__ = ("first", "scalars", "emails", "phones", "services", "social", "contact_page", "sources", "extracted_at")
+
+    def __init__(self, record: dict):
+        self.first = record
+        self.scalars: Dict[str, Tuple[object, str]] = {}
+        self.emails: Dict[str, Tuple[str, str]] = {}
+        self.phones: Dict[str, Tuple[str, str]] = {}
+        self.services: Dict[str, Tuple[str, str]] = {}
+        self.social: Dict[str, Tuple[str, str]] = {}
+        self.contact_page: Optional[str] = None
+        self.sources: Dict[str, None] = {}
+        self.extracted_at: Optional[str] = None
+
+    def add(self, record: dict):
+        url = record.get("url") or ""
+        self.sources.setdefault(url)
+        for field in SCALAR_FIELDS:
+            value = record.get(field)
+            if value:
+                self.scalars.setdefault(field, (value, url))
+        contacts = record.get("contacts")
+        if isinstance(contacts, dict):
+            for email in contacts.get("emails") or []:
+                if email:
+                    self.emails.setdefault(_text_key(email), (email, url))
+            for phone in contacts.get("phones") or []:
+                if phone:
+                    self.phones.setdefault(_phone_key(phone), (phone, url))
+            if self.contact_page is None:
+                self.contact_page = contacts.get("contact_page")
+        for service in record.get("services") or []:
+            if service:
+                self.services.setdefault(_text_key(service), (service, url))
+        social_media = record.get("social_media")
+        if isinstance(social_media, dict):
+            for platform, link in social_media.items():
+                if link:
+                    self.social.setdefault(platform, (link, url))
+        extracted_at = record.get("extracted_at")
+        if extracted_at and (self.extracted_at is None or extracted_at > self.extracted_at):
+            self.extracted_at = extracted_at
+
+    def absorb(self, other: "_Group"):
+        """Fold in the fields of ``other``, keeping the values this group already has."""
+        for mine, theirs in (
+            (self.scalars, other.scalars), (self.emails, other.emails), (self.phones, other.phones),
+            (self.services, other.services), (self.social, other.social),
+        ):
+            for key, value in theirs.items():
+                mine.setdefault(key, value)
+        for url in other.sources:
+            self.sources.setdefault(url)
+        self.contact_page = self.contact_page or other.contact_page
+        if other.extracted_at and (self.extracted_at is None or other.extracted_at > self.extracted_at):
+            self.extracted_at = other.extracted_at
+
+    def to_record(self) -> dict:
+        record = {
+            "url": self.first.get("url"),
+            "company": None,
+            "contacts": {
+                "emails": [value for value, _ in self.emails.values()],
+                "phones": [value for value, _ in self.phones.values()],
+                "contact_page": self.contact_page,
+            },
+            "tagline": None,
+            "services": [value for value, _ in self.services.values()],
+            "social_media": {platform: link for platform, (link, _) in self.social.items()},
+            "address": None,
+            "description": None,
+            "industry": None,
+        }
+        provenance = {}
+        for field, (value, url) in self.scalars.items():
+            record[field] = value
+            provenance[field] = url
+        for field, values in (("emails", self.emails), ("phones", self.phones), ("services", self.services)):
+            if values:
+                provenance[field] = {value: url for value, url in values.values()}
+        if self.social:
+            provenance["social_media"] = {platform: url for platform, (_, url) in self.social.items()}
+        for field in ("page_number", "task_id"):
+            if field in self.first:
+                record[field] = self.first[field]
+        record["extracted_at"] = self.extracted_at
+        record["source_urls"] = list(self.sources)
+        record["provenance"] = provenance
+        return record
+
+class RecordMerger:
+    """Folds the per-page records of a crawl into one record per site and company.
+
+    Records are grouped by site (``site_of`` their URL) and normalized company
+    name. Emails, phones, services and social links are unioned; other fields
+    keep the first value found. ``provenance`` gives the source URL of every
+    value. Pages with no company name join their site's company when the site
+    has exactly one.
+    """
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, Optional[str]], _Group] = {}
+        self.added = 0
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def add(self, record: dict) -> bool:
+        """Merge ``record`` in; returns True if it started a new group."""
+        self.added += 1
+        key = (site_of(record.get("url") or ""), company_key(record.get("company")))
+        group = self._groups.get(key)
+        created = group is None
+        if created:
+            group = self._groups[key] = _Group(record)
+        group.add(record)
+        return created
+
+    def records(self) -> List[dict]:
+        named: Dict[str, List[_Group]] = {}
+        for (site, company), group in self._groups.items():
+            if company is not None:
+                named.setdefault(site, []).append(group)
+        merged = []
+        for (site, company), group in self._groups.items():
+            if company is None and len(named.get(site, ())) == 1:
+                continue
+            if company is not None and len(named[site]) == 1 and (site, None) in self._groups:
+                group.absorb(self._groups[(site, None)])
+            merged.append(group.to_record())
+        return merged
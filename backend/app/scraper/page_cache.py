@@ -0,0 +1,146 @@
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from loguru import logger
+
+import httpx
+
+from app.scraper.fetcher import PoolStats, fetch, fetch_async
+from app.scraper.http_cache import CacheStats, HttpCache
+from app.scraper.parsers import parse_document, resolve_backend
+from app.scraper.render_detection import RenderStats
+from app.scraper.urls import canonicalize_url, normalize_url
+
+class PageCache:
+    """Per-task store so each URL is downloaded and parsed at most once in this process.
+
+    The crawler parses a page here to follow its links. Extraction in threads
+    reuses that tree; an extraction process pool cannot be sent it and parses
+    the page again, trading a second parse for a free event loop.
+
+    A page's HTML and parsed tree are kept until ``release``, once the page is
+    extracted; afterwards only its URL is remembered, so memory follows the
+    pages in flight rather than the task's page budget.
+
+    With an ``http_cache``, downloads also go through the disk cache shared
+    with other tasks, and ``http_stats`` counts this task's hits. Sitemap
+    lastmod times given to ``note_modified`` decide when a cached copy is
+    still current. ``pool_stats`` and ``render_stats`` count this task's
+    connections and render decisions.
+    """
+
+    def __init__(self, parser: Optional[str] = None, http_cache: Optional[HttpCache] = None):
+        self.parser = resolve_backend(parser)
+        self.http_cache = http_cache
+        self.http_stats = CacheStats()
+        self.pool_stats = PoolStats()
+        self.render_stats = RenderStats()
+        self._lock = threading.Lock()
+        self._pages: Dict[str, str] = {}
+        self._seen: Set[str] = set()
+        self._documents: Dict[str, object] = {}
+        self._modified: Dict[str, float] = {}
+        self.fetches = 0
+        self.avoided_fetches = 0
+        self.parses = 0
+        self.avoided_parses = 0
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return normalize_url(url) in self._seen
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            html = self._pages.get(normalize_url(url))
+            if html is not None:
+                self.avoided_fetches += 1
+            return html
+
+    def put(self, url: str, html: str):
+        with self._lock:
+            self.fetches += 1
+            key = normalize_url(url)
+            self._seen.add(key)
+            self._pages[key] = html
+
+    def record_avoided(self, count: int):
+        with self._lock:
+            self.avoided_fetches += count
+
+    def note_modified(self, entries: Iterable[Tuple[str, Optional[float]]]):
+        """Remember the ``(url, lastmod)`` times of sitemap entries."""
+        with self._lock:
+            for url, lastmod in entries:
+                if lastmod is not None:
+                    self._modified[normalize_url(canonicalize_url(url) or url)] = lastmod
+
+    def _lastmod(self, url: str) -> Optional[float]:
+        with self._lock:
+            return self._modified.get(normalize_url(url))
+
+    def fresh_urls(self, urls: Iterable[str]) -> Set[str]:
+        """The ``urls`` the disk cache can answer without contacting their hosts."""
+        if self.http_cache is None:
+            return set()
+        return {url for url in urls if self.http_cache.is_fresh(url, self._lastmod(url))}
+
+    def fetch_response(self, url: str) -> httpx.Response:
+        if self.http_cache is None:
+            return fetch(url)
+        return self.http_cache.fetch(url, self.http_stats, self._lastmod(url))
+
+    async def fetch_response_async(self, client: httpx.AsyncClient, url: str) -> httpx.Response:
+        if self.http_cache is None:
+            return await fetch_async(client, url, self.pool_stats)
+        return await self.http_cache.fetch_async(client, url, self.http_stats, self._lastmod(url), self.pool_stats)
+
+    def fetch(self, url: str) -> Optional[str]:
+        html = self.get(url)
+        if html is not None:
+            return html
+
+        response = self.fetch_response(url)
+        if response.status_code != 200:
+            logger.warning(f"Got status {response.status_code} for {url}")
+            return None
+        self.put(url, response.text)
+        return response.text
+
+    def document(self, url: str, html: Optional[str] = None):
+        key = normalize_url(url)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self.avoided_parses += 1
+                return document
+            if html is None:
+                html = self._pages.get(key)
+        if html is None:
+            return None
+
+        document = parse_document(html, self.parser)
+        with self._lock:
+            self.parses += 1
+            return self._documents.setdefault(key, document)
+
+    def release(self, url: str):
+        """Free the page's HTML and tree; it still counts as fetched."""
+        key = normalize_url(url)
+        with self._lock:
+            self._documents.pop(key, None)
+            self._pages.pop(key, None)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "pages": len(self._seen),
+                # Pages fetched but not yet released; 0 once a crawl has finished.
+                "held_pages": len(self._pages),
+                "fetches": self.fetches,
+                "avoided_fetches": self.avoided_fetches,
+                "parses": self.parses,
+                "avoided_parses": self.avoided_parses,
+                "http_cache": self.http_stats.snapshot(),
+                "pool": self.pool_stats.snapshot(),
+                "render": self.render_stats.snapshot(),
+            }
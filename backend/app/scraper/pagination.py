@@ -1,18 +1,184 @@
-from bs4 import BeautifulSoup
-import requests
-
-def handle_pagination(html, base_url):
-    pages = [html]
-    soup = BeautifulSoup(html, "html.parser")
-    next_link = soup.find("a", text=lambda t: t and "next" in t.lower())
-    while next_link:
-        next_url = next_link.get("href")
-        if not next_url.startswith("http"):
-            next_url = base_url.rstrip("/") + "/" + next_url.lstrip("/")
-        resp = requests.get(next_url)
-        if resp.status_code != 200:
-            break
-        pages.append(resp.text)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        next_link = soup.find("a", text=lambda t: t and "next" in t.lower())
-    return pages
\ No newline at end of file
+import asyncio
+import hashlib
+import re
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+from loguru import logger
+
+from app.config import SCRAPER_PAGINATION_CONCURRENCY, SCRAPER_PAGINATION_MAX_PAGES
+from app.scraper.page_cache import PageCache
+from app.scraper.parsers import document_anchors, find_link_by_string, find_rel_link
+from app.scraper.urls import normalize_url
+
+# ?page=3, &p=3, ?paged=3 ... and /page/3, /p/3
+PAGE_PARAM_PATTERN = re.compile(r"([?&](?:page|p|pg|paged|pagenum|page_num|pageno)=)(\d+)", re.IGNORECASE)
+PAGE_PATH_PATTERN = re.compile(r"(/(?:page|p|pg)/)(\d+)(?=[/?#]|$)", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"(\d+)")
+
+class PagePattern(NamedTuple):
+    """Numbered pages at ``prefix + number + suffix``; ``number`` is the page after the current one."""
+    prefix: str
+    suffix: str
+    number: int
+
+    def url(self, number: int) -> str:
+        return f"{self.prefix}{number}{self.suffix}"
+
+    def number_of(self, url: str) -> Optional[int]:
+        if not url.startswith(self.prefix) or not url.endswith(self.suffix):
+            return None
+        middle = url[len(self.prefix):len(url) - len(self.suffix)]
+        return int(middle) if middle.isdigit() else None
+
+def _find_next_link(document):
+    return find_link_by_string(document, lambda t: t and "next" in t.lower())
+
+def next_page_url(document, base_url) -> Optional[str]:
+    """Absolute URL of the page after ``base_url``: its rel="next" link, else a link labelled "next"."""
+    href = find_rel_link(document, "next")
+    if href is None:
+        next_link = _find_next_link(document)
+        href = next_link.get("href") if next_link is not None else None
+    href = (href or "").strip()
+    if not href or href.startswith(("#", "javascript:")):
+        return None
+    return urljoin(base_url, href)
+
+def detect_page_pattern(url: str, next_url: str) -> Optional[PagePattern]:
+    """The numbered pattern ``next_url`` follows, if it is the page after ``url`` in one."""
+    for regex in (PAGE_PARAM_PATTERN, PAGE_PATH_PATTERN):
+        match = regex.search(next_url)
+        if match is None:
+            continue
+        pattern = PagePattern(next_url[:match.end(1)], next_url[match.end(2):], int(match.group(2)))
+        current = pattern.number_of(url)
+        if current is not None:
+            return pattern if current + 1 == pattern.number else None
+        # The first page usually has no number: /blog -> /blog/page/2.
+        if pattern.number == 2 and url.rstrip("/").startswith(next_url[:match.start(1)].rstrip("/")):
+            return pattern
+        return None
+    # Any single number that goes up by one: /products-2.html -> /products-3.html.
+    before, after = NUMBER_PATTERN.split(url), NUMBER_PATTERN.split(next_url)
+    if len(before) != len(after):
+        return None
+    changed = [i for i, (old, new) in enumerate(zip(before, after)) if old != new]
+    if len(changed) != 1 or changed[0] % 2 == 0 or int(after[changed[0]]) != int(before[changed[0]]) + 1:
+        return None
+    index = changed[0]
+    return PagePattern("".join(after[:index]), "".join(after[index + 1:]), int(after[index]))
+
+def last_page_number(document, base_url: str, pattern: PagePattern) -> Optional[int]:
+    """Highest page number linked from a page (the "1 2 3 ... 12" bar), if any."""
+    numbers = [pattern.number_of(urljoin(base_url, href)) for href, _ in document_anchors(document)]
+    numbers = [number for number in numbers if number is not None]
+    return max(numbers) if numbers else None
+
+def next_pages(document, url: str, max_pages: int = SCRAPER_PAGINATION_MAX_PAGES) -> List[str]:
+    """The pages after ``url`` known to exist: the numbered pages up to the last
+    one its page bar links to, else just its next link."""
+    next_url = next_page_url(document, url)
+    if next_url is None:
+        return []
+    pattern = detect_page_pattern(url, next_url)
+    known_last = last_page_number(document, url, pattern) if pattern is not None else None
+    if known_last is None or known_last < pattern.number:
+        return [next_url]
+    return [pattern.url(number) for number in range(pattern.number, min(known_last, pattern.number + max_pages - 2) + 1)]
+
+def _next_of(cache: PageCache, url: str, html: str) -> Optional[str]:
+    return next_page_url(cache.document(url, html), url)
+
+def _last_of(cache: PageCache, url: str, html: str, pattern: PagePattern) -> Optional[int]:
+    return last_page_number(cache.document(url, html), url, pattern)
+
+async def iter_pages(
+    client: httpx.AsyncClient,
+    url: str,
+    html: str,
+    cache: PageCache,
+    next_url: Optional[str] = None,
+    max_pages: int = SCRAPER_PAGINATION_MAX_PAGES,
+    concurrency: int = SCRAPER_PAGINATION_CONCURRENCY,
+) -> AsyncIterator[Tuple[int, str, str]]:
+    """Yield ``(page_number, url, html)`` for the pages after ``url``, in order.
+
+    Numbered pages (``?page=N``, ``/page/N``, or any number that counts up)
+    that the page bar links to are fetched up to ``concurrency`` at a time
+    ahead of the one being yielded; past them, and for other "next" chains,
+    a page is only fetched once the one before links to it. Stops at
+    ``max_pages`` pages in all, at a page that fails, at one that repeats an
+    earlier page's content, or at one with no next link.
+    """
+    loop = asyncio.get_running_loop()
+    if next_url is None:
+        next_url = await loop.run_in_executor(None, _next_of, cache, url, html)
+    if next_url is None or max_pages < 2:
+        return
+    seen = {normalize_url(url)}
+    digests = {hashlib.sha1(html.encode()).digest()}
+
+    async def fetch(page_url: str) -> Optional[str]:
+        page_html = cache.get(page_url)
+        if page_html is not None:
+            return page_html
+        try:
+            response = await cache.fetch_response_async(client, page_url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch page {page_url}: {str(e)}")
+            return None
+        if response.status_code != 200:
+            logger.debug(f"Got status {response.status_code} for page {page_url}, stopping pagination")
+            return None
+        cache.put(page_url, response.text)
+        return response.text
+
+    def is_new(page_url: str, page_html: Optional[str]) -> bool:
+        if page_html is None or normalize_url(page_url) in seen:
+            return False
+        digest = hashlib.sha1(page_html.encode()).digest()
+        if digest in digests:
+            # Sites often answer past-the-end page numbers with a page already seen.
+            logger.debug(f"Page {page_url} repeats an earlier page, stopping pagination")
+            return False
+        seen.add(normalize_url(page_url))
+        digests.add(digest)
+        return True
+
+    pattern = detect_page_pattern(url, next_url)
+    if pattern is None:
+        page_number = 1
+        while next_url is not None and page_number < max_pages and normalize_url(next_url) not in seen:
+            page_html = await fetch(next_url)
+            if not is_new(next_url, page_html):
+                return
+            page_number += 1
+            yield page_number, next_url, page_html
+            next_url = await loop.run_in_executor(None, _next_of, cache, next_url, page_html)
+        return
+
+    # Pages up to the highest linked number are known to exist; past it each page must link onwards.
+    known_last = await loop.run_in_executor(None, _last_of, cache, url, html, pattern)
+    last = pattern.number + max_pages - 2
+    pending: Dict[int, asyncio.Task] = {}
+    launched = pattern.number
+    try:
+        for number in range(pattern.number, last + 1):
+            # Nothing past the known pages is requested before a page links to it.
+            limit = min(last, known_last) if known_last is not None and number <= known_last else number
+            while launched <= limit and len(pending) < max(1, concurrency):
+                pending[launched] = asyncio.create_task(fetch(pattern.url(launched)))
+                launched += 1
+            page_url = pattern.url(number)
+            page_html = await pending.pop(number)
+            if not is_new(page_url, page_html):
+                return
+            yield number - pattern.number + 2, page_url, page_html
+            if known_last is None or number >= known_last:
+                if await loop.run_in_executor(None, _next_of, cache, page_url, page_html) is None:
+                    return
+    finally:
+        for task in pending.values():
+            task.cancel()
@@ -0,0 +1,129 @@
+from typing import Callable, List, Optional, Tuple
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from app.config import SCRAPER_PARSER
+
+PARSER_BACKENDS = ("html.parser", "lxml", "lxml-html")
+
+# BeautifulSoup leaves strings inside <template> out of get_text(), so the raw
+# lxml backend does the same to keep extracted records equivalent.
+TEXT_XPATH = etree.XPath("descendant::text()[not(ancestor::template)]", smart_strings=False)
+_FIND_NEXT_XPATHS = {}
+
+class LxmlNode:
+    """Wraps an lxml element in the small part of the BeautifulSoup Tag API the extractors use."""
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    @property
+    def text(self) -> str:
+        return "".join(TEXT_XPATH(self.element))
+
+    @property
+    def string(self) -> Optional[str]:
+        element = self.element
+        while True:
+            children = len(element)
+            parts = children + (1 if element.text else 0) + sum(1 for child in element if child.tail)
+            if parts != 1:
+                return None
+            if element.text:
+                return element.text
+            element = element[0]
+            if not isinstance(element.tag, str):
+                return element.text
+
+    def get(self, key: str, default=None):
+        return self.element.get(key, default)
+
+    def __getitem__(self, key: str) -> str:
+        value = self.element.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def find_next_sibling(self, names: List[str]) -> Optional["LxmlNode"]:
+        for sibling in self.element.itersiblings():
+            if sibling.tag in names:
+                return LxmlNode(sibling)
+        return None
+
+    def find_next(self, names: List[str]) -> Optional["LxmlNode"]:
+        key = tuple(names)
+        xpath = _FIND_NEXT_XPATHS.get(key)
+        if xpath is None:
+            condition = " or ".join(f"self::{name}" for name in names)
+            xpath = etree.XPath(f"(descendant::*[{condition}] | following::*[{condition}])[1]")
+            _FIND_NEXT_XPATHS[key] = xpath
+        found = xpath(self.element)
+        return LxmlNode(found[0]) if found else None
+
+    def find_all(self, name: str) -> List["LxmlNode"]:
+        return [LxmlNode(element) for element in self.element.iterdescendants(name)]
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    backend = backend or SCRAPER_PARSER
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}, expected one of {', '.join(PARSER_BACKENDS)}")
+    return backend
+
+def parse_lxml(html: str) -> lxml.html.HtmlElement:
+    if not html or not html.strip():
+        return lxml.html.document_fromstring("<html></html>")
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration.
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return lxml.html.document_fromstring("<html></html>")
+
+def parse_document(html: str, backend: Optional[str] = None):
+    backend = resolve_backend(backend)
+    if backend == "lxml-html":
+        return parse_lxml(html)
+    return BeautifulSoup(html, backend)
+
+def is_lxml_document(document) -> bool:
+    return isinstance(document, etree._Element)
+
+def document_links(document) -> List[str]:
+    if is_lxml_document(document):
+        return [a.get("href") for a in document.iter("a") if a.get("href") is not None]
+    return [a.get("href") for a in document.find_all("a", href=True)]
+
+def document_anchors(document) -> List[Tuple[str, str]]:
+    """``(href, text)`` of every link, for crawl prioritization."""
+    if is_lxml_document(document):
+        return [(a.get("href"), a.text_content().strip()) for a in document.iter("a") if a.get("href") is not None]
+    return [(a.get("href"), a.get_text(" ", strip=True)) for a in document.find_all("a", href=True)]
+
+def find_rel_link(document, rel: str) -> Optional[str]:
+    """``href`` of the first ``<link>`` or ``<a>`` whose ``rel`` includes ``rel``."""
+    if is_lxml_document(document):
+        for element in document.iter("link", "a"):
+            if rel in (element.get("rel") or "").lower().split() and element.get("href"):
+                return element.get("href")
+        return None
+    element = document.find(["link", "a"], rel=lambda value: bool(value) and rel in value.lower().split(), href=True)
+    return element.get("href") if element is not None else None
+
+def find_link_by_string(document, predicate: Callable[[str], bool]):
+    """Return the first ``<a>`` whose ``.string`` satisfies ``predicate``, as BeautifulSoup's ``text=`` would."""
+    if is_lxml_document(document):
+        for a in document.iter("a"):
+            string = LxmlNode(a).string
+            if predicate(string):
+                return LxmlNode(a)
+        return None
+    return document.find("a", string=predicate)
@@ -0,0 +1,89 @@
+import re
+from typing import Iterable, List, Optional
+
+import phonenumbers
+
+from app.config import SCRAPER_PHONE_REGION, SCRAPER_PHONE_VALIDATION
+
+# One scan finds every candidate: an optional "+" country prefix, an optional
+# bracketed area code, then digit groups joined by single separators on the
+# same line. Groups can only split at separators, so long digit runs cannot
+# backtrack. Runs that continue a word, price, date or decimal ("$12",
+# "8/13/2024") never start one. A candidate can hold more than a phone
+# ("5 415-555-0134", "415-555-0134 7 days"); find_phones picks numbers inside it.
+PHONE_CANDIDATE_PATTERN = re.compile(
+    r'(?<![\w+/$.,-])(\+[ \t\xa0]?)?(?:\(\d{1,4}\)[-. \t\xa0]?)?\d+(?:[-. \t\xa0]\(?\d+\)?)*'
+)
+DIGIT_GROUP_PATTERN = re.compile(r'\d+')
+MIN_DIGITS = 10
+MAX_DIGITS = 15
+# "+33 1 23 45 67 89" is about as fragmented as real numbers get; longer runs
+# of short groups are table cells.
+MAX_GROUPS = 5
+
+def normalize_phone(candidate: str, validation: str = SCRAPER_PHONE_VALIDATION,
+                    region: str = SCRAPER_PHONE_REGION) -> Optional[str]:
+    """Return ``candidate`` as ``+<digits>``/``<digits>``, or None if it is not a phone.
+
+    ``validation`` is "off" (digit count only), "possible" or "valid"; the
+    last two check the number with phonenumbers and return it in E.164.
+    """
+    groups = DIGIT_GROUP_PATTERN.findall(candidate)
+    digits = ''.join(groups)
+    international = candidate.lstrip().startswith('+')
+    # Cheap shape checks first so phonenumbers only sees plausible numbers.
+    if not MIN_DIGITS <= len(digits) + international <= MAX_DIGITS:
+        return None
+    if len(groups) > MAX_GROUPS + international:
+        return None
+    if validation == "off":
+        return f"+{digits}" if international else digits
+    try:
+        number = phonenumbers.parse(f"+{digits}" if international else digits, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if validation == "valid":
+        ok = phonenumbers.is_valid_number(number)
+    else:
+        ok = phonenumbers.is_possible_number(number)
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164) if ok else None
+
+def _phones_in(candidate: str, validation: str, region: str) -> List[str]:
+    """The phones among runs of consecutive digit groups of ``candidate``.
+
+    Runs of 10-15 digits and at most MAX_GROUPS groups are tried fewest digits
+    first, so digits next to a number are left out of it; a "+" prefix is only
+    kept by runs starting at the first group, which are tried before the others.
+    """
+    groups = list(DIGIT_GROUP_PATTERN.finditer(candidate))
+    international = candidate.startswith('+')
+    runs = []
+    for first in range(len(groups)):
+        prefixed = international and first == 0
+        digits = 0
+        for last in range(first, min(len(groups), first + MAX_GROUPS + prefixed)):
+            digits += len(groups[last].group())
+            if digits + prefixed > MAX_DIGITS:
+                break
+            if digits + prefixed >= MIN_DIGITS:
+                runs.append((not prefixed, digits, first, last))
+    phones, taken = [], set()
+    for _, _, first, last in sorted(runs):
+        if taken.intersection(range(first, last + 1)):
+            continue
+        start = 0 if first == 0 else groups[first].start()
+        phone = normalize_phone(candidate[start:groups[last].end()], validation, region)
+        if phone:
+            phones.append(phone)
+            taken.update(range(first, last + 1))
+    return phones
+
+def find_phones(text: str, extra: Iterable[str] = (), validation: str = SCRAPER_PHONE_VALIDATION,
+                region: str = SCRAPER_PHONE_REGION) -> List[str]:
+    """Locate and normalize phone numbers in ``text`` plus ``extra`` raw values (tel: links)."""
+    phones = {phone for phone in (normalize_phone(value, validation, region) for value in extra) if phone}
+    for match in PHONE_CANDIDATE_PATTERN.finditer(text):
+        # A candidate shorter than MIN_DIGITS characters cannot hold enough digits.
+        if match.end() - match.start() >= MIN_DIGITS:
+            phones.update(_phones_in(match.group(), validation, region))
+    return list(phones)
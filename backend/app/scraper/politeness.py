@@ -0,0 +1,351 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from loguru import logger
+
+from app.config import (
+    SCRAPER_HOST_BURST,
+    SCRAPER_HOST_RATE,
+    SCRAPER_RESPECT_ROBOTS,
+    SCRAPER_ROBOTS_TTL,
+    SCRAPER_THROTTLE_BACKOFF,
+    SCRAPER_THROTTLE_MAX_DELAY,
+    SCRAPER_THROTTLE_RETRIES,
+    SCRAPER_USER_AGENT,
+)
+from app.scraper.fetcher import fetch_async
+
+THROTTLE_STATUSES = {429, 503}
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+class Throttled(Exception):
+    """The host answered 429/503; retry the URL after ``retry_after`` seconds (None: back off)."""
+
+    def __init__(self, url: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"{url} throttled with status {status_code}")
+        self.url = url
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def _robots_lines(text: str) -> List[str]:
+    """robots.txt lines, with fractional Crawl-delay values (which urllib ignores) rounded up."""
+    lines = []
+    for line in text.splitlines():
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "crawl-delay":
+            try:
+                line = f"Crawl-delay: {math.ceil(float(value.split('#')[0]))}"
+            except ValueError:
+                pass
+        lines.append(line)
+    return lines
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+class RobotsCache:
+    """Parsed robots.txt per origin, shared by every crawl in the process."""
+
+    def __init__(self, ttl: float = SCRAPER_ROBOTS_TTL, user_agent: str = SCRAPER_USER_AGENT):
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self._lock = threading.Lock()
+        self._rules: Dict[str, Tuple[RobotFileParser, float]] = {}
+        self.fetches = 0
+
+    def cached(self, origin: str) -> Optional[RobotFileParser]:
+        with self._lock:
+            entry = self._rules.get(origin)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    async def load(self, client: httpx.AsyncClient, origin: str) -> RobotFileParser:
+        rules = self.cached(origin)
+        if rules is not None:
+            return rules
+        rules = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = await fetch_async(client, f"{origin}/robots.txt")
+            if response.status_code in (401, 403):
+                rules.disallow_all = True
+            elif response.status_code == 200:
+                rules.parse(_robots_lines(response.text))
+            else:
+                rules.allow_all = True
+        except Exception as e:
+            logger.warning(f"Could not fetch robots.txt for {origin}: {str(e)}")
+            rules.allow_all = True
+        with self._lock:
+            self.fetches += 1
+            self._rules[origin] = (rules, time.monotonic() + self.ttl)
+        return rules
+
+    def allowed(self, rules: RobotFileParser, url: str) -> bool:
+        return rules.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, rules: RobotFileParser) -> Optional[float]:
+        delay = rules.crawl_delay(self.user_agent)
+        return float(delay) if delay else None
+
+robots_cache = RobotsCache()
+
+class HostState:
+    def __init__(self, rate: Optional[float], burst: int):
+        self.queue: Deque[Tuple[str, int]] = deque()
+        self.in_flight = 0
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttles = 0
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_loading = False
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def ready_at(self, now: float) -> float:
+        """Earliest time a request may start, ignoring the per-host concurrency limit."""
+        ready = self.blocked_until
+        if self.rate:
+            self._refill(now)
+            if self.tokens < 1:
+                ready = max(ready, now + (1 - self.tokens) / self.rate)
+        return max(ready, now)
+
+    def take(self, now: float):
+        if self.rate:
+            self._refill(now)
+            self.tokens -= 1
+
+    async def acquire(self):
+        """Wait for a token, for requests made outside a HostScheduler."""
+        while True:
+            now = time.monotonic()
+            ready = self.ready_at(now)
+            if ready <= now:
+                self.take(now)
+                return
+            await asyncio.sleep(ready - now)
+
+    def apply_crawl_delay(self, delay: float):
+        # Crawl-delay is one request per ``delay`` seconds, with no bursts.
+        rate = 1 / delay
+        self.base_rate = self.rate = min(rate, self.base_rate) if self.base_rate else rate
+        self.burst = 1
+        self.tokens = min(self.tokens, 1)
+
+class HostScheduler:
+    """Hands out URLs so each host gets a fair, rate-limited share of the workers.
+
+    URLs are queued per host. ``next()`` rotates over the hosts and returns a URL
+    from the first one that has a token in its bucket, a free concurrency slot
+    and no pending back-off, so a host with many links or a slow rate never
+    blocks workers that could be fetching from other hosts.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        per_host_limit: int,
+        rate: Optional[float] = SCRAPER_HOST_RATE,
+        burst: int = SCRAPER_HOST_BURST,
+        respect_robots: bool = SCRAPER_RESPECT_ROBOTS,
+        robots: RobotsCache = robots_cache,
+        max_retries: int = SCRAPER_THROTTLE_RETRIES,
+    ):
+        self.client = client
+        self.per_host_limit = max(1, per_host_limit)
+        self.rate = rate or None
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.robots = robots
+        self.max_retries = max_retries
+        self._hosts: Dict[str, HostState] = {}
+        self._order: Deque[str] = deque()
+        self._queued = 0
+        self._in_flight = 0
+        # URLs that cost the host nothing (e.g. fresh in the disk cache) bypass the host queues.
+        self._immediate: Deque[str] = deque()
+        self._immediate_in_flight: Set[str] = set()
+        self._changed = asyncio.Event()
+        self._robots_tasks = set()
+        self.disallowed = 0
+        self.throttled = 0
+
+    def _host(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.rate, self.burst)
+            self._order.append(host)
+        return state
+
+    @property
+    def queued(self) -> int:
+        return self._queued + len(self._immediate)
+
+    def _rules(self, url: str) -> Optional[RobotFileParser]:
+        origin = _origin(url)
+        state = self._hosts.get(origin)
+        if state is not None and state.robots is not None:
+            return state.robots
+        return self.robots.cached(origin)
+
+    def add(self, url: str, attempt: int = 0, immediate: bool = False):
+        # Immediate URLs skip the host queue, so they wait in it until robots.txt is known.
+        if immediate and (not self.respect_robots or self._rules(url) is not None):
+            self._immediate.append(url)
+        else:
+            self._host(_origin(url)).queue.append((url, attempt))
+            self._queued += 1
+        self._changed.set()
+
+    async def _load_robots(self, host: str, state: HostState):
+        try:
+            state.robots = await self.robots.load(self.client, host)
+        finally:
+            state.robots_loading = False
+            self._changed.set()
+        delay = self.robots.crawl_delay(state.robots)
+        if delay:
+            state.apply_crawl_delay(delay)
+            logger.info(f"Honoring Crawl-delay of {delay}s for {host}")
+
+    def _pick(self, now: float) -> Tuple[Optional[Tuple[str, int]], Optional[float]]:
+        """Next URL that may start now, or the time to wait before asking again."""
+        wake = None
+        for _ in range(len(self._order)):
+            host = self._order[0]
+            self._order.rotate(-1)
+            state = self._hosts[host]
+            if not state.queue or state.in_flight >= self.per_host_limit:
+                continue
+            if self.respect_robots and state.robots is None:
+                if not state.robots_loading:
+                    state.robots_loading = True
+                    task = asyncio.create_task(self._load_robots(host, state))
+                    self._robots_tasks.add(task)
+                    task.add_done_callback(self._robots_tasks.discard)
+                continue
+            ready = state.ready_at(now)
+            if ready > now:
+                wake = ready if wake is None else min(wake, ready)
+                continue
+            state.take(now)
+            state.in_flight += 1
+            self._queued -= 1
+            self._in_flight += 1
+            return state.queue.popleft(), None
+        return None, wake
+
+    async def next(self) -> Optional[Tuple[str, int, bool]]:
+        """Wait for the next ``(url, attempt, polite)`` to fetch; None once everything is done.
+
+        ``polite`` is False for URLs added with ``immediate``, which skip the rate
+        limit and throttling but not robots.txt. Call ``done`` or ``throttle`` when
+        the fetch is over.
+        """
+        while True:
+            if not self.queued and not self._in_flight:
+                self._changed.set()
+                return None
+            self._changed.clear()
+            if self._immediate:
+                url = self._immediate.popleft()
+                self._immediate_in_flight.add(url)
+                self._in_flight += 1
+                return url, 0, False
+            item, wake = self._pick(time.monotonic())
+            if item is not None:
+                return item[0], item[1], True
+            timeout = None if wake is None else max(0.0, wake - time.monotonic())
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        rules = self._rules(url)
+        if rules is None or self.robots.allowed(rules, url):
+            return True
+        self.disallowed += 1
+        return False
+
+    def done(self, url: str):
+        self._in_flight -= 1
+        self._changed.set()
+        if url in self._immediate_in_flight:
+            self._immediate_in_flight.discard(url)
+            return
+        state = self._hosts[_origin(url)]
+        state.in_flight -= 1
+        state.throttles = 0
+        if state.base_rate and state.rate < state.base_rate:
+            # Additive increase back toward the configured rate after a back-off.
+            state.rate = min(state.base_rate, state.rate + state.base_rate / 10)
+
+    def throttle(self, url: str, attempt: int, retry_after: Optional[float]) -> bool:
+        """Back the host off after a 429/503; returns False once the URL is out of retries."""
+        host = _origin(url)
+        state = self._hosts[host]
+        state.in_flight -= 1
+        self._in_flight -= 1
+        self.throttled += 1
+        state.throttles += 1
+        if state.rate:
+            # Multiplicative decrease, so repeated throttling slows the host quickly.
+            state.rate = max(state.base_rate / 32, state.rate / 2)
+        delay = retry_after if retry_after is not None else SCRAPER_THROTTLE_BACKOFF * 2 ** (state.throttles - 1)
+        delay = min(delay, SCRAPER_THROTTLE_MAX_DELAY)
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        logger.warning(f"{host} is throttling requests, pausing it for {delay:.1f}s")
+        self._changed.set()
+        if attempt >= self.max_retries:
+            return False
+        state.queue.append((url, attempt + 1))
+        self._queued += 1
+        return True
+
+    async def close(self):
+        for task in list(self._robots_tasks):
+            task.cancel()
+        await asyncio.gather(*self._robots_tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "hosts": len(self._hosts),
+            "disallowed": self.disallowed,
+            "throttled": self.throttled,
+            "rates": {host: state.rate for host, state in self._hosts.items()},
+        }
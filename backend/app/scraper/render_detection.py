@@ -0,0 +1,206 @@
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.config import SCRAPER_RENDER_LEARN_SAMPLES, SCRAPER_RENDER_SCORE_THRESHOLD
+from app.scraper.extractors import extract_data
+
+SPA_ROOT_PATTERN = re.compile(
+    r'<(?:div|main|section)\b[^>]*\bid=["\'](?:root|app|__next|__nuxt|___gatsby|svelte)["\'][^>]*>\s*</(?:div|main|section)>'
+    r'|<app-root\b[^>]*>\s*</app-root>',
+    re.IGNORECASE
+)
+NOSCRIPT_HINT_PATTERN = re.compile(
+    r'<noscript\b[^>]*>(?:(?!</noscript>).){0,400}?(?:enable|requires?|turn on|need)\s+(?:javascript|js)\b',
+    re.IGNORECASE | re.DOTALL
+)
+BUNDLE_PATTERN = re.compile(
+    r'<script\b[^>]*\bsrc=["\'][^"\']*(?:/_next/static/|/_nuxt/|/static/js/main\.|runtime[~.-]|chunk-vendors'
+    r'|(?:app|main|bundle|vendor|polyfills)[.-][0-9a-f]{6,}\.js|bundle\.js)',
+    re.IGNORECASE
+)
+CHALLENGE_PATTERN = re.compile(
+    r'cf-browser-verification|challenge-platform|just a moment\.\.\.|please enable cookies|captcha',
+    re.IGNORECASE
+)
+NON_TEXT_PATTERN = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+SHELL_TEXT_LENGTH = 200
+RICH_TEXT_LENGTH = 1500
+LOW_TEXT_RATIO = 0.02
+CHALLENGE_STATUSES = {403, 429, 503}
+
+def visible_text_length(html: str) -> int:
+    text = TAG_PATTERN.sub(' ', NON_TEXT_PATTERN.sub(' ', html))
+    return len(WHITESPACE_PATTERN.sub(' ', text).strip())
+
+def classify_html(html: str, status_code: Optional[int] = 200) -> Tuple[int, List[str]]:
+    signals = []
+    score = 0
+
+    text_length = visible_text_length(html)
+    if text_length < SHELL_TEXT_LENGTH:
+        score += 2
+        signals.append("little-text")
+    elif html and text_length / len(html) < LOW_TEXT_RATIO:
+        score += 1
+        signals.append("low-text-ratio")
+    elif text_length > RICH_TEXT_LENGTH:
+        score -= 3
+        signals.append("rich-text")
+
+    if SPA_ROOT_PATTERN.search(html):
+        score += 3
+        signals.append("empty-spa-root")
+    if NOSCRIPT_HINT_PATTERN.search(html):
+        score += 2
+        signals.append("noscript-hint")
+    if BUNDLE_PATTERN.search(html):
+        score += 1
+        signals.append("framework-bundle")
+    if status_code in CHALLENGE_STATUSES and CHALLENGE_PATTERN.search(html):
+        score += 3
+        signals.append("js-challenge")
+
+    return score, signals
+
+def _extraction_signature(html: str, url: str) -> str:
+    data = extract_data(html, url)
+    for key, value in data.items():
+        if isinstance(value, list):
+            data[key] = sorted(map(str, value))
+    contacts = data.get("contacts")
+    if isinstance(contacts, dict):
+        for key, value in contacts.items():
+            if isinstance(value, list):
+                contacts[key] = sorted(map(str, value))
+    return json.dumps(data, sort_keys=True, default=str)
+
+class _DomainRecord:
+    def __init__(self):
+        self.renders = 0
+        self.useful = 0
+
+class RenderStats:
+    COUNTERS = (
+        "memory_hits", "memory_misses", "render_decisions", "static_decisions", "renders", "sampled_renders", "useful_renders",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for field in self.COUNTERS:
+            setattr(self, field, 0)
+
+    def record(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def add(self, snapshot: Dict):
+        """Add the counters of another snapshot, e.g. a finished task's."""
+        with self._lock:
+            for field in self.COUNTERS:
+                setattr(self, field, getattr(self, field) + (snapshot.get(field) or 0))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.memory_misses
+            return {
+                "memory_hits": self.memory_hits,
+                "memory_misses": self.memory_misses,
+                "memory_hit_rate": round(self.memory_hits / lookups, 3) if lookups else 0.0,
+                **{field: getattr(self, field) for field in self.COUNTERS[2:]},
+            }
+
+class RenderDecider:
+    """Decides whether a page needs a headless render and learns per domain whether it pays off.
+
+    Decisions are counted in ``counters`` and, when given, in a task's ``task_stats``.
+    """
+
+    def __init__(
+        self,
+        threshold: int = SCRAPER_RENDER_SCORE_THRESHOLD,
+        learn_samples: int = SCRAPER_RENDER_LEARN_SAMPLES,
+    ):
+        self.threshold = threshold
+        self.learn_samples = max(1, learn_samples)
+        self._lock = threading.Lock()
+        self._domains: Dict[str, _DomainRecord] = {}
+        self.counters = RenderStats()
+
+    def _record(self, counter: str, task_stats: Optional[RenderStats]):
+        self.counters.record(counter)
+        if task_stats is not None:
+            task_stats.record(counter)
+
+    def _remembered(self, domain: str) -> Optional[bool]:
+        record = self._domains.get(domain)
+        if record is None or record.renders < self.learn_samples:
+            return None
+        if record.useful == 0:
+            return False
+        if record.useful == record.renders:
+            return True
+        return None
+
+    def remembered(self, url: str) -> Optional[bool]:
+        with self._lock:
+            return self._remembered(urlparse(url).netloc.lower())
+
+    def should_render(
+        self, url: str, html: Optional[str], status_code: Optional[int] = 200, task_stats: Optional[RenderStats] = None
+    ) -> bool:
+        # Nothing usable came back over HTTP, the browser is the only option left.
+        if html is None:
+            return True
+
+        domain = urlparse(url).netloc.lower()
+        with self._lock:
+            decision = self._remembered(domain)
+        self._record("memory_hits" if decision is not None else "memory_misses", task_stats)
+
+        if decision is None:
+            score, _ = classify_html(html, status_code)
+            decision = score >= self.threshold
+
+        self._record("render_decisions" if decision else "static_decisions", task_stats)
+        return decision
+
+    def record_render(
+        self, url: str, static_html: Optional[str], rendered_html: str, task_stats: Optional[RenderStats] = None
+    ) -> Optional[bool]:
+        domain = urlparse(url).netloc.lower()
+        with self._lock:
+            record = self._domains.setdefault(domain, _DomainRecord())
+            learning = record.renders < self.learn_samples
+            if learning:
+                # Reserve the sample so concurrent renders do not over-count.
+                record.renders += 1
+        self._record("renders", task_stats)
+        if learning:
+            self._record("sampled_renders", task_stats)
+
+        if not learning:
+            return None
+
+        if static_html is None:
+            useful = True
+        else:
+            useful = _extraction_signature(static_html, url) != _extraction_signature(rendered_html, url)
+
+        if useful:
+            with self._lock:
+                record.useful += 1
+            self._record("useful_renders", task_stats)
+        return useful
+
+    def stats(self) -> Dict:
+        with self._lock:
+            domains = len(self._domains)
+        return {"domains": domains, **self.counters.snapshot()}
+
+render_decider = RenderDecider()
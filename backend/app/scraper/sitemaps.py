@@ -0,0 +1,205 @@
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import httpx
+from loguru import logger
+
+from app.config import (
+    SCRAPER_HOST_BURST,
+    SCRAPER_HOST_RATE,
+    SCRAPER_RESPECT_ROBOTS,
+    SCRAPER_SITEMAP_MAX_BYTES,
+    SCRAPER_SITEMAP_MAX_FILES,
+    SCRAPER_SITEMAP_MAX_URLS,
+)
+from app.scraper.fetcher import PoolStats, stats as fetch_stats
+from app.scraper.politeness import (
+    THROTTLE_STATUSES,
+    HostState,
+    RobotsCache,
+    Throttled,
+    parse_retry_after,
+    robots_cache,
+)
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Decompressed bytes handed to the XML parser at a time, so a small gzip cannot expand all at once.
+INFLATE_CHUNK = 256 * 1024
+
+class SitemapUrl(NamedTuple):
+    url: str
+    lastmod: Optional[float]
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Unix time of a W3C datetime ``<lastmod>`` (``2024``, ``2024-05-01``, ``2024-05-01T10:00Z``...)."""
+    if not value:
+        return None
+    value = value.strip()
+    # fromisoformat needs at least a full date.
+    if len(value) == 4:
+        value += "-01-01"
+    elif len(value) == 7:
+        value += "-01"
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+class SitemapParser:
+    """Incremental parser for sitemap and sitemap index files, plain or gzipped.
+
+    Bytes are fed as they arrive and every ``<url>`` is cleared once read, so
+    memory stays flat however many URLs a file lists. ``feed`` returns
+    ``(kind, SitemapUrl)`` pairs, where kind is ``"url"`` for a page and
+    ``"sitemap"`` for a child sitemap of an index.
+    """
+
+    def __init__(self, max_bytes: int = SCRAPER_SITEMAP_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.error: Optional[str] = None
+        self._inflater = None
+        self._started = False
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+        self._loc: Optional[str] = None
+        self._lastmod: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, SitemapUrl]]:
+        entries = []
+        if self.done or not chunk:
+            return entries
+        if not self._started:
+            self._started = True
+            # .xml.gz files are usually served as-is rather than with Content-Encoding.
+            if chunk[:2] == GZIP_MAGIC:
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        if self._inflater is None:
+            self._parse(chunk, entries)
+            return entries
+        try:
+            while chunk and not self.done:
+                self._parse(self._inflater.decompress(chunk, INFLATE_CHUNK), entries)
+                chunk = self._inflater.unconsumed_tail
+        except zlib.error as e:
+            self.error = f"bad gzip data: {str(e)}"
+        return entries
+
+    def _parse(self, data: bytes, entries: List[Tuple[str, SitemapUrl]]):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.error = f"larger than {self.max_bytes} bytes"
+            return
+        try:
+            self._parser.feed(data)
+            for event, element in self._parser.read_events():
+                name = element.tag.rpartition("}")[2]
+                if event == "start":
+                    self._depth += 1
+                    if self._depth == 1:
+                        self._root = element
+                    continue
+                self._depth -= 1
+                # Only direct children of <url>/<sitemap>; extensions such as <image:loc> sit deeper.
+                if self._depth == 2:
+                    if name == "loc":
+                        self._loc = (element.text or "").strip()
+                    elif name == "lastmod":
+                        self._lastmod = parse_lastmod(element.text)
+                elif self._depth == 1:
+                    if self._loc and name in ("url", "sitemap"):
+                        entries.append((name, SitemapUrl(self._loc, self._lastmod)))
+                    self._loc = self._lastmod = None
+                    self._root.clear()
+        except ParseError as e:
+            self.error = f"invalid XML: {str(e)}"
+
+async def read_sitemap(
+    client: httpx.AsyncClient, url: str, max_urls: int, max_bytes: int = SCRAPER_SITEMAP_MAX_BYTES,
+    task_stats: Optional[PoolStats] = None,
+) -> Tuple[List[SitemapUrl], List[SitemapUrl]]:
+    """Stream one sitemap file; returns its page URLs (at most ``max_urls``) and child sitemaps."""
+    urls, children = [], []
+    parser = SitemapParser(max_bytes)
+    async with client.stream("GET", url) as response:
+        if response.status_code in THROTTLE_STATUSES:
+            raise Throttled(url, response.status_code, parse_retry_after(response.headers.get("retry-after")))
+        if response.status_code != 200:
+            logger.debug(f"Sitemap {url} returned status {response.status_code}")
+            return urls, children
+        async for chunk in response.aiter_bytes():
+            for kind, entry in parser.feed(chunk):
+                if kind == "sitemap":
+                    children.append(entry)
+                elif len(urls) < max_urls:
+                    urls.append(entry)
+            if parser.done or len(urls) >= max_urls:
+                break
+        fetch_stats.record(response)
+        if task_stats is not None:
+            task_stats.record(response)
+    if parser.error:
+        logger.warning(f"Stopped reading sitemap {url}: {parser.error}")
+    return urls, children
+
+async def sitemap_urls(
+    client: httpx.AsyncClient,
+    start_url: str,
+    max_urls: int = SCRAPER_SITEMAP_MAX_URLS,
+    max_files: int = SCRAPER_SITEMAP_MAX_FILES,
+    robots: RobotsCache = robots_cache,
+    respect_robots: bool = SCRAPER_RESPECT_ROBOTS,
+    rate: Optional[float] = SCRAPER_HOST_RATE,
+    task_stats: Optional[PoolStats] = None,
+) -> List[SitemapUrl]:
+    """Page URLs listed in the sitemaps of ``start_url``'s site, with their lastmod times.
+
+    Sitemaps come from the ``Sitemap:`` lines of robots.txt, or /sitemap.xml
+    when it lists none. Sitemap indexes are followed, most recently modified
+    child first, up to ``max_files`` files in all. Files are requested at the
+    host's ``rate`` (or its Crawl-delay), and a 429/503 ends the reading.
+    """
+    parts = urlsplit(start_url)
+    origin = f"{parts.scheme}://{parts.netloc}".lower()
+    rules = await robots.load(client, origin)
+    pace = HostState(rate or None, SCRAPER_HOST_BURST)
+    delay = robots.crawl_delay(rules) if respect_robots else None
+    if delay:
+        pace.apply_crawl_delay(delay)
+    queue = deque(rules.site_maps() or [f"{origin}/sitemap.xml"])
+    seen = set(queue)
+    urls: List[SitemapUrl] = []
+    files = 0
+    while queue and files < max_files and len(urls) < max_urls:
+        sitemap = queue.popleft()
+        if respect_robots and not robots.allowed(rules, sitemap):
+            logger.info(f"robots.txt disallows sitemap {sitemap}, skipping")
+            continue
+        files += 1
+        await pace.acquire()
+        try:
+            found, children = await read_sitemap(client, sitemap, max_urls - len(urls), task_stats=task_stats)
+        except Throttled as e:
+            logger.warning(f"Stopped reading sitemaps for {origin}: {str(e)}")
+            break
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch sitemap {sitemap}: {str(e)}")
+            continue
+        urls.extend(found)
+        children = [child for child in children if child.url not in seen]
+        seen.update(child.url for child in children)
+        queue.extend(child.url for child in sorted(children, key=lambda child: child.lastmod or 0, reverse=True))
+    logger.info(f"Read {len(urls)} URLs from {files} sitemap files for {origin}")
+    return urls
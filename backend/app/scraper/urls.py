@@ -0,0 +1,78 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only track the visitor and never change the page.
+TRACKING_PARAM_PATTERN = re.compile(
+    r"^(?:utm_\w+|gclid|dclid|fbclid|msclkid|yclid|mc_cid|mc_eid|_ga|_gl|_hs\w+|sessionid|phpsessid|jsessionid|sid)$",
+    re.IGNORECASE,
+)
+PERCENT_ESCAPE_PATTERN = re.compile(r"%[0-9a-fA-F]{2}")
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+# Characters left as-is in paths; anything else (spaces, quotes, non-ASCII) is percent-encoded.
+PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+def _remove_dot_segments(path: str) -> str:
+    output = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    if path.endswith(("/.", "/..")):
+        output.append("")
+    return "/".join(output) or "/"
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in UNRESERVED else match.group(0).upper()
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """A single spelling for every URL of the same page, or None if it is not a crawlable http(s) URL.
+
+    Resolves ``url`` against ``base``, then applies normalize_url and also
+    resolves dot segments, normalizes percent-encoding, drops tracking
+    parameters and sorts the query.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+    if port and DEFAULT_PORTS[scheme] != port:
+        host = f"{host}:{port}"
+
+    path = quote(_remove_dot_segments(parts.path or "/"), safe=PATH_SAFE)
+    path = PERCENT_ESCAPE_PATTERN.sub(_normalize_escape, path)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAM_PATTERN.match(name)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def site_of(url: str) -> str:
+    """Host of ``url`` without a leading ``www.``, used to group a site's subdomains."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
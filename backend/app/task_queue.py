@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, insert, select, update
+
+from app.config import (
+    SCRAPER_MAX_RUNNING_TASKS,
+    SCRAPER_STALL_TIMEOUT,
+    SCRAPER_TASK_MAX_ATTEMPTS,
+    SCRAPER_TASKS_PER_HOST,
+)
+from app.database import SessionLocal
+from app.events import publish
+from app.models import ScrapeBatch, ScrapeTask
+from app.scraper.urls import site_of
+
+# Child task rows per INSERT statement when a batch is enqueued.
+BATCH_INSERT_SIZE = 1000
+
+class TaskAbandoned(Exception):
+    """The task was requeued to another worker while this one was running it."""
+
+def held_by(worker_id: Optional[str]):
+    """Where-clause for a task still running under ``worker_id`` (None for a task run without a worker)."""
+    table = ScrapeTask.__table__
+    owner = table.c.worker_id == worker_id if worker_id is not None else table.c.worker_id.is_(None)
+    return and_(table.c.status == "running", owner)
+
+class TaskQueue:
+    """Durable scrape queue stored in the ``scrape_tasks`` table.
+
+    Workers claim a queued task with a conditional update, so two workers can
+    never run the same task. Running tasks carry the claiming ``worker_id`` and
+    a heartbeat; tasks whose heartbeat goes stale are put back in the queue.
+
+    The same update enforces limits shared by every worker: at most
+    ``max_running`` tasks at once (0: no limit) and ``per_host`` per site, so a
+    batch of seeds on one site does not crawl it many times in parallel.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        stall_timeout: float = SCRAPER_STALL_TIMEOUT,
+        max_attempts: int = SCRAPER_TASK_MAX_ATTEMPTS,
+        max_running: int = SCRAPER_MAX_RUNNING_TASKS,
+        per_host: int = SCRAPER_TASKS_PER_HOST,
+    ):
+        self.session_factory = session_factory
+        self.stall_timeout = stall_timeout
+        self.max_attempts = max_attempts
+        self.max_running = max(0, max_running)
+        self.per_host = max(0, per_host)
+
+    def enqueue(self, url: str, params: dict) -> ScrapeTask:
+        db = self.session_factory()
+        try:
+            task = ScrapeTask(url=url, status="queued", params=params, attempts=0, host=site_of(url) or None)
+            db.add(task)
+            db.commit()
+            db.refresh(task)
+            return task
+        finally:
+            db.close()
+
+    def enqueue_batch(self, urls: Sequence[str], params: dict) -> Tuple[int, int]:
+        """Queue one task per URL under a new batch, in one transaction; returns ``(batch_id, tasks)``."""
+        db = self.session_factory()
+        try:
+            batch = ScrapeBatch(params=params, task_count=len(urls))
+            db.add(batch)
+            db.flush()
+            now = datetime.utcnow()
+            table = ScrapeTask.__table__
+            for start in range(0, len(urls), BATCH_INSERT_SIZE):
+                db.execute(insert(table), [
+                    {
+                        "url": url, "status": "queued", "params": {**params, "url": url}, "attempts": 0,
+                        "created_at": now, "batch_id": batch.id, "host": site_of(url) or None,
+                    }
+                    for url in urls[start:start + BATCH_INSERT_SIZE]
+                ])
+            db.commit()
+            return batch.id, len(urls)
+        finally:
+            db.close()
+
+    def _limits(self, table):
+        """Conditions a queued task must meet to start under the shared running limits."""
+        running = table.alias("running")
+        conditions = []
+        if self.max_running:
+            conditions.append(
+                select(func.count()).select_from(running).where(running.c.status == "running").scalar_subquery()
+                < self.max_running
+            )
+        if self.per_host:
+            # Uncorrelated, so the database finds the busy hosts once rather than per queued row.
+            busy_hosts = (
+                select(running.c.host)
+                .where(running.c.status == "running", running.c.host != None)  # noqa: E711
+                .group_by(running.c.host)
+                .having(func.count() >= self.per_host)
+            )
+            conditions.append((table.c.host == None) | table.c.host.not_in(busy_hosts))  # noqa: E711
+        return conditions
+
+    def claim(self, worker_id: str) -> Optional[ScrapeTask]:
+        """Mark the oldest queued task the running limits allow as running for ``worker_id`` and return it."""
+        table = ScrapeTask.__table__
+        limits = self._limits(table)
+        db = self.session_factory()
+        try:
+            while True:
+                task_id = db.execute(
+                    select(table.c.id).where(table.c.status == "queued", *limits).order_by(table.c.id).limit(1)
+                ).scalar()
+                if task_id is None:
+                    return None
+                claimed = db.execute(
+                    update(table)
+                    .where(table.c.id == task_id, table.c.status == "queued", *limits)
+                    .values(
+                        status="running",
+                        worker_id=worker_id,
+                        heartbeat_at=datetime.utcnow(),
+                        attempts=func.coalesce(table.c.attempts, 0) + 1,
+                    )
+                )
+                db.commit()
+                # Another worker won the race for this row (or filled its host); try the next one.
+                if claimed.rowcount == 1:
+                    return db.get(ScrapeTask, task_id)
+        finally:
+            db.close()
+
+    def heartbeat(self, worker_id: str, task_ids: List[int]) -> List[int]:
+        """Refresh the heartbeat of tasks still owned by ``worker_id``.
+
+        Returns the ids that are no longer owned, i.e. were requeued elsewhere.
+        """
+        if not task_ids:
+            return []
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(table)
+                .where(table.c.id.in_(task_ids), table.c.worker_id == worker_id, table.c.status == "running")
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+            owned = db.execute(
+                select(table.c.id).where(
+                    table.c.id.in_(task_ids), table.c.worker_id == worker_id, table.c.status == "running"
+                )
+            ).scalars().all()
+            return [task_id for task_id in task_ids if task_id not in set(owned)]
+        finally:
+            db.close()
+
+    def finish(self, task_id: int, worker_id: str, status: str = "failed") -> None:
+        """Settle a task the handler left in ``running`` (e.g. it crashed)."""
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            settled = db.execute(
+                update(table)
+                .where(table.c.id == task_id, table.c.worker_id == worker_id, table.c.status == "running")
+                .values(status=status)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        if settled:
+            publish(task_id, "status", {"status": status}, self.session_factory)
+
+    def requeue_stalled(self) -> Dict[str, int]:
+        """Requeue running tasks with a stale heartbeat, failing those out of attempts."""
+        table = ScrapeTask.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stall_timeout)
+        stalled = (
+            table.c.status == "running",
+            (table.c.heartbeat_at == None) | (table.c.heartbeat_at < cutoff),  # noqa: E711
+        )
+        db = self.session_factory()
+        try:
+            failed = db.execute(
+                update(table)
+                .where(*stalled, func.coalesce(table.c.attempts, 0) >= self.max_attempts)
+                .values(status="failed", worker_id=None)
+                .returning(table.c.id)
+            ).scalars().all()
+            requeued = db.execute(
+                update(table)
+                .where(*stalled)
+                .values(status="queued", worker_id=None, heartbeat_at=None)
+                .returning(table.c.id)
+            ).scalars().all()
+            db.commit()
+        finally:
+            db.close()
+        for task_id in failed:
+            publish(task_id, "status", {"status": "failed"}, self.session_factory)
+        for task_id in requeued:
+            publish(task_id, "status", {"status": "queued"}, self.session_factory)
+        return {"requeued": len(requeued), "failed": len(failed)}
+
+    def stats(self) -> dict:
+        table = ScrapeTask.__table__
+        db = self.session_factory()
+        try:
+            counts = dict(db.execute(select(table.c.status, func.count()).group_by(table.c.status)).all())
+            workers = db.execute(
+                select(func.count(func.distinct(table.c.worker_id))).where(table.c.status == "running")
+            ).scalar()
+            return {"tasks": counts, "active_workers": workers}
+        finally:
+            db.close()
+
+task_queue = TaskQueue()
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models import ScrapeTask
+from app.scraper.fetcher import PoolStats
+from app.scraper.http_cache import CacheStats
+from app.scraper.render_detection import RenderStats
+
+TASK_FIELDS = [column.name for column in ScrapeTask.__table__.columns]
+# params can be large and is only needed by workers.
+DEFAULT_TASK_FIELDS = [field for field in TASK_FIELDS if field != "params"]
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Turn ``"id,status"`` into a column list; raises ValueError on unknown names."""
+    if not fields:
+        return DEFAULT_TASK_FIELDS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown task fields: {', '.join(unknown)}")
+    return requested
+
+def list_tasks(
+    fields: Sequence[str] = DEFAULT_TASK_FIELDS,
+    status: Optional[Sequence[str]] = None,
+    url: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+    batch_id: Optional[int] = None,
+    session_factory=SessionLocal,
+) -> Tuple[List[Dict], Optional[int]]:
+    """Newest tasks first, ``limit`` at a time; pass the returned cursor to continue."""
+    table = ScrapeTask.__table__
+    # id is always selected because it is the pagination key.
+    columns = [table.c.id] + [table.c[field] for field in fields if field != "id"]
+    query = select(*columns)
+    if status:
+        query = query.where(table.c.status.in_(status))
+    if url:
+        query = query.where(table.c.url.contains(url, autoescape=True))
+    if created_after:
+        query = query.where(table.c.created_at >= created_after)
+    if created_before:
+        query = query.where(table.c.created_at < created_before)
+    if batch_id is not None:
+        query = query.where(table.c.batch_id == batch_id)
+    if cursor is not None:
+        query = query.where(table.c.id < cursor)
+
+    db = session_factory()
+    try:
+        rows = db.execute(query.order_by(table.c.id.desc()).limit(limit + 1)).mappings().all()
+    finally:
+        db.close()
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    keep_id = "id" in fields
+    tasks = []
+    for row in rows[:limit]:
+        task = dict(row)
+        if not keep_id:
+            task.pop("id")
+        tasks.append(task)
+    return tasks, next_cursor
+
+def get_task(task_id: int, fields: Sequence[str] = DEFAULT_TASK_FIELDS, session_factory=SessionLocal) -> Optional[Dict]:
+    table = ScrapeTask.__table__
+    db = session_factory()
+    try:
+        row = db.execute(select(*(table.c[field] for field in fields)).where(table.c.id == task_id)).mappings().first()
+    finally:
+        db.close()
+    return dict(row) if row else None
+
+def task_counts(session_factory=SessionLocal) -> Dict:
+    table = ScrapeTask.__table__
+    db = session_factory()
+    try:
+        by_status = dict(db.execute(select(table.c.status, func.count()).group_by(table.c.status)).all())
+    finally:
+        db.close()
+    return {"total": sum(by_status.values()), "by_status": by_status}
+
+def stats_totals(section: str, counters: Sequence[str], session_factory=SessionLocal) -> Tuple[Dict, int]:
+    """Sums of a section's ``counters`` in the stats of finished tasks, and how many tasks recorded it.
+
+    The database adds the JSON fields up, so no stats row is loaded into Python.
+    """
+    stats = ScrapeTask.__table__.c.stats
+    db = session_factory()
+    try:
+        row = db.execute(select(
+            func.count(stats[(section, counters[0])].as_integer()),
+            *(func.coalesce(func.sum(stats[(section, counter)].as_integer()), 0) for counter in counters),
+        )).one()
+    finally:
+        db.close()
+    return dict(zip(counters, row[1:])), row[0]
+
+def _section_totals(section: str, stats_class, session_factory) -> Dict:
+    sums, tasks = stats_totals(section, stats_class.COUNTERS, session_factory)
+    totals = stats_class()
+    totals.add(sums)
+    return {**totals.snapshot(), "tasks": tasks}
+
+def cache_totals(session_factory=SessionLocal) -> Dict:
+    """HTTP cache counters summed over the finished tasks that recorded them."""
+    return _section_totals("http_cache", CacheStats, session_factory)
+
+def pool_totals(session_factory=SessionLocal) -> Dict:
+    """Connection pool counters summed over the finished tasks that recorded them."""
+    return _section_totals("pool", PoolStats, session_factory)
+
+def render_totals(session_factory=SessionLocal) -> Dict:
+    """Render detection counters summed over the finished tasks that recorded them."""
+    return _section_totals("render", RenderStats, session_factory)
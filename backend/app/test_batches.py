@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import pytest
+from sqlalchemy import event, update
+
+from app.batches import batch_progress, parse_seeds, read_seed_csv
+from app.conftest import make_session_factory
+from app.exporters import export_batch_csv
+from app.models import ScrapeTask
+from app.result_store import ResultWriter, iter_batch_raw_records
+from app.task_queue import BATCH_INSERT_SIZE, TaskQueue
+from app.test_db_load import BACKEND_DIR, free_port
+
+def make_queue(db_path, **kwargs):
+    return TaskQueue(make_session_factory(db_path), **kwargs)
+
+def set_status(session_factory, task_ids, status):
+    db = session_factory()
+    try:
+        db.execute(update(ScrapeTask.__table__).where(ScrapeTask.id.in_(task_ids)).values(status=status))
+        db.commit()
+    finally:
+        db.close()
+
+def test_parse_seeds_and_csv():
+    urls, rejected, duplicates = parse_seeds([
+        "acme.example", "https://acme.example/", " http://globex.example/about ", "", "# comment",
+        "ftp://files.example", "not a url", "https://ACME.example",
+    ])
+    assert urls == ["https://acme.example", "http://globex.example/about"]
+    assert rejected == ["ftp://files.example", "not a url"]
+    assert duplicates == 2
+
+    assert read_seed_csv("Name,Website\nAcme,acme.example\nGlobex,\nInitech,initech.example\n") == ["acme.example", "", "initech.example"]
+    assert read_seed_csv("acme.example\n\nhttps://globex.example\n") == ["acme.example", "https://globex.example"]
+    assert read_seed_csv("") == []
+
+def test_batch_is_queued_with_bulk_inserts():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "batch.db"))
+        urls = [f"https://company{i}.example" for i in range(10000)]
+        statements = []
+        event.listen(queue.session_factory.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        batch_id, tasks = queue.enqueue_batch(urls, {"max_pages": 5})
+        assert tasks == len(urls)
+        inserts = [sql for sql in statements if sql.startswith("INSERT INTO scrape_tasks")]
+        assert len(inserts) == math.ceil(len(urls) / BATCH_INSERT_SIZE)
+
+        db = queue.session_factory()
+        children = db.query(ScrapeTask).filter(ScrapeTask.batch_id == batch_id).order_by(ScrapeTask.id).all()
+        db.close()
+        assert [task.url for task in children] == urls
+        assert children[7].params == {"max_pages": 5, "url": urls[7]} and children[7].host == "company7.example"
+        assert batch_progress(batch_id, queue.session_factory)["by_status"] == {"queued": len(urls)}
+
+def test_claims_respect_shared_running_limits():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "limits.db"), max_running=3, per_host=1)
+        queue.enqueue_batch(
+            ["https://a.example/1", "https://www.a.example/2", "https://b.example", "https://c.example", "https://d.example"], {}
+        )
+        # Two workers claiming from the same table see the same limits.
+        other = TaskQueue(queue.session_factory, max_running=3, per_host=1)
+        assert [queue.claim("w1").url, other.claim("w2").url, queue.claim("w1").url] == [
+            "https://a.example/1", "https://b.example", "https://c.example"
+        ]
+        assert other.claim("w2") is None
+
+        set_status(queue.session_factory, [1], "completed")
+        # www.a.example is the same site, so it had to wait for a.example/1.
+        assert queue.claim("w1").url == "https://www.a.example/2"
+        assert queue.claim("w1") is None
+        unlimited = TaskQueue(queue.session_factory, max_running=0, per_host=1)
+        assert unlimited.claim("w3").url == "https://d.example"
+        assert unlimited.claim("w3") is None
+
+def test_batch_progress_and_export_aggregate_child_tasks():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "progress.db"))
+        session_factory = queue.session_factory
+        loose = queue.enqueue("https://loose.example", {}).id
+        batch_id, _ = queue.enqueue_batch([f"https://site{i}.example" for i in range(4)], {})
+        set_status(session_factory, [2, 3], "completed")
+        set_status(session_factory, [4], "failed")
+        for task_id, count in ((loose, 2), (2, 3), (3, 2)):
+            writer = ResultWriter(task_id, session_factory=session_factory)
+            for n in range(count):
+                writer.add({"url": f"https://task{task_id}.example/{n}", "company": f"Company {task_id}", "page_number": 1})
+            writer.flush()
+
+        progress = batch_progress(batch_id, session_factory)
+        assert progress["by_status"] == {"completed": 2, "failed": 1, "queued": 1}
+        assert (progress["status"], progress["finished"], progress["progress"], progress["records"]) == ("running", 3, 0.75, 5)
+        assert batch_progress(99, session_factory) is None
+
+        urls = [json.loads(line)["url"] for line in iter_batch_raw_records(batch_id, chunk_size=2, session_factory=session_factory)]
+        assert urls == [f"https://task2.example/{n}" for n in range(3)] + [f"https://task3.example/{n}" for n in range(2)]
+        rows = list(csv.reader(io.StringIO(b"".join(export_batch_csv(batch_id, session_factory)).decode())))
+        assert len(rows) == 6 and rows[1][1] == "Company 2"
+
+        set_status(session_factory, [5], "completed")
+        assert batch_progress(batch_id, session_factory)["status"] == "completed"
+
+@pytest.mark.benchmark
+def test_benchmark_bulk_insert_against_one_post_per_seed():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "batch.db"))
+        urls = [f"https://company{i}.example" for i in range(10000)]
+
+        started = time.perf_counter()
+        for url in urls[:300]:
+            queue.enqueue(url, {"url": url})
+        one_by_one = (time.perf_counter() - started) / 300 * len(urls)
+
+        started = time.perf_counter()
+        queue.enqueue_batch(urls, {"max_pages": 5})
+        bulk = time.perf_counter() - started
+        print(f"📥 10000 seeds: bulk inserts in {bulk * 1000:.0f} ms, ~{one_by_one * 1000:.0f} ms one POST at a time")
+        assert bulk < one_by_one / 5
+
+def test_batch_endpoints():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "api.db")
+        make_queue(db_path)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), SCRAPER_DATABASE_URL=f"sqlite:///{db_path}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+
+            created = httpx.post(f"{base_url}/batches", json={"urls": ["acme.example", "acme.example", "bad url"], "max_pages": 3})
+            assert created.status_code == 200
+            assert created.json() == {"batch_id": 1, "tasks": 1, "duplicates": 1, "rejected": 1, "rejected_examples": ["bad url"]}
+            assert httpx.post(f"{base_url}/batches", json={"urls": ["bad url"]}).status_code == 400
+            # Options that would turn off politeness or start unbounded process pools are refused.
+            for options in ({"host_rate": 0}, {"max_pages": 10**9}, {"extraction_workers": 10**6}):
+                assert httpx.post(f"{base_url}/batches", json={"urls": ["acme.example"], **options}).status_code == 422
+
+            seeds = "company,website\nGlobex,globex.example\nInitech,https://initech.example/\n"
+            uploaded = httpx.post(
+                f"{base_url}/batches/upload", files={"file": ("seeds.csv", seeds, "text/csv")},
+                data={"options": json.dumps({"max_depth": 1})},
+            )
+            assert uploaded.status_code == 200 and uploaded.json()["tasks"] == 2
+            bad_options = httpx.post(
+                f"{base_url}/batches/upload", files={"file": ("seeds.csv", seeds, "text/csv")}, data={"options": '{"max_depth": "x"}'}
+            )
+            assert bad_options.status_code == 422
+
+            progress = httpx.get(f"{base_url}/batches/2").json()
+            assert (progress["status"], progress["total"], progress["by_status"]) == ("queued", 2, {"queued": 2})
+            tasks = httpx.get(f"{base_url}/batches/2/tasks", params={"fields": "id,url,params"}).json()["tasks"]
+            assert [task["url"] for task in tasks] == ["https://initech.example/", "https://globex.example"]
+            assert tasks[0]["params"]["max_depth"] == 1
+            assert len(httpx.get(f"{base_url}/tasks", params={"batch_id": 1}).json()["tasks"]) == 1
+            assert httpx.get(f"{base_url}/batches/9").status_code == 404
+            assert httpx.get(f"{base_url}/batches/2/export").status_code == 404
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    test_parse_seeds_and_csv()
+    test_batch_is_queued_with_bulk_inserts()
+    test_claims_respect_shared_running_limits()
+    test_batch_progress_and_export_aggregate_child_tasks()
+    test_batch_endpoints()
+    test_benchmark_bulk_insert_against_one_post_per_seed()
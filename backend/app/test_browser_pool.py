@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.scraper.browser_pool import READY_STATE_SCRIPT, RESOURCE_COUNT_SCRIPT, BrowserPool
+
+LAUNCH_COST = 0.2
+READY_AFTER = 0.05
+LEGACY_FIXED_SLEEP = 0.3
+
+class FakeDriver:
+    live = 0
+    max_live = 0
+    lock = threading.Lock()
+
+    def __init__(self, ready_after=READY_AFTER, selector_after=None):
+        time.sleep(LAUNCH_COST)
+        self.ready_after = ready_after
+        self.selector_after = selector_after
+        self.loaded_at = None
+        self.url = None
+        self.window_handles = ["main"]
+        self.quit_called = False
+        with FakeDriver.lock:
+            FakeDriver.live += 1
+            FakeDriver.max_live = max(FakeDriver.max_live, FakeDriver.live)
+
+    def get(self, url):
+        self.url = url
+        self.loaded_at = time.monotonic()
+
+    def _elapsed(self):
+        return time.monotonic() - self.loaded_at
+
+    def execute_script(self, script):
+        if script == READY_STATE_SCRIPT:
+            return "complete" if self._elapsed() >= self.ready_after else "loading"
+        if script == RESOURCE_COUNT_SCRIPT:
+            return min(int(self._elapsed() / 0.1), 3)
+        raise AssertionError(f"Unexpected script {script}")
+
+    def find_elements(self, by, selector):
+        if self.selector_after is not None and self._elapsed() >= self.selector_after:
+            return [object()]
+        return []
+
+    @property
+    def page_source(self):
+        return f"<html><body><h1>{self.url}</h1></body></html>"
+
+    def quit(self):
+        self.quit_called = True
+        with FakeDriver.lock:
+            FakeDriver.live -= 1
+
+def reset_counters():
+    FakeDriver.live = 0
+    FakeDriver.max_live = 0
+
+def test_pool_is_bounded_and_reuses_browsers():
+    reset_counters()
+    pool = BrowserPool(size=2, max_pages=100, driver_factory=FakeDriver, timeout=2)
+    urls = [f"https://example.com/{i}" for i in range(12)]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        pages = list(executor.map(pool.render, urls))
+
+    assert all(url in html for url, html in zip(urls, pages))
+    assert FakeDriver.max_live <= 2
+    assert pool.stats()["launches"] <= 2
+    pool.close()
+    assert FakeDriver.live == 0
+
+def test_pool_recycles_after_max_pages():
+    reset_counters()
+    pool = BrowserPool(size=1, max_pages=3, driver_factory=FakeDriver, timeout=2)
+
+    for i in range(7):
+        pool.render(f"https://example.com/{i}")
+
+    stats = pool.stats()
+    assert stats["recycles"] == 2
+    assert stats["launches"] == 3
+    pool.close()
+
+def test_wait_strategies():
+    reset_counters()
+    pool = BrowserPool(size=1, driver_factory=lambda: FakeDriver(selector_after=0.15), timeout=2)
+
+    started = time.perf_counter()
+    pool.render("https://example.com/selector", wait_for="selector", selector="#app .loaded")
+    assert time.perf_counter() - started >= 0.15
+
+    started = time.perf_counter()
+    pool.render("https://example.com/idle", wait_for="network_idle")
+    assert time.perf_counter() - started >= 0.3
+
+    pool = BrowserPool(size=1, driver_factory=lambda: FakeDriver(selector_after=None), timeout=0.2)
+    html = pool.render("https://example.com/never", wait_for="selector", selector=".never")
+    assert "never" in html
+    assert pool.stats()["wait_timeouts"] == 1
+
+@pytest.mark.benchmark
+def test_benchmark_pool_against_per_url_launch():
+    reset_counters()
+    urls = [f"https://example.com/{i}" for i in range(10)]
+
+    started = time.perf_counter()
+    for url in urls:
+        driver = FakeDriver()
+        driver.get(url)
+        time.sleep(LEGACY_FIXED_SLEEP)
+        driver.page_source
+        driver.quit()
+    legacy = time.perf_counter() - started
+
+    pool = BrowserPool(size=2, driver_factory=FakeDriver, timeout=2)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(pool.render, urls))
+    pooled = time.perf_counter() - started
+    pool.close()
+
+    print(f"⏱️  per-URL launch + fixed sleep: {legacy:.2f}s, pooled + readiness wait: {pooled:.2f}s")
+    assert pooled * 4 < legacy
+
+if __name__ == "__main__":
+    test_pool_is_bounded_and_reuses_browsers()
+    test_pool_recycles_after_max_pages()
+    test_wait_strategies()
+    test_benchmark_pool_against_per_url_launch()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+
+RESPONSE_DELAY = 0.1
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(RESPONSE_DELAY)
+            body = f"<html><body><h1>Page {self.path}</h1></body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+def timed_crawl(urls, max_concurrency, per_host_limit):
+    # Rate limiting is off so the timings measure concurrency alone (see test_politeness).
+    async def consume():
+        return [
+            item async for item in crawl(urls, max_concurrency=max_concurrency, per_host_limit=per_host_limit, host_rate=0)
+        ]
+
+    started = time.perf_counter()
+    pages = asyncio.run(consume())
+    return pages, time.perf_counter() - started
+
+def test_crawl_scales_with_concurrency():
+    server, base = start_local_server(SlowHandler)
+    try:
+        urls = [f"{base}/page/{i}" for i in range(20)]
+
+        timings = {}
+        for concurrency in (1, 5, 20):
+            pages, elapsed = timed_crawl(urls, concurrency, concurrency)
+            assert sorted(url for url, _ in pages) == sorted(urls)
+            assert all(html and "<h1>Page" in html for _, html in pages)
+            timings[concurrency] = elapsed
+            print(f"⏱️  concurrency={concurrency:>2}: {elapsed:.2f}s for {len(urls)} pages")
+
+        assert timings[5] * 2.5 < timings[1]
+        assert timings[20] < timings[5]
+    finally:
+        server.shutdown()
+
+def test_crawl_respects_per_host_limit():
+    server, base = start_local_server(SlowHandler)
+    try:
+        urls = [f"{base}/page/{i}" for i in range(12)]
+        SlowHandler.max_in_flight = 0
+
+        pages, _ = timed_crawl(urls, max_concurrency=10, per_host_limit=3)
+
+        assert len(pages) == len(urls)
+        assert SlowHandler.max_in_flight <= 3
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_crawl_scales_with_concurrency()
+    test_crawl_respects_per_host_limit()
@@ -0,0 +1,162 @@
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.conftest import make_session_factory
+from app.database import create_db_engine, init_db
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DURATION = 4.0
+READERS = 4
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def seed(db_path, journal_mode, synchronous, tasks=200):
+    from app.models import ScrapeTask
+
+    session_factory = make_session_factory(db_path, journal_mode=journal_mode, synchronous=synchronous)
+    db = session_factory()
+    db.add_all(ScrapeTask(url=f"https://site{i}.example.com", status="running", params={}) for i in range(tasks))
+    db.commit()
+    db.close()
+    return session_factory
+
+def write_records(db_path, journal_mode, synchronous, task_ids, stop_at):
+    """A scrape worker: flush small batches of records and touch task rows until stop_at."""
+    from app.result_store import ResultWriter
+    from app.task_queue import TaskQueue
+
+    engine = create_db_engine(f"sqlite:///{db_path}", journal_mode=journal_mode, synchronous=synchronous)
+    queue = TaskQueue(sessionmaker(bind=engine))
+    writers = [ResultWriter(task_id, batch_size=20, session_factory=queue.session_factory) for task_id in task_ids]
+    index = 0
+    while time.time() < stop_at:
+        writer = writers[index % len(writers)]
+        for n in range(20):
+            writer.add({"url": f"https://example.com/{index}/{n}", "company": "Acme", "page_number": 1,
+                        "description": "text " * 40})
+        writer.flush()
+        queue.heartbeat("load-test", task_ids)
+        index += 1
+        # Scrapes spend most of their time waiting on the network between flushes.
+        time.sleep(0.02)
+
+async def read_load(base_url, task_ids, stop_at):
+    latencies = {"/result": [], "/tasks": []}
+    errors = 0
+
+    async def reader(number):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            index = number
+            while time.time() < stop_at:
+                endpoint = "/tasks" if index % 4 == 0 else "/result"
+                path = endpoint if endpoint == "/tasks" else f"/result/{task_ids[index % len(task_ids)]}?limit=50"
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies[endpoint].append(time.perf_counter() - started)
+                if response.status_code not in (200, 404):
+                    errors += 1
+                index += 1
+
+    await asyncio.gather(*(reader(number) for number in range(READERS)))
+    return latencies, errors
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+def run_load(journal_mode, synchronous, duration=DURATION):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        seed(db_path, journal_mode, synchronous)
+        port = free_port()
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(BACKEND_DIR),
+            SCRAPER_DATABASE_URL=f"sqlite:///{db_path}",
+            SCRAPER_DB_JOURNAL_MODE=journal_mode,
+            SCRAPER_DB_SYNCHRONOUS=synchronous,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    if httpx.get(f"{base_url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            stop_at = time.time() + duration
+            context = multiprocessing.get_context("spawn")
+            writers = [
+                context.Process(target=write_records, args=(db_path, journal_mode, synchronous, list(range(1 + i * 5, 6 + i * 5)), stop_at))
+                for i in range(2)
+            ]
+            for process in writers:
+                process.start()
+            latencies, errors = asyncio.run(read_load(base_url, list(range(1, 11)), stop_at))
+            for process in writers:
+                process.join()
+        finally:
+            server.terminate()
+            server.wait()
+    return latencies, errors
+
+def test_init_db_upgrades_an_old_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'old.db')}")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE scrape_tasks (id INTEGER PRIMARY KEY, url VARCHAR, status VARCHAR)"))
+            conn.execute(text("CREATE TABLE scrape_results (id INTEGER PRIMARY KEY, task_id INTEGER, data JSON)"))
+            conn.execute(text("INSERT INTO scrape_tasks (url, status) VALUES ('https://acme.example', 'completed')"))
+            conn.execute(text("""INSERT INTO scrape_results (task_id, data) VALUES (1, '[{"url": "https://acme.example/", "page_number": 1}]')"""))
+
+        # Safe to run again on every start.
+        init_db(engine)
+        init_db(engine)
+        inspector = inspect(engine)
+        assert {"record_count", "batch_id", "host", "stats"} <= {column["name"] for column in inspector.get_columns("scrape_tasks")}
+        assert "ix_scrape_tasks_host" in {index["name"] for index in inspector.get_indexes("scrape_tasks")}
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT task_id, url FROM scrape_records")).all() == [(1, "https://acme.example/")]
+            assert conn.execute(text("SELECT record_count FROM scrape_tasks")).scalar() == 1
+            assert conn.execute(text("SELECT COUNT(*) FROM scrape_results")).scalar() == 0
+
+def test_reads_are_served_while_scrapes_write():
+    latencies, errors = run_load("WAL", "NORMAL", duration=1.0)
+    assert errors == 0 and latencies["/result"] and latencies["/tasks"]
+
+@pytest.mark.benchmark
+def test_load_reads_while_scrapes_write():
+    # Latencies are reported rather than compared: on small CI machines the
+    # server, writers and client share the same cores.
+    for label, journal_mode, synchronous in (("rollback journal, FULL", "DELETE", "FULL"), ("WAL, NORMAL", "WAL", "NORMAL")):
+        latencies, errors = run_load(journal_mode, synchronous)
+        for path, values in latencies.items():
+            print(f"🗄️  {label:<22} {path:<8} {len(values):>5} reqs  p50 {percentile(values, 50):6.1f} ms  "
+                  f"p99 {percentile(values, 99):6.1f} ms")
+        assert errors == 0
+
+if __name__ == "__main__":
+    test_init_db_upgrades_an_old_database()
+    test_reads_are_served_while_scrapes_write()
+    test_load_reads_while_scrapes_write()
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import pytest
+
+from app.conftest import make_session_factory
+from app.exporters import EXPORT_COLUMNS, PARQUET_AVAILABLE, export_csv, export_ndjson, export_parquet, flatten_record
+from app.models import ScrapeTask
+from app.result_store import ResultWriter, iter_records
+
+def synthetic_record(index):
+    return {
+        "url": f"https://company{index}.example.com/about",
+        "company": f"Company {index}, Inc.",
+        "contacts": {
+            "emails": [f"info@company{index}.example.com", f"sales@company{index}.example.com"],
+            "phones": [f"415555{index % 10000:04d}"],
+            "contact_page": f"https://company{index}.example.com/contact",
+        },
+        "tagline": "We build \"reliable\" software,\nfast.",
+        "services": ["Cloud hosting", "Data analytics", "Web development"],
+        "social_media": {"linkedin": f"https://linkedin.com/company/company{index}"},
+        "address": f"{index} Market Street, Springfield, IL 62701",
+        "description": "Company description " * 8,
+        "industry": "software",
+        "extracted_at": "2026-01-01T00:00:00",
+        "page_number": 1,
+        "task_id": 1,
+    }
+
+def populate(db_path, count):
+    session_factory = make_session_factory(db_path)
+    db = session_factory()
+    task = ScrapeTask(url="https://example.com", status="completed")
+    db.add(task)
+    db.commit()
+    task_id = task.id
+    db.close()
+    writer = ResultWriter(task_id, batch_size=5000, session_factory=session_factory)
+    for index in range(count):
+        if writer.add(synthetic_record(index)):
+            writer.flush()
+    writer.flush()
+    return session_factory, task_id
+
+def test_exports_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory, task_id = populate(os.path.join(tmp, "export.db"), 2500)
+        records = list(iter_records(task_id, session_factory=session_factory))
+
+        # Streamed a chunk of records at a time, not as one body.
+        chunks = list(export_ndjson(task_id, session_factory))
+        assert len(chunks) == 3
+        ndjson = b"".join(chunks).decode()
+        assert [json.loads(line) for line in ndjson.splitlines()] == records
+
+        rows = list(csv.reader(io.StringIO(b"".join(export_csv(task_id, session_factory)).decode())))
+        assert rows[0] == EXPORT_COLUMNS
+        assert rows[1:] == [["" if value is None else str(value) for value in flatten_record(r)] for r in records]
+
+        if PARQUET_AVAILABLE:
+            import pandas as pd
+
+            frame = pd.read_parquet(io.BytesIO(b"".join(export_parquet(task_id, session_factory))))
+            assert len(frame) == len(records)
+            assert frame["company"].tolist() == [r["company"] for r in records]
+
+def _measure(db_path, task_id, mode, results):
+    session_factory = make_session_factory(db_path)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    size = 0
+    if mode == "whole response":
+        # What /result used to do: decode every record, then serialize one body.
+        size = len(json.dumps({"data": list(iter_records(task_id, 100000, session_factory))}))
+    else:
+        exporter = {"ndjson": export_ndjson, "csv": export_csv, "parquet": export_parquet}[mode]
+        for chunk in exporter(task_id, session_factory):
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((mode, peak / 1024, (peak - before) / 1024, elapsed, size))
+
+@pytest.mark.benchmark
+def test_benchmark_streaming_export_100k_records():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "export.db")
+        _, task_id = populate(db_path, 100_000)
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        modes = ["whole response", "ndjson", "csv"] + (["parquet"] if PARQUET_AVAILABLE else [])
+        measured = {}
+        for mode in modes:
+            process = context.Process(target=_measure, args=(db_path, task_id, mode, results))
+            process.start()
+            name, peak_mb, growth_mb, elapsed, size = results.get(timeout=300)
+            process.join()
+            measured[name] = growth_mb
+            print(f"📦 {name}: peak RSS {peak_mb:.0f} MB (+{growth_mb:.0f} MB while exporting), "
+                  f"{100_000 / elapsed:,.0f} records/s, {size / 1e6:.0f} MB")
+        # Streaming exports stay within a few chunks of memory regardless of task size.
+        assert measured["ndjson"] < 50 < measured["whole response"]
+        assert measured["csv"] < 50
+
+if __name__ == "__main__":
+    test_exports_round_trip()
+    test_benchmark_streaming_export_100k_records()
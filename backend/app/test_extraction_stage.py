@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+from app.conftest import make_session_factory, scraper_events_to, start_local_server
+from app.scraper.engine import _scrape_site
+from app.scraper.extraction_stage import ExtractionStage, shutdown_pools
+from app.scraper.extractors import extract_data
+from app.scraper.frontier import Frontier
+from app.scraper.page_cache import PageCache
+from app.test_extractors import CORPUS
+from app.test_incremental import PAGES, ListWriter, SiteHandler, company_page
+from app.test_parsers import build_large_page
+
+async def run_stage(stage, pages):
+    results = {}
+
+    async def feed():
+        for index, html in enumerate(pages):
+            await stage.submit(index, html, f"https://site{index}.example.com/")
+
+    feeder = asyncio.create_task(feed())
+    while not feeder.done() or stage.pending:
+        async for tag, result, error in stage.results():
+            assert error is None, error
+            results[tag] = result
+        await asyncio.sleep(0)
+    await feeder
+    return results
+
+def test_process_pool_matches_in_process_extraction():
+    stage_results = asyncio.run(run_stage(ExtractionStage(workers=2, max_pending=3), CORPUS))
+
+    assert len(stage_results) == len(CORPUS)
+    for index, html in enumerate(CORPUS):
+        record, _ = stage_results[index]
+        expected = extract_data(html, f"https://site{index}.example.com/")
+        assert sorted(record["services"]) == sorted(expected["services"])
+        record["services"] = expected["services"] = None
+        record["contacts"]["emails"] = sorted(record["contacts"]["emails"])
+        record["contacts"]["phones"] = sorted(record["contacts"]["phones"])
+        expected["contacts"]["emails"] = sorted(expected["contacts"]["emails"])
+        expected["contacts"]["phones"] = sorted(expected["contacts"]["phones"])
+        assert json.dumps(record, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+def test_pending_extractions_are_bounded():
+    stage = ExtractionStage(workers=0, max_pending=4)
+    asyncio.run(run_stage(stage, CORPUS))
+    assert stage.max_in_flight <= 4
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_crawler_parses_each_page_once(workers):
+    SiteHandler.pages = {f"/company/{n}": company_page(n) for n in range(PAGES)}
+    server, base = start_local_server(SiteHandler)
+    url = f"{base}/company/0"
+    params = {"url": url, "extraction_workers": workers, "use_sitemaps": False, "host_rate": 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache, writer = PageCache(), ListWriter()
+        try:
+            with scraper_events_to(make_session_factory(os.path.join(tmp, "parses.db"))):
+                asyncio.run(_scrape_site(1, Frontier([url], max_depth=1, max_pages=PAGES), params, cache, writer))
+        finally:
+            server.shutdown()
+
+    # Threads extract from the crawler's tree; a pool worker parses its own copy of the page.
+    assert len(writer.records) == PAGES
+    summary = cache.summary()
+    assert summary["parses"] == PAGES
+    assert (summary["avoided_parses"] >= PAGES) == (workers == 0)
+
+async def _max_loop_lag(stage, pages):
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - started - 0.005)
+
+    beat = asyncio.create_task(heartbeat())
+    await run_stage(stage, pages)
+    stop.set()
+    await beat
+    return max(lags)
+
+@pytest.mark.benchmark
+def test_benchmark_event_loop_lag_during_extraction():
+    pages = [build_large_page(512 * 1024) for _ in range(6)]
+    # Start the workers before measuring so spawn cost is not counted.
+    asyncio.run(run_stage(ExtractionStage(workers=2), pages[:2]))
+
+    threaded = asyncio.run(_max_loop_lag(ExtractionStage(workers=0, max_pending=2), pages))
+    pooled = asyncio.run(_max_loop_lag(ExtractionStage(workers=2, max_pending=4), pages))
+    print(f"⏱️  max event loop lag: threads {threaded * 1000:.0f} ms, process pool {pooled * 1000:.0f} ms")
+    assert pooled < threaded
+    shutdown_pools()
+
+if __name__ == "__main__":
+    test_process_pool_matches_in_process_extraction()
+    test_pending_extractions_are_bounded()
+    test_crawler_parses_each_page_once(0)
+    test_crawler_parses_each_page_once(2)
+    test_benchmark_event_loop_lag_during_extraction()
@@ -0,0 +1,403 @@
+import json
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app.scraper.extractors import extract_data
+
+# Reference copy of extract_data as it was before the single-pass index, used
+# to prove the indexed engine returns identical records.
+
+class LegacyExtractor:
+    def __init__(self):
+        self.email_pattern = re.compile(
+            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        )
+
+        self.phone_patterns = [
+            re.compile(r'\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})'),  # US format
+            re.compile(r'\+?[0-9]{1,4}[-.\s]?\(?[0-9]{1,4}\)?[-.\s]?[0-9]{1,4}[-.\s]?[0-9]{1,4}'),  # General
+            re.compile(r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b'),  # Simple US
+            re.compile(r'\(\d{3}\)\s?\d{3}[-.\s]?\d{4}')  # (123) 456-7890
+        ]
+
+        self.social_patterns = {
+            'linkedin': re.compile(r'linkedin\.com/(?:in|company)/([^/\s]+)', re.IGNORECASE),
+            'twitter': re.compile(r'twitter\.com/([^/\s]+)', re.IGNORECASE),
+            'facebook': re.compile(r'facebook\.com/([^/\s]+)', re.IGNORECASE),
+            'instagram': re.compile(r'instagram\.com/([^/\s]+)', re.IGNORECASE)
+        }
+
+def legacy_extract_data(html: str, url: str) -> Dict:
+    extractor = LegacyExtractor()
+    soup = BeautifulSoup(html, "html.parser")
+
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    text = soup.get_text()
+
+    return {
+        "url": url,
+        "company": legacy_extract_company_info(soup, text),
+        "contacts": legacy_extract_contact_info(soup, text, extractor),
+        "tagline": legacy_extract_tagline(soup, text),
+        "services": legacy_extract_services(soup, text),
+        "social_media": legacy_extract_social_media(soup, text, extractor),
+        "address": legacy_extract_address(soup, text),
+        "description": legacy_extract_description(soup, text),
+        "industry": legacy_extract_industry(soup, text)
+    }
+
+def legacy_extract_company_info(soup: BeautifulSoup, text: str) -> Optional[str]:
+    company_selectors = [
+        'h1', '.company-name', '.org-title', '.company-title',
+        '[data-testid*="company"]', '.business-name', '.brand-name',
+        '.site-title', '.logo-text', 'title', '.header-title',
+        '.hero-title', '.main-title', '[class*="company"]',
+        '[class*="brand"]', '[id*="company"]'
+    ]
+
+    for selector in company_selectors:
+        element = soup.select_one(selector)
+        if element and element.text.strip():
+            company_name = element.text.strip()
+            if len(company_name) > 2 and len(company_name) < 100:
+                return company_name
+
+    meta_company = soup.select_one('meta[property="og:site_name"]')
+    if meta_company:
+        return meta_company.get('content', '').strip()
+
+    title_tag = soup.select_one('title')
+    if title_tag:
+        title_text = title_tag.text.strip()
+        for separator in [' | ', ' - ', ' – ', ' :: ']:
+            if separator in title_text:
+                return title_text.split(separator)[0].strip()
+
+    return None
+
+def legacy_extract_contact_info(soup: BeautifulSoup, text: str, extractor: LegacyExtractor) -> Dict:
+    contacts = {
+        'emails': legacy_extract_emails(soup, text, extractor),
+        'phones': legacy_extract_phones(soup, text, extractor),
+        'contact_page': legacy_find_contact_page_url(soup)
+    }
+    return contacts
+
+def legacy_extract_emails(soup: BeautifulSoup, text: str, extractor: LegacyExtractor) -> List[str]:
+    emails = set()
+
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if href.startswith('mailto:'):
+            email = href.replace('mailto:', '').split('?')[0]
+            emails.add(email)
+
+    text_emails = extractor.email_pattern.findall(text)
+    emails.update(text_emails)
+
+    valid_emails = []
+    for email in emails:
+        if '@' in email and '.' in email.split('@')[1]:
+            if not any(placeholder in email.lower() for placeholder in 
+                      ['example', 'test', 'dummy', 'placeholder', 'yourname']):
+                valid_emails.append(email)
+
+    return list(set(valid_emails))
+
+def legacy_extract_phones(soup: BeautifulSoup, text: str, extractor: LegacyExtractor) -> List[str]:
+    phones = set()
+
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if href.startswith('tel:'):
+            phone = href.replace('tel:', '')
+            phones.add(phone)
+
+    for pattern in extractor.phone_patterns:
+        matches = pattern.findall(text)
+        for match in matches:
+            if isinstance(match, tuple):
+                phone = ''.join(match)
+            else:
+                phone = match
+            phones.add(phone)
+
+    valid_phones = []
+    for phone in phones:
+        try:
+            cleaned = re.sub(r'[^\d+]', '', phone)
+            if len(cleaned) >= 10 and len(cleaned) <= 15:
+                valid_phones.append(phone)
+        except:
+            continue
+
+    return list(set(valid_phones))
+
+def legacy_find_contact_page_url(soup: BeautifulSoup) -> Optional[str]:
+    contact_keywords = ['contact', 'about', 'reach', 'connect', 'get in touch']
+
+    for link in soup.find_all('a', href=True):
+        link_text = link.text.lower().strip()
+        href = link['href']
+
+        if any(keyword in link_text for keyword in contact_keywords):
+            return href
+
+    return None
+
+def legacy_extract_tagline(soup: BeautifulSoup, text: str) -> Optional[str]:
+    tagline_selectors = [
+        '.tagline', '.slogan', '.subtitle', '.hero-subtitle',
+        '.lead', '.description', '.intro', 'p.lead',
+        '.hero-description', '[class*="tagline"]', '[class*="slogan"]',
+        'meta[name="description"]', 'meta[property="og:description"]'
+    ]
+
+    for selector in tagline_selectors:
+        if selector.startswith('meta'):
+            element = soup.select_one(selector)
+            if element:
+                content = element.get('content', '').strip()
+                if 20 <= len(content) <= 200:
+                    return content
+        else:
+            element = soup.select_one(selector)
+            if element and element.text.strip():
+                tagline = element.text.strip()
+                if 10 <= len(tagline) <= 200:
+                    return tagline
+
+    paragraphs = soup.find_all('p')
+    for p in paragraphs[:3]:
+        text = p.text.strip()
+        if 20 <= len(text) <= 150 and not text.startswith(('The', 'This', 'Our')):
+            return text
+
+    return None
+
+def legacy_extract_services(soup: BeautifulSoup, text: str) -> List[str]:
+    services = set()
+
+    service_selectors = [
+        '.services li', '.offerings li', '.products li',
+        '.features li', '[class*="service"] li', '[class*="product"] li',
+        '.what-we-do li', '.our-services li', '.capabilities li'
+    ]
+
+    for selector in service_selectors:
+        elements = soup.select(selector)
+        for element in elements:
+            service_text = element.text.strip()
+            if 3 <= len(service_text) <= 100:
+                services.add(service_text)
+
+    headers = soup.find_all(['h2', 'h3', 'h4'])
+    for header in headers:
+        text = header.text.strip().lower()
+        if any(keyword in text for keyword in ['service', 'offering', 'product', 'solution']):
+            next_elem = header.find_next_sibling(['ul', 'ol', 'div'])
+            if next_elem:
+                items = next_elem.find_all('li') or next_elem.find_all('p')
+                for item in items[:5]:
+                    service_text = item.text.strip()
+                    if 3 <= len(service_text) <= 100:
+                        services.add(service_text)
+
+    return list(services)[:10]
+
+def legacy_extract_social_media(soup: BeautifulSoup, text: str, extractor: LegacyExtractor) -> Dict[str, str]:
+    social_media = {}
+
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        for platform, pattern in extractor.social_patterns.items():
+            match = pattern.search(href)
+            if match:
+                social_media[platform] = href
+                break
+
+    return social_media
+
+def legacy_extract_address(soup: BeautifulSoup, text: str) -> Optional[str]:
+    address_selectors = [
+        '.address', '.location', '.contact-address',
+        '[itemtype*="PostalAddress"]', '.postal-address',
+        '[class*="address"]', '[class*="location"]'
+    ]
+
+    for selector in address_selectors:
+        element = soup.select_one(selector)
+        if element:
+            address_text = element.text.strip()
+            if len(address_text) > 10:
+                return address_text
+
+    address_pattern = re.compile(r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Road|Nagar|Rasta|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Place|Pl)(?:,\s*[A-Za-z\s]+)*,\s*[A-Z]{2}\s+\d{5}', re.IGNORECASE)
+    match = address_pattern.search(text)
+    if match:
+        return match.group(0)
+
+    return None
+
+def legacy_extract_description(soup: BeautifulSoup, text: str) -> Optional[str]:
+    meta_desc = soup.select_one('meta[name="description"]')
+    if meta_desc:
+        desc = meta_desc.get('content', '').strip()
+        if 50 <= len(desc) <= 500:
+            return desc
+
+    about_headers = soup.find_all(['h1', 'h2', 'h3'], string=re.compile(r'about|who we are|our story', re.IGNORECASE))
+    for header in about_headers:
+        next_elem = header.find_next(['p', 'div'])
+        if next_elem:
+            desc = next_elem.text.strip()
+            if 50 <= len(desc) <= 500:
+                return desc
+
+    return None
+
+def legacy_extract_industry(soup: BeautifulSoup, text: str) -> Optional[str]:
+    industries = [
+        'technology', 'healthcare', 'finance', 'education', 'retail',
+        'manufacturing', 'consulting', 'marketing', 'real estate',
+        'construction', 'automotive', 'food', 'travel', 'entertainment',
+        'software', 'hardware', 'services', 'e-commerce', 'nonprofit'
+    ]
+
+    text_lower = text.lower()
+    for industry in industries:
+        if industry in text_lower:
+            return industry.title()
+
+    return None
+
+COMPANY_WORDS = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Stark", "Wayne"]
+SUFFIXES = ["Industries", "Labs", "Software", "Consulting", "Logistics", "Health"]
+SERVICES = ["Cloud hosting", "Data analytics", "Web development", "IT consulting", "Security audits",
+            "Mobile apps", "Payroll services", "Product design", "Training", "24/7 support"]
+PARAGRAPH = ("We help retail and manufacturing teams ship better technology, from strategy "
+             "through delivery. Our engineers have worked across healthcare and finance. ")
+
+def _services_block(rng, names):
+    style = rng.choice(["services", "our-services", "product-grid", "service-list", "capabilities", "heading"])
+    items = "".join(f"<li>{name}</li>" for name in names)
+    if style == "heading":
+        return f"<h2>Our Services</h2><ul>{items}</ul>"
+    if style == "product-grid":
+        return f'<section class="product-grid"><ul>{items}</ul></section>'
+    if style == "service-list":
+        return f'<div class="Service-list service-list"><ol>{items}</ol></div>'
+    return f'<div class="{style}"><ul>{items}</ul></div>'
+
+def build_page(seed: int) -> str:
+    rng = random.Random(seed)
+    company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(SUFFIXES)}"
+    domain = company.lower().replace(" ", "")
+    parts = ["<!DOCTYPE html><html><head>"]
+    parts.append(f"<title>{company} | Home</title>")
+    if rng.random() < 0.7:
+        parts.append(f'<meta name="description" content="{company} builds things. {PARAGRAPH[:rng.randint(10, 200)]}">')
+    if rng.random() < 0.5:
+        parts.append(f'<meta property="og:site_name" content="{company}">')
+    if rng.random() < 0.4:
+        parts.append(f'<meta property="og:description" content="{PARAGRAPH[:90]}">')
+    parts.append("<style>.brand-name{color:red}</style>")
+    parts.append(f'<script class="company-config">window.cfg={{"name":"{company}"}}</script>')
+    parts.append("</head><body>")
+
+    header = rng.choice([
+        f"<h1>{company}</h1>",
+        f'<div class="brand-name logo">{company}</div>',
+        f'<span class="site-title"> </span><div data-testid="company-header">{company}</div>',
+        f'<header id="company-banner"><b>{company}</b></header>',
+        "<h1>  </h1>",
+        "",
+    ])
+    parts.append(header)
+    tagline = rng.choice([
+        '<p class="lead">Engineering software that keeps factories running.</p>',
+        '<div class="hero-subtitle">Short</div><div class="Tagline">Ignored by case</div>',
+        '<div class="tagline-box">Trusted by over a thousand teams worldwide</div>',
+        "",
+    ])
+    parts.append(tagline)
+    for _ in range(rng.randint(1, 6)):
+        parts.append(f"<p>{PARAGRAPH[:rng.randint(15, len(PARAGRAPH))]}</p>")
+    if rng.random() < 0.6:
+        parts.append('<h2>About us</h2><div><p>' + PARAGRAPH * rng.randint(1, 3) + "</p></div>")
+    parts.append(_services_block(rng, rng.sample(SERVICES, rng.randint(2, 8))))
+    if rng.random() < 0.3:
+        parts.append('<h3>Products &amp; <em>solutions</em></h3><div><p>Widget Pro</p><p>Gadget X</p></div>')
+
+    contacts = []
+    for _ in range(rng.randint(0, 3)):
+        user = rng.choice(["info", "sales", "hello", "test", "jobs"])
+        contacts.append(f'<a href="mailto:{user}@{domain}.com?subject=Hi">Email {user}</a>')
+    if rng.random() < 0.5:
+        contacts.append(f'<a href="tel:+1-555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}">Call</a>')
+    contacts.append(f"<p>Reach us at support@{domain}.io or ({rng.randint(200, 999)}) 555-{rng.randint(1000, 9999)}.</p>")
+    contacts.append(f"<p>Order 12 34 56 78, SKU 4410-22-9 ships in 3-5 days. Fax +44 20 7946 {rng.randint(1000, 9999)}</p>")
+    if rng.random() < 0.5:
+        contacts.append('<a href="/contact">Get in touch</a>')
+    else:
+        contacts.append('<a href="/team">Team</a><a href="/about-us">About</a>')
+    parts.append('<div class="contact">' + "".join(contacts) + "</div>")
+
+    address = rng.choice([
+        '<div class="address">42 Market Street, Springfield, IL 62701</div>',
+        f'<div itemscope itemtype="https://schema.org/PostalAddress">{rng.randint(1, 999)} Ocean Ave, Miami, FL 33139</div>',
+        '<span class="location">NYC</span><p>Visit 100 Main Street, Boston, MA 02110</p>',
+        "",
+    ])
+    parts.append(address)
+    socials = ["https://www.linkedin.com/company/acme", "https://twitter.com/acme",
+               "https://facebook.com/acme", "https://instagram.com/acme", "https://example.com/blog"]
+    parts.append("<footer>" + "".join(f'<a href="{link}">{i}</a>' for i, link in enumerate(rng.sample(socials, rng.randint(0, 5)))))
+    parts.append('<ul class="links"><li>Home</li><li><a href="">Empty</a></li></ul>')
+    parts.append("<!-- tracking 555-000-1111 --><template><p>hidden 555-222-3333</p></template>")
+    parts.append("</footer></body></html>")
+    return "".join(parts)
+
+CORPUS = [build_page(seed) for seed in range(60)]
+
+def _dump(record: Dict) -> str:
+    return json.dumps(record, sort_keys=True)
+
+def _normalized_phones(record: Dict) -> Dict:
+    # Phones are reported once in normalized form; the legacy patterns returned
+    # every overlapping spelling of the same number.
+    record["contacts"]["phones"] = sorted({re.sub(r'[^\d+]', '', phone) for phone in record["contacts"]["phones"]})
+    return record
+
+def test_single_pass_extraction_is_byte_identical():
+    for index, html in enumerate(CORPUS):
+        url = f"https://site{index}.example.com/"
+        record = extract_data(html, url)
+        phones = sorted(record["contacts"]["phones"])
+        assert _dump(_normalized_phones(record)) == _dump(_normalized_phones(legacy_extract_data(html, url))), index
+        assert record["contacts"]["phones"] == phones
+
+def _pages_per_second(extract, rounds: int = 3) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for index, html in enumerate(CORPUS):
+            extract(html, f"https://site{index}.example.com/")
+    return rounds * len(CORPUS) / (time.perf_counter() - started)
+
+@pytest.mark.benchmark
+def test_benchmark_single_pass_extraction():
+    before = _pages_per_second(legacy_extract_data)
+    after = _pages_per_second(extract_data)
+    print(f"⏱️  extract_data: {before:.0f} pages/s before, {after:.0f} pages/s after ({after / before:.1f}x)")
+    assert after > before
+
+if __name__ == "__main__":
+    test_single_pass_extraction_is_byte_identical()
+    test_benchmark_single_pass_extraction()
@@ -0,0 +1,52 @@
+import asyncio
+
+from app.conftest import start_local_server
+from app.scraper import fetcher
+from app.scraper.crawler import crawl
+from app.scraper.page_cache import PageCache
+from app.test_crawler import SlowHandler
+
+def test_pool_reuses_connections_per_host():
+    server, base = start_local_server(SlowHandler)
+    try:
+        fetcher.stats.reset()
+
+        for i in range(10):
+            response = fetcher.fetch(f"{base}/page/{i}")
+            assert response.status_code == 200
+
+        stats = fetcher.pool_stats()
+        print(f"📊 Sequential pool stats: {stats}")
+        assert stats["requests"] == 10
+        assert stats["new_connections"] == 1
+        assert stats["connection_hits"] == 9
+        assert stats["bytes_received"] > 0
+    finally:
+        server.shutdown()
+        fetcher.close()
+
+def test_crawl_pool_opens_at_most_one_connection_per_slot():
+    server, base = start_local_server(SlowHandler)
+    try:
+        urls = [f"{base}/page/{i}" for i in range(30)]
+        fetcher.stats.reset()
+        cache = PageCache()
+
+        async def consume():
+            return [item async for item in crawl(urls, max_concurrency=5, per_host_limit=5, cache=cache)]
+
+        pages = asyncio.run(consume())
+        # The task's own counters leave out the shared robots.txt fetch.
+        assert cache.summary()["pool"]["requests"] == len(urls)
+
+        stats = fetcher.pool_stats()
+        print(f"📊 Concurrent pool stats: {stats}")
+        assert len(pages) == len(urls)
+        assert stats["new_connections"] <= 5
+        assert stats["connection_hits"] >= len(urls) - 5
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_pool_reuses_connections_per_host()
+    test_crawl_pool_opens_at_most_one_connection_per_slot()
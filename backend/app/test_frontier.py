@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+from app.scraper.frontier import Frontier, SeenSet
+from app.scraper.urls import canonicalize_url
+
+BLOG_POSTS = 40
+
+def site_page(path):
+    """A small company site: a home page with many blog links, one contact and one about page."""
+    links = []
+    if path == "/":
+        links = [f"/blog/2024/01/post-{i}?utm_source=home" for i in range(BLOG_POSTS)]
+        links += ["/about-us", "/contact#form", "contact", "https://elsewhere.example/partner", "/brochure.pdf",
+                  "mailto:info@acme.example", "/services/"]
+    elif path.startswith("/blog/"):
+        links = ["/", "/blog/2024/01/post-0", f"{path}/comments"]
+    elif path == "/services/":
+        links = ["./consulting", "../about-us"]
+    elif path == "/about-us":
+        links = ["/team"]
+    anchors = "".join(f'<a href="{link}">{link.strip("/").split("/")[-1] or "Home"}</a>' for link in links)
+    return f"<html><body><h1>Acme {path}</h1>{anchors}</body></html>"
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == "/robots.txt":
+            body, status = b"", 404
+        else:
+            with type(self).lock:
+                type(self).hits[self.path] += 1
+            body, status = site_page(self.path.split("?")[0]).encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_site():
+    SiteHandler.hits = Counter()
+    return start_local_server(SiteHandler)
+
+def crawl_site(frontier, max_concurrency=4):
+    async def consume():
+        return [url async for url, _ in crawl(frontier=frontier, max_concurrency=max_concurrency, host_rate=0)]
+
+    return asyncio.run(consume())
+
+def test_canonicalize_url():
+    assert canonicalize_url("/a/../b/./c?utm_source=x&b=2&a=1#top", "https://Example.COM:443/x/") == "https://example.com/b/c?a=1&b=2"
+    assert canonicalize_url("HTTP://example.com") == "http://example.com/"
+    assert canonicalize_url("/%7euser/a b", "http://example.com") == "http://example.com/~user/a%20b"
+    assert canonicalize_url("?page=2", "https://example.com/list?page=1") == "https://example.com/list?page=2"
+    assert canonicalize_url("http://example.com:8080/") == "http://example.com:8080/"
+    for link in ("mailto:info@example.com", "tel:+15551234567", "javascript:void(0)", "ftp://example.com/"):
+        assert canonicalize_url(link, "https://example.com/") is None
+
+def test_frontier_filters_and_prioritizes():
+    frontier = Frontier(["https://www.acme.example/"], max_depth=2, max_pages=100)
+    links = [
+        ("/blog/2024/01/launch", "Launch"), ("/privacy", "Privacy"), ("/about", "Who we are"),
+        ("/page-x", "Contact us"), ("/about#team", "Team"), ("https://other.example/", "Partner"),
+        ("/logo.png", ""), ("https://shop.acme.example/products", "Shop"),
+    ]
+    assert frontier.add_links(links, "https://www.acme.example/", 1) == 5
+    assert frontier.add_links([("/deeper", "")], "https://www.acme.example/", 3) == 0
+
+    order = [url for url, _ in iter(frontier.pop, None)]
+    print(f"📋 Crawl order: {order}")
+    assert order[0] == "https://www.acme.example/"
+    # Link text counts too: "Contact us" on an odd path still goes first among links.
+    assert order[1:3] == ["https://www.acme.example/page-x", "https://www.acme.example/about"]
+    assert order[-1] == "https://www.acme.example/privacy"
+    stats = frontier.stats()
+    assert stats["duplicates"] == 1 and stats["off_site"] == 1 and stats["skipped"] == 1
+
+def test_frontier_budgets():
+    frontier = Frontier(["https://a.example/"], max_pages=3, allow_external=True, max_pages_per_domain=2)
+    frontier.add_links([(f"/p{i}", "") for i in range(5)] + [("https://b.example/", "")], "https://a.example/", 1)
+    popped = [url for url, _ in iter(frontier.pop, None)]
+    assert len(popped) == 3
+    assert sum(url.startswith("https://a.example/") for url in popped) == 2
+    assert "https://b.example/" in popped
+    assert len(frontier) == 0
+
+def test_seen_set_switches_to_bloom_filter():
+    seen = SeenSet(bloom_threshold=10000, bloom_capacity=200000, bloom_error=0.001)
+    urls = [f"https://site.example/page/{i}" for i in range(100000)]
+    for url in urls:
+        assert seen.add(url)
+    assert seen.uses_bloom
+    # No false negatives, including URLs added before the switch.
+    assert not any(seen.add(url) for url in urls[::97])
+    false_positives = sum(f"https://other.example/{i}" in seen for i in range(100000))
+    print(f"🌸 Bloom filter: {seen._bloom.nbytes} bytes, {false_positives} false positives in 100000 lookups")
+    assert false_positives < 300
+
+def test_bfs_crawl_follows_relative_links_once():
+    server, base = start_site()
+    try:
+        frontier = Frontier([base + "/"], max_depth=2, max_pages=1000)
+        fetched = crawl_site(frontier)
+
+        paths = sorted(url[len(base):] for url in fetched)
+        print(f"🕸️  Fetched {len(fetched)} pages, frontier stats: {frontier.stats()}")
+        assert len(paths) == len(set(paths))
+        assert all(count == 1 for count in SiteHandler.hits.values())
+        # Relative links are resolved; tracking parameters and fragments are dropped.
+        assert {"/contact", "/about-us", "/services/consulting", "/team", "/blog/2024/01/post-7"} <= set(paths)
+        # /team and the comment pages are two links deep, one past them is not.
+        assert "/blog/2024/01/post-1/comments" in paths
+        assert not any("elsewhere" in url or url.endswith(".pdf") for url in fetched)
+    finally:
+        server.shutdown()
+
+def test_small_budget_fetches_contact_pages_first():
+    server, base = start_site()
+    try:
+        started = time.perf_counter()
+        frontier = Frontier([base + "/"], max_depth=2, max_pages=5)
+        fetched = crawl_site(frontier, max_concurrency=1)
+        elapsed = time.perf_counter() - started
+
+        paths = [url[len(base):] for url in fetched]
+        print(f"🎯 Budget of 5 fetched {paths} in {elapsed:.2f}s")
+        assert len(fetched) == 5
+        assert paths[0] == "/"
+        assert {"/contact", "/about-us"} <= set(paths[1:3])
+        assert not any(path.startswith("/blog/") for path in paths)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_canonicalize_url()
+    test_frontier_filters_and_prioritizes()
+    test_frontier_budgets()
+    test_seen_set_switches_to_bloom_filter()
+    test_bfs_crawl_follows_relative_links_once()
+    test_small_budget_fetches_contact_pages_first()
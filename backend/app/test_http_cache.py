@@ -0,0 +1,215 @@
+import asyncio
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+from app.scraper.http_cache import HttpCache
+from app.scraper.page_cache import PageCache
+
+PAGE_SIZE = 20000
+
+CACHE_CONTROL = {
+    "/account": "private, max-age=600",
+    "/live": "no-cache",
+    "/prices": "max-age=0",
+    "/static": "public, max-age=3600",
+}
+
+class ValidatingHandler(BaseHTTPRequestHandler):
+    """Serves pages with an ETag and answers matching conditional requests with 304.
+
+    ``statuses`` counts page responses only, not the crawler's robots.txt lookups.
+    """
+    protocol_version = "HTTP/1.1"
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == "/robots.txt":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{self.path}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self._count(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = (f"<html><body><h1>Page {self.path}</h1>" + "<p>lorem ipsum</p>" * (PAGE_SIZE // 18)).encode()
+        cache_control = CACHE_CONTROL.get(self.path, "no-store" if self.path.startswith("/private") else None)
+        self._count(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if not self.path.startswith("/private"):
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        if cache_control:
+            self.send_header("Cache-Control", cache_control)
+        if self.path == "/vary":
+            self.send_header("Vary", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, status):
+        with type(self).lock:
+            type(self).statuses[status] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server():
+    ValidatingHandler.statuses = Counter()
+    return start_local_server(ValidatingHandler)
+
+def test_fresh_entries_are_served_from_disk():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, ttl=3600)
+            first_task = PageCache(http_cache=cache)
+            first = first_task.fetch(f"{base}/about")
+
+            # A second task, even in a new cache object, reuses the stored page.
+            second_task = PageCache(http_cache=HttpCache(tmp, ttl=3600))
+            second = second_task.fetch(f"{base}/about#team")
+
+            assert first == second
+            assert ValidatingHandler.statuses == {200: 1}
+            assert first_task.summary()["http_cache"]["misses"] == 1
+            stats = second_task.summary()["http_cache"]
+            print(f"📊 Second task cache stats: {stats}")
+            assert stats["hits"] == 1 and stats["hit_ratio"] == 1.0
+            assert stats["bytes_saved"] == len(second.encode())
+    finally:
+        server.shutdown()
+
+def test_stale_entries_are_revalidated():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, ttl=0)
+            task = PageCache(http_cache=cache)
+            html = task.fetch(f"{base}/services")
+            response = PageCache(http_cache=cache).fetch_response(f"{base}/services")
+
+            assert ValidatingHandler.statuses == {200: 1, 304: 1}
+            assert response.status_code == 200
+            assert response.text == html
+            assert response.headers["content-type"] == "text/html; charset=utf-8"
+            print("✅ Stale entry revalidated with a 304")
+    finally:
+        server.shutdown()
+
+def test_no_store_responses_are_not_cached():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp)
+            for _ in range(2):
+                PageCache(http_cache=cache).fetch(f"{base}/private")
+            assert ValidatingHandler.statuses == {200: 2}
+            assert cache.usage()["entries"] == 0
+    finally:
+        server.shutdown()
+
+def test_cache_control_decides_storage_and_freshness():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # private, no-cache and Vary: * pages are fetched in full every time.
+            cache = HttpCache(tmp, ttl=3600)
+            for _ in range(2):
+                for path in ("/account", "/live", "/vary"):
+                    PageCache(http_cache=cache).fetch(f"{base}{path}")
+            assert ValidatingHandler.statuses == {200: 6}
+            assert cache.usage()["entries"] == 0
+
+            # max-age overrides the TTL in both directions.
+            cache = HttpCache(tmp, ttl=0)
+            for _ in range(3):
+                PageCache(http_cache=cache).fetch(f"{base}/static")
+            cache = HttpCache(tmp, ttl=3600)
+            for _ in range(3):
+                PageCache(http_cache=cache).fetch(f"{base}/prices")
+            assert ValidatingHandler.statuses == {200: 8, 304: 2}
+            assert cache.is_fresh(f"{base}/static") and not cache.is_fresh(f"{base}/prices")
+    finally:
+        server.shutdown()
+
+def test_lru_eviction_keeps_cache_under_limit():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, max_bytes=10**9)
+            cache.fetch(f"{base}/page/0")
+            entry_size = cache.usage()["bytes"]
+            cache.max_bytes = entry_size * 3
+
+            cache.fetch(f"{base}/page/1")
+            cache.fetch(f"{base}/page/2")
+            # Touch page 0 so page 1 is the least recently used.
+            cache.fetch(f"{base}/page/0")
+            cache.fetch(f"{base}/page/3")
+
+            usage = cache.usage()
+            print(f"📦 Cache usage after eviction: {usage}")
+            assert usage["bytes"] <= cache.max_bytes
+            assert cache.lookup(f"{base}/page/0") is not None
+            assert cache.lookup(f"{base}/page/1") is None
+            assert cache.lookup(f"{base}/page/3") is not None
+
+            # The running total matches the entries after replacements and evictions, and on reopening.
+            request = httpx.Request("GET", f"{base}/page/3")
+            cache.store(f"{base}/page/3", httpx.Response(200, content=b"x" * 100, request=request))
+            usage, db = cache.usage(), cache._db()
+            assert usage["bytes"] == db.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+            assert usage["entries"] == db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            assert HttpCache(tmp).usage()["bytes"] == usage["bytes"]
+    finally:
+        server.shutdown()
+
+def test_repeated_crawl_hits_cache():
+    server, base = start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, ttl=3600)
+            urls = [f"{base}/page/{i}" for i in range(50)]
+
+            def crawl_task():
+                task = PageCache(http_cache=cache)
+
+                async def consume():
+                    return [item async for item in crawl(urls, max_concurrency=5, per_host_limit=5, cache=task)]
+
+                pages = asyncio.run(consume())
+                assert all(html and "<h1>Page" in html for _, html in pages)
+                return task.summary()["http_cache"]
+
+            cold = crawl_task()
+            warm = crawl_task()
+            usage = cache.usage()
+            print(f"🧊 Cold crawl: {cold}")
+            print(f"🔥 Warm crawl: {warm}")
+            print(f"📦 {usage['entries']} entries, {usage['bytes']} compressed bytes for {50 * PAGE_SIZE} bytes of pages")
+            assert cold["misses"] == 50
+            assert warm["hits"] == 50 and warm["hit_ratio"] == 1.0
+            assert ValidatingHandler.statuses == {200: 50}
+            assert usage["bytes"] < 50 * PAGE_SIZE / 10
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_fresh_entries_are_served_from_disk()
+    test_stale_entries_are_revalidated()
+    test_no_store_responses_are_not_cached()
+    test_cache_control_decides_storage_and_freshness()
+    test_lru_eviction_keeps_cache_under_limit()
+    test_repeated_crawl_hits_cache()
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler
+
+from app.conftest import make_session_factory, scraper_events_to, start_local_server
+from app.events import read_events
+from app.fingerprints import ChangeTracker, FingerprintWriter, PagePrint, load_fingerprints
+from app.scraper.engine import _scrape_site
+from app.scraper.extraction_stage import extract_changed_page
+from app.scraper.extractors import build_page, page_fingerprint
+from app.scraper.frontier import Frontier
+from app.scraper.page_cache import PageCache
+from app.scraper.parsers import parse_document
+
+PAGES = 30
+
+def company_page(number, extra=""):
+    links = "".join(f'<a href="/company/{n}">Company {n}</a>' for n in range(PAGES))
+    return (
+        f"<html><head><title>Company {number}</title></head><body><h1>Company {number} Inc</h1>"
+        f"<p>We build widgets. Contact info{number}@widgets{number}.io or call +1 415 555 {1000 + number}.</p>"
+        f"<p>{'Our widgets are the best widgets. ' * 200}{extra}</p>{links}</body></html>"
+    )
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pages = {}
+
+    def do_GET(self):
+        body = type(self).pages.get(self.path)
+        status = 200 if body is not None else 404
+        body = (body or "").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ListWriter:
+    """Stands in for ResultWriter: keeps the records in memory."""
+
+    def __init__(self):
+        self.records = []
+        self.written = 0
+
+    def add(self, record):
+        self.records.append(record)
+        return False
+
+    def flush(self):
+        self.written = len(self.records)
+        return self.written
+
+def test_fingerprint_ignores_markup_but_not_links():
+    def fingerprint(html):
+        return page_fingerprint(build_page(parse_document(html)))
+
+    base = fingerprint('<html><body><p class="a">Hello   world</p><a href="/x">x</a></body></html>')
+    assert fingerprint('<html><body><div id="b"><p>Hello world</p></div><script>var t = 1;</script><a href="/x">x</a></body></html>') == base
+    assert fingerprint('<html><body><p>Hello world</p><a href="/y">x</a></body></html>') != base
+    assert fingerprint('<html><body><p>Hello there</p><a href="/x">x</a></body></html>') != base
+
+def test_extract_changed_page_skips_unchanged_pages():
+    html = company_page(1)
+    data, next_url, fingerprint = extract_changed_page(html, "https://acme.example/")
+    assert data["contacts"]["emails"] == ["info1@widgets1.io"]
+    redesigned = html.replace("<p>", '<p class="lead">')
+    assert extract_changed_page(redesigned, "https://acme.example/", previous_fingerprint=fingerprint) == (None, next_url, fingerprint)
+    data, _, changed = extract_changed_page(company_page(1, "New!"), "https://acme.example/", previous_fingerprint=fingerprint)
+    assert data is not None and changed != fingerprint
+
+def test_change_tracker_counts():
+    page = PagePrint("h", "f", None, None)
+    tracker = ChangeTracker({"https://a.example/": page, "https://a.example/b": page, "https://a.example/c": page}, 7)
+    assert tracker.record("https://A.example/", unchanged=True) == "unchanged"
+    assert tracker.record("https://a.example/b", unchanged=False) == "changed"
+    assert tracker.record("https://a.example/new", unchanged=False) == "new"
+    assert tracker.summary() == {"new": 1, "changed": 1, "unchanged": 1, "removed": 1, "previous_task_id": 7}
+
+def test_rescrape_only_extracts_changed_pages():
+    SiteHandler.pages = {f"/company/{n}": company_page(n) for n in range(PAGES)}
+    server, base = start_local_server(SiteHandler)
+    params = {"url": f"{base}/company/0", "extraction_workers": 0, "use_sitemaps": False, "host_rate": 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_session_factory(os.path.join(tmp, "incremental.db"))
+
+        def scrape(task_id, previous_task_id):
+            previous = load_fingerprints(previous_task_id, session_factory) if previous_task_id else {}
+            changes = ChangeTracker(previous, previous_task_id)
+            prints = FingerprintWriter(task_id, session_factory=session_factory)
+            writer = ListWriter()
+            frontier = Frontier([params["url"]], max_depth=1, max_pages=PAGES + 10)
+            cache = PageCache()
+            started = time.perf_counter()
+            asyncio.run(_scrape_site(task_id, frontier, params, cache, writer, None, changes, prints))
+            # Extracted pages are freed; only their URLs stay.
+            assert cache.summary()["held_pages"] == 0 and cache.summary()["pages"] == len(writer.records)
+            return writer.records, changes.summary(), time.perf_counter() - started
+
+        # Progress events go to the test database, not the default one.
+        try:
+            with scraper_events_to(session_factory):
+                first, summary, first_time = scrape(1, None)
+                assert len(first) == PAGES and summary["new"] == PAGES
+
+                # A redesign that keeps the text, one edited page, one removed and one added.
+                SiteHandler.pages = {path: html.replace("<p>", '<p class="lead">') for path, html in SiteHandler.pages.items()}
+                SiteHandler.pages["/company/3"] = company_page(3, "Now with gadgets.")
+                del SiteHandler.pages["/company/5"]
+                SiteHandler.pages["/company/0"] = SiteHandler.pages["/company/0"].replace("</body>", '<a href="/company/new">New</a></body>')
+                SiteHandler.pages["/company/new"] = company_page(99)
+                second, summary, second_time = scrape(2, 1)
+        finally:
+            server.shutdown()
+
+        print(f"🔁 re-scrape: {summary}; first crawl {first_time * 1000:.0f} ms, re-scrape {second_time * 1000:.0f} ms")
+        # /company/0 gained a link, /company/3 gained text; the rest only changed markup.
+        assert summary == {"new": 1, "changed": 2, "unchanged": PAGES - 3, "removed": 1, "previous_task_id": 1}
+        by_url = {record["url"]: record for record in first}
+        reused = [record for record in second if record["url"] not in (f"{base}/company/0", f"{base}/company/3", f"{base}/company/new")]
+        assert len(reused) == PAGES - 3
+        for record in reused:
+            assert record["task_id"] == 2
+            assert {**record, "task_id": 1} == by_url[record["url"]]
+        assert len(load_fingerprints(2, session_factory)) == PAGES
+        assert sum(event["type"] == "page" and event["data"]["ok"] for event in read_events([2], session_factory=session_factory)) == PAGES
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_markup_but_not_links()
+    test_extract_changed_page_skips_unchanged_pages()
+    test_change_tracker_counts()
+    test_rescrape_only_extracts_changed_pages()
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import time
+
+from app.exporters import flatten_record
+from app.scraper.merge import RecordMerger, company_key
+
+def page_record(url, company="Acme Corp", emails=("info@acme.example",), phones=("+14155550100",), services=(), **fields):
+    record = {
+        "url": url,
+        "company": company,
+        "contacts": {"emails": list(emails), "phones": list(phones), "contact_page": "https://acme.example/contact"},
+        "tagline": "Widgets for everyone",
+        "services": list(services),
+        "social_media": {"linkedin": "https://linkedin.com/company/acme"},
+        "address": None,
+        "description": "Acme builds widgets. " * 10,
+        "industry": "manufacturing",
+        "extracted_at": "2026-01-01T00:00:00",
+        "page_number": 1,
+        "task_id": 1,
+    }
+    record.update(fields)
+    return record
+
+def test_company_key():
+    assert company_key("ACME, Inc.") == company_key("Acme Inc") == company_key("acme") == "acme"
+    assert company_key("The Widget Company Ltd") == "the widget"
+    assert company_key("Co") == "co"
+    assert company_key("") is None and company_key(None) is None
+
+def test_pages_of_a_company_merge_with_provenance():
+    merger = RecordMerger()
+    assert merger.add(page_record("https://acme.example/"))
+    assert not merger.add(page_record(
+        "https://www.acme.example/contact", company="ACME Corp.", emails=("INFO@acme.example", "sales@acme.example"),
+        phones=("+1 (415) 555-0100", "+14155550199"), tagline=None, address="1 Main St",
+        social_media={"linkedin": "https://linkedin.com/company/acme-other", "twitter": "https://twitter.com/acme"},
+    ))
+    # Blog pages carry no company name: they join the site's only company.
+    merger.add(page_record("https://acme.example/blog/1", company=None, services=("Consulting",), extracted_at="2026-01-02T00:00:00"))
+    # Another site, and a directory site with two companies, stay separate.
+    merger.add(page_record("https://globex.example/", company="Globex", emails=("hi@globex.example",)))
+    merger.add(page_record("https://directory.example/a", company="Initech"))
+    merger.add(page_record("https://directory.example/b", company="Hooli"))
+    merger.add(page_record("https://directory.example/list", company=None))
+    assert merger.added == 7
+
+    records = merger.records()
+    assert [record["company"] for record in records] == ["Acme Corp", "Globex", "Initech", "Hooli", None]
+    acme = records[0]
+    assert acme["url"] == "https://acme.example/"
+    assert acme["contacts"]["emails"] == ["info@acme.example", "sales@acme.example"]
+    assert acme["contacts"]["phones"] == ["+14155550100", "+14155550199"]
+    assert acme["services"] == ["Consulting"]
+    assert acme["social_media"] == {"linkedin": "https://linkedin.com/company/acme", "twitter": "https://twitter.com/acme"}
+    assert acme["address"] == "1 Main St" and acme["tagline"] == "Widgets for everyone"
+    assert acme["extracted_at"] == "2026-01-02T00:00:00"
+    assert acme["source_urls"] == ["https://acme.example/", "https://www.acme.example/contact", "https://acme.example/blog/1"]
+    assert acme["provenance"]["address"] == "https://www.acme.example/contact"
+    assert acme["provenance"]["emails"] == {
+        "info@acme.example": "https://acme.example/", "sales@acme.example": "https://www.acme.example/contact"
+    }
+    assert acme["provenance"]["services"] == {"Consulting": "https://acme.example/blog/1"}
+    assert acme["provenance"]["social_media"]["twitter"] == "https://www.acme.example/contact"
+    print(f"🧩 {merger.added} page records merged into {len(records)}")
+
+def test_merging_shrinks_output_and_serialization():
+    pages = [
+        page_record(f"https://acme.example/products/{i}", services=(f"Widget line {i % 5}",), page_number=i % 10 + 1)
+        for i in range(2000)
+    ]
+    merger = RecordMerger()
+    for record in pages:
+        merger.add(record)
+    merged = merger.records()
+
+    def serialize(records):
+        started = time.perf_counter()
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(flatten_record(record) for record in records)
+        size = len(buffer.getvalue()) + sum(len(json.dumps(record)) for record in records)
+        return size, time.perf_counter() - started
+
+    page_size, page_time = serialize(pages)
+    merged_size, merged_time = serialize(merged)
+    print(f"📉 {len(pages)} page records: {page_size} bytes in {page_time * 1000:.0f} ms; "
+          f"merged: {len(merged)} record, {merged_size} bytes in {merged_time * 1000:.1f} ms")
+    assert len(merged) == 1 and len(merged[0]["services"]) == 5
+    # What is left is mostly the list of source pages.
+    assert merged_size < page_size / 10
+
+if __name__ == "__main__":
+    test_company_key()
+    test_pages_of_a_company_merge_with_provenance()
+    test_merging_shrinks_output_and_serialization()
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+from app.scraper.fetcher import new_async_client
+from app.scraper.frontier import Frontier
+from app.scraper.page_cache import PageCache
+from app.scraper.pagination import detect_page_pattern, iter_pages, next_page_url
+from app.scraper.parsers import parse_document
+
+LAST_PAGE = 12
+PAGE_DELAY = 0.1
+
+def listing_page(number):
+    """Page ``number`` of a listing whose page bar only shows the first five pages."""
+    bar = "".join(f'<a href="/list?page={n}">{n}</a>' for n in range(1, 6))
+    next_link = f'<a href="/list?page={number + 1}">Next</a>' if number < LAST_PAGE else ""
+    return f"<html><body><h1>Listing page {number}</h1>{bar}{next_link}</body></html>"
+
+CHAIN = {
+    "/a": '<html><body>A <a href="b">next page</a></body></html>',
+    "/b": '<html><body>B <a href="/c">Next</a></body></html>',
+    # /c links back to /a, which would cycle forever without a visited set.
+    "/c": '<html><body>C <a href="a">Next</a></body></html>',
+    "/x": '<html><body>X <a rel="next" href="/y?token=1">more</a></body></html>',
+    "/y": '<html><body>Y <a rel="next" href="/y?token=2">more</a></body></html>',
+}
+
+class PaginationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with type(self).lock:
+            type(self).hits[self.path] += 1
+        parts = urlsplit(self.path)
+        status = 200
+        if parts.path == "/list":
+            time.sleep(PAGE_DELAY)
+            number = int(parse_qs(parts.query).get("page", ["1"])[0])
+            # Past the end the site serves the first page again, as many do.
+            body = listing_page(number if number <= LAST_PAGE else 1)
+        elif parts.path in CHAIN:
+            # Every /y?token=N is the same page: only the content hash can tell.
+            body = CHAIN[parts.path]
+        else:
+            body, status = "", 404
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server():
+    PaginationHandler.hits = Counter()
+    return start_local_server(PaginationHandler)
+
+def collect(url, html, **kwargs):
+    async def run():
+        pages = []
+        started = time.perf_counter()
+        async with new_async_client() as client:
+            async for page_number, page_url, _ in iter_pages(client, url, html, PageCache(), **kwargs):
+                pages.append((page_number, page_url, time.perf_counter() - started))
+        return pages, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+def test_next_page_url_resolves_relative_links():
+    def next_of(html, base):
+        return next_page_url(parse_document(html), base)
+
+    assert next_of('<a href="page/2">Next</a>', "https://a.example/blog/") == "https://a.example/blog/page/2"
+    assert next_of('<a href="?page=3">Next »</a>', "https://a.example/list?page=2") == "https://a.example/list?page=3"
+    assert next_of('<link rel="next" href="/p/2"><a href="/other">Next</a>', "https://a.example/") == "https://a.example/p/2"
+    assert next_of('<a href="javascript:more()">Next</a>', "https://a.example/") is None
+    assert next_of('<a href="/about">About</a>', "https://a.example/") is None
+
+def test_detect_page_pattern():
+    pattern = detect_page_pattern("https://a.example/list?cat=7", "https://a.example/list?cat=7&page=2")
+    assert pattern.url(5) == "https://a.example/list?cat=7&page=5"
+    assert detect_page_pattern("https://a.example/blog/", "https://a.example/blog/page/2/").url(3) == "https://a.example/blog/page/3/"
+    assert detect_page_pattern("https://a.example/blog/page/4", "https://a.example/blog/page/5").number == 5
+    assert detect_page_pattern("https://a.example/items-2.html", "https://a.example/items-3.html").url(9) == "https://a.example/items-9.html"
+    # Cursors, skipped numbers and another section are not a countable pattern.
+    assert detect_page_pattern("https://a.example/feed", "https://a.example/feed?after=9f8e") is None
+    assert detect_page_pattern("https://a.example/list?page=2", "https://a.example/list?page=4") is None
+    assert detect_page_pattern("https://a.example/blog", "https://a.example/news/page/2") is None
+
+def test_numbered_pages_are_fetched_concurrently_in_order():
+    server, base = start_server()
+    try:
+        first = listing_page(1)
+        pages, elapsed = collect(f"{base}/list", first, concurrency=4)
+        sequential, sequential_elapsed = collect(f"{base}/list", first, concurrency=1)
+
+        print(f"📄 {len(pages)} pages in {elapsed:.2f}s concurrently, {sequential_elapsed:.2f}s one at a time")
+        assert [number for number, _, _ in pages] == list(range(2, LAST_PAGE + 1))
+        assert [url for _, url, _ in pages] == [f"{base}/list?page={n}" for n in range(2, LAST_PAGE + 1)]
+        assert [url for _, url, _ in sequential] == [url for _, url, _ in pages]
+        # Pages 2-5 are on the page bar, so they are requested together.
+        assert pages[3][2] < sequential[3][2] / 2
+        # Streamed: the first page is handed over long before the last one arrives.
+        assert pages[0][2] < elapsed / 2
+        # Past the page bar each page waits for the one before to link to it: nothing past the end is requested.
+        assert not any(int(path.split("=")[-1]) > LAST_PAGE for path in PaginationHandler.hits if "=" in path)
+    finally:
+        server.shutdown()
+
+def test_max_pages_caps_pagination():
+    server, base = start_server()
+    try:
+        pages, _ = collect(f"{base}/list", listing_page(1), max_pages=4)
+        assert [number for number, _, _ in pages] == [2, 3, 4]
+        assert sum(PaginationHandler.hits.values()) == 3
+    finally:
+        server.shutdown()
+
+def test_cycles_and_repeated_content_stop_pagination():
+    server, base = start_server()
+    try:
+        pages, _ = collect(f"{base}/a", CHAIN["/a"])
+        assert [(number, url) for number, url, _ in pages] == [(2, f"{base}/b"), (3, f"{base}/c")]
+        assert PaginationHandler.hits["/a"] == 0
+
+        pages, _ = collect(f"{base}/x", CHAIN["/x"])
+        assert [url for _, url, _ in pages] == [f"{base}/y?token=1"]
+        assert PaginationHandler.hits["/y?token=2"] == 1
+        print("🔁 Cycling and repeating pages stopped after one pass")
+    finally:
+        server.shutdown()
+
+def test_crawl_queues_pagination_within_the_page_budget():
+    server, base = start_server()
+    try:
+        frontier = Frontier([f"{base}/list"], max_depth=0, max_pages=7)
+
+        async def run():
+            return [(frontier.page_of(url), html is not None) async for url, html in crawl(frontier=frontier, host_rate=0)]
+
+        pages = asyncio.run(run())
+        # Pages 2-5 come from the page bar, 6 and 7 from next links; max_depth=0 does not stop pagination.
+        assert sorted(pages) == [((f"{base}/list", number), True) for number in range(1, 8)]
+        assert frontier.stats()["released"] == 7
+        # The same scheduler as any other fetch: robots.txt was asked for, the budget capped the listing.
+        assert PaginationHandler.hits["/robots.txt"] == 1
+        assert sum(count for path, count in PaginationHandler.hits.items() if path.startswith("/list")) == 7
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_next_page_url_resolves_relative_links()
+    test_detect_page_pattern()
+    test_numbered_pages_are_fetched_concurrently_in_order()
+    test_max_pages_caps_pagination()
+    test_cycles_and_repeated_content_stop_pagination()
+    test_crawl_queues_pagination_within_the_page_budget()
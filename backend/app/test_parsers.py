@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from app.scraper.extractors import extract_data
+from app.scraper.pagination import next_pages
+from app.scraper.parsers import PARSER_BACKENDS, document_links, parse_document
+from app.test_extractors import CORPUS
+
+EDGE_CASES = [
+    "",
+    "<p>no html element at all, call 555-123-4567</p>",
+    '<?xml version="1.0" encoding="utf-8"?><html><body><h1>Declared Corp</h1></body></html>',
+    "<html><body><h2>About <b>us</b></h2><p>" + "Nested heading strings are not plain strings. " * 3 + "</p></body></html>",
+    '<html><body><table><tr><td class="address">1 Infinite Loop, Cupertino, CA 95014</td></tr></table></body></html>',
+]
+
+def _normalized(record):
+    record = dict(record)
+    record["services"] = sorted(record["services"])
+    contacts = dict(record["contacts"])
+    contacts["emails"] = sorted(contacts["emails"])
+    contacts["phones"] = sorted(contacts["phones"])
+    record["contacts"] = contacts
+    return record
+
+@pytest.mark.parametrize("backend", [b for b in PARSER_BACKENDS if b != "html.parser"])
+def test_backends_extract_equivalent_records(backend):
+    for index, html in enumerate(CORPUS + EDGE_CASES):
+        url = f"https://site{index}.example.com/"
+        expected = _normalized(extract_data(html, url, parser="html.parser"))
+        assert _normalized(extract_data(html, url, parser=backend)) == expected, index
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+def test_backends_agree_on_links_and_pagination(backend):
+    html = '<a href="https://a.example/">A</a><a href="/rel">Rel</a><a>none</a><a href="https://b.example/">B</a>'
+    assert document_links(parse_document(html, backend)) == ["https://a.example/", "/rel", "https://b.example/"]
+    bar = '<a href="?page=2">2</a><a href="?page=3">3</a><a href="?page=2">Next</a>'
+    assert next_pages(parse_document(bar, backend), "https://a.example/list") == [
+        "https://a.example/list?page=2", "https://a.example/list?page=3"
+    ]
+    assert next_pages(parse_document("<p>only page</p>", backend), "https://a.example/") == []
+
+def test_lxml_backends_follow_implied_end_tags():
+    # html.parser nests unclosed <li> elements; libxml2 closes them like a browser.
+    html = '<div class="services"><ul><li>Unclosed item<li>Second item</ul></div>'
+    assert sorted(extract_data(html, "https://a.example/", parser="html.parser")["services"]) == [
+        "Second item", "Unclosed itemSecond item"
+    ]
+    for backend in ("lxml", "lxml-html"):
+        assert sorted(extract_data(html, "https://a.example/", parser=backend)["services"]) == [
+            "Second item", "Unclosed item"
+        ]
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        parse_document("<p>x</p>", "html5lib")
+
+def build_large_page(target_bytes: int) -> str:
+    bodies = [page.split("<body>", 1)[1].rsplit("</body>", 1)[0] for page in CORPUS]
+    parts = ["<html><head><title>Big Catalog | Home</title></head><body>"]
+    size = 0
+    index = 0
+    while size < target_bytes:
+        body = f'<section id="block-{index}">{bodies[index % len(bodies)]}</section>'
+        parts.append(body)
+        size += len(body)
+        index += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def test_large_pages_extract_alike_with_every_backend():
+    html = build_large_page(128 * 1024)
+    expected = _normalized(extract_data(html, "https://big.example.com/", parser="html.parser"))
+    assert expected["contacts"]["emails"]
+    for backend in PARSER_BACKENDS[1:]:
+        assert _normalized(extract_data(html, "https://big.example.com/", parser=backend)) == expected, backend
+
+@pytest.mark.benchmark
+def test_benchmark_parse_throughput_on_large_pages():
+    for megabytes in (1, 5):
+        html = build_large_page(megabytes * 1024 * 1024)
+        size_mb = len(html.encode("utf-8")) / (1024 * 1024)
+        results = {}
+        for backend in PARSER_BACKENDS:
+            started = time.perf_counter()
+            parse_document(html, backend)
+            parsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            extract_data(html, "https://big.example.com/", parser=backend)
+            extracted = time.perf_counter() - started
+
+            results[backend] = extracted
+            print(f"⏱️  {size_mb:.1f} MB {backend:>11}: parse {size_mb / parsed:6.1f} MB/s, "
+                  f"parse+extract {extracted:.2f}s")
+        assert results["lxml-html"] < results["html.parser"]
+
+if __name__ == "__main__":
+    for backend in PARSER_BACKENDS[1:]:
+        test_backends_extract_equivalent_records(backend)
+    test_large_pages_extract_alike_with_every_backend()
+    test_benchmark_parse_throughput_on_large_pages()
@@ -0,0 +1,82 @@
+import random
+import re
+import time
+
+import pytest
+
+from app.scraper.phones import find_phones, normalize_phone
+
+LEGACY_PHONE_PATTERNS = [
+    re.compile(r'\+?1?[-.\s]?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})'),
+    re.compile(r'\+?[0-9]{1,4}[-.\s]?\(?[0-9]{1,4}\)?[-.\s]?[0-9]{1,4}[-.\s]?[0-9]{1,4}'),
+    re.compile(r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b'),
+    re.compile(r'\(\d{3}\)\s?\d{3}[-.\s]?\d{4}'),
+]
+
+def legacy_find_phones(text):
+    phones = set()
+    for pattern in LEGACY_PHONE_PATTERNS:
+        for match in pattern.findall(text):
+            phones.add(''.join(match) if isinstance(match, tuple) else match)
+    return [phone for phone in phones if 10 <= len(re.sub(r'[^\d+]', '', phone)) <= 15]
+
+def number_dense_text(seed: int, rows: int = 2000) -> str:
+    rng = random.Random(seed)
+    cells = []
+    for row in range(rows):
+        cells.append(f"SKU {rng.randint(1000, 99999)}-{rng.randint(10, 99)} qty {rng.randint(1, 500)} "
+                     f"${rng.randint(1, 9999)}.{rng.randint(0, 99):02d} {rng.randint(1, 12)}/{rng.randint(1, 28)}/2024 "
+                     f"{' '.join(str(rng.randint(0, 99)) for _ in range(rng.randint(3, 9)))}")
+        if row % 500 == 0:
+            cells.append(f"Sales: (415) 555-{rng.randint(1000, 9999)}")
+    return "\n".join(cells)
+
+def test_formats_are_found_once_in_normalized_form():
+    text = ("Call (415) 555-0134 or 415.555.0134, intl +44 20 7946 0958, "
+            "US +1 (212) 555-0199. Order 12 34 56 78 ships in 3-5 days, ref 2024-01-15.")
+    assert sorted(find_phones(text, ["+1-800-555-0100"])) == [
+        "+12125550199", "+18005550100", "+442079460958", "4155550134",
+    ]
+
+def test_digits_next_to_a_number_stay_out_of_it():
+    assert find_phones("Call 415-555-0134 7 days a week") == ["4155550134"]
+    assert find_phones("Hours 9 to 5 415-555-0134") == ["4155550134"]
+    assert find_phones("Phone 415 555 0134\n2 offices") == ["4155550134"]
+    assert sorted(find_phones("Sales 415 555 0134 415 555 0199")) == ["4155550134", "4155550199"]
+    assert find_phones("Order 12345678901234567890 shipped") == []
+
+def test_validation_uses_phonenumbers():
+    assert normalize_phone("(415) 555-0134", "possible") == "+14155550134"
+    assert normalize_phone("+44 20 7946 0958", "valid") == "+442079460958"
+    assert normalize_phone("+33 1 23 45 67 89", "off") == "+33123456789"
+    assert normalize_phone("1234567890", "valid") is None
+    assert normalize_phone("12 34 56 78", "valid") is None
+
+def test_listed_numbers_are_found_on_number_dense_pages():
+    page = number_dense_text(0, rows=600)
+    listed = {re.sub(r'[^\d]', '', m) for m in re.findall(r'\(415\) 555-\d{4}', page)}
+    assert len(listed) == 2 and listed <= set(find_phones(page))
+
+@pytest.mark.benchmark
+def test_benchmark_number_dense_pages():
+    pages = [number_dense_text(seed) for seed in range(5)]
+    started = time.perf_counter()
+    legacy = [legacy_find_phones(page) for page in pages]
+    before = time.perf_counter() - started
+    started = time.perf_counter()
+    current = [find_phones(page) for page in pages]
+    after = time.perf_counter() - started
+    started = time.perf_counter()
+    validated = [find_phones(page, validation="valid") for page in pages]
+    validating = time.perf_counter() - started
+    print(f"⏱️  number-dense pages: legacy {before * 1000:.0f} ms ({sum(map(len, legacy))} phones), "
+          f"single scan {after * 1000:.0f} ms ({sum(map(len, current))}), "
+          f"validated {validating * 1000:.0f} ms ({sum(map(len, validated))})")
+    assert after < before
+
+if __name__ == "__main__":
+    test_formats_are_found_once_in_normalized_form()
+    test_digits_next_to_a_number_stay_out_of_it()
+    test_validation_uses_phonenumbers()
+    test_listed_numbers_are_found_on_number_dense_pages()
+    test_benchmark_number_dense_pages()
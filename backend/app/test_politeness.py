@@ -0,0 +1,207 @@
+import asyncio
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+
+from app.config import SCRAPER_HOST_BURST
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+from app.scraper.frontier import Frontier
+from app.scraper.http_cache import HttpCache
+from app.scraper.page_cache import PageCache
+from app.scraper.politeness import RobotsCache, parse_retry_after, robots_cache
+
+def start_host(robots=None, throttle_first=0, retry_after="1", links=()):
+    """A local "host" that logs request times, serves ``robots`` and 429s its first requests.
+
+    The page at ``/`` links to ``links``.
+    """
+
+    class HostHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        requests = []
+        lock = threading.Lock()
+
+        def do_GET(self):
+            cls = type(self)
+            with cls.lock:
+                cls.requests.append((self.path, time.monotonic()))
+                throttled = sum(1 for path, _ in cls.requests if path != "/robots.txt") <= throttle_first
+            if self.path == "/robots.txt":
+                if robots is None:
+                    self._reply(404, b"not found")
+                else:
+                    self._reply(200, robots.encode(), "text/plain")
+            elif throttled:
+                self._reply(429, b"slow down", headers={"Retry-After": retry_after})
+            else:
+                anchors = "".join(f'<a href="{link}">{link}</a>' for link in links) if self.path == "/" else ""
+                self._reply(200, f"<html><body><h1>Page {self.path}</h1>{anchors}</body></html>".encode())
+
+        def _reply(self, status, body, content_type="text/html", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server, base = start_local_server(HostHandler)
+    return server, HostHandler, base
+
+def run_crawl(urls, **kwargs):
+    async def consume():
+        finished = {}
+        started = time.monotonic()
+        async for url, html in crawl(urls, **kwargs):
+            finished[url] = (html, time.monotonic() - started)
+        return finished
+
+    return asyncio.run(consume())
+
+def page_times(handler):
+    return [at for path, at in handler.requests if path != "/robots.txt"]
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    later = formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= parse_retry_after(later) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+def test_robots_rules_and_crawl_delay():
+    # Fractional delays are rounded up, so this is one request per second.
+    server, handler, base = start_host(robots="User-agent: *\nDisallow: /private\nCrawl-delay: 0.5\n")
+    try:
+        urls = [f"{base}/page/{i}" for i in range(3)] + [f"{base}/private/{i}" for i in range(2)]
+        pages = run_crawl(urls, max_concurrency=5, per_host_limit=5, host_rate=100)
+
+        assert all(pages[f"{base}/page/{i}"][0] for i in range(3))
+        assert all(pages[f"{base}/private/{i}"][0] is None for i in range(2))
+        times = page_times(handler)
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        print(f"⏱️  Gaps between requests with Crawl-delay 0.5: {[round(gap, 2) for gap in gaps]}")
+        assert len(times) == 3
+        assert min(gaps) >= 0.95
+
+        # robots.txt is parsed once per origin and reused by later crawls.
+        run_crawl([f"{base}/page/9"], host_rate=100)
+        assert sum(1 for path, _ in handler.requests if path == "/robots.txt") == 1
+    finally:
+        server.shutdown()
+        robots_cache._rules.clear()
+
+def test_disallowed_links_do_not_end_the_crawl_early():
+    links = [f"/private/{i}" for i in range(2)] + [f"/page/{i}" for i in range(8)]
+    server, handler, base = start_host(robots="User-agent: *\nDisallow: /private\n", links=links)
+    try:
+        frontier = Frontier([f"{base}/"], max_depth=1, max_pages=20)
+        pages = run_crawl([], frontier=frontier, max_concurrency=1, host_rate=0)
+
+        # The disallowed URLs free their worker slot like any other page; the rest of the frontier still runs.
+        assert sorted(pages) == sorted([f"{base}/"] + [f"{base}{link}" for link in links])
+        assert all(pages[f"{base}/page/{i}"][0] for i in range(8))
+        assert frontier.pop() is None
+    finally:
+        server.shutdown()
+        robots_cache._rules.clear()
+
+def test_throttled_host_backs_off_and_retries():
+    server, handler, base = start_host(throttle_first=3, retry_after="1")
+    try:
+        urls = [f"{base}/page/{i}" for i in range(6)]
+        pages = run_crawl(urls, max_concurrency=3, per_host_limit=3, host_rate=100)
+
+        assert all(html for html, _ in pages.values())
+        statuses = page_times(handler)
+        print(f"🚦 {len(statuses)} requests for {len(urls)} pages after 3 throttled responses")
+        assert len(statuses) == len(urls) + 3
+        # Nothing is sent to the host until its Retry-After has passed.
+        first_retry = statuses[3]
+        assert first_retry - statuses[2] >= 0.9
+    finally:
+        server.shutdown()
+        robots_cache._rules.clear()
+
+def test_hosts_are_interleaved_fairly():
+    hosts = [start_host() for _ in range(3)]
+    try:
+        (_, busy, busy_base), (_, small_a, base_a), (_, small_b, base_b) = hosts
+        busy_urls = [f"{busy_base}/page/{i}" for i in range(30)]
+        small_urls = [f"{base}/page/{i}" for base in (base_a, base_b) for i in range(5)]
+        # The busy host's links come first, as a frontier seeded from its start page would queue them.
+        started = time.monotonic()
+        pages = run_crawl(busy_urls + small_urls, max_concurrency=6, per_host_limit=2, host_rate=10)
+        elapsed = time.monotonic() - started
+
+        small_done = max(pages[url][1] for url in small_urls)
+        busy_done = max(pages[url][1] for url in busy_urls)
+        print(f"⚖️  Small hosts done after {small_done:.2f}s, busy host after {busy_done:.2f}s, total {elapsed:.2f}s")
+        assert all(html for html, _ in pages.values())
+        # Small hosts are not queued behind the busy one...
+        assert small_done < 1.5
+        # ...and the busy host still runs at its full rate, so the crawl takes
+        # about as long as that host alone rather than the sum of all hosts.
+        assert elapsed < 30 / 10 + 1
+        for handler in (busy, small_a, small_b):
+            times = page_times(handler)
+            window = times[-1] - times[0]
+            assert len(times) <= SCRAPER_HOST_BURST + 10 * window + 1
+    finally:
+        for server, _, _ in hosts:
+            server.shutdown()
+        robots_cache._rules.clear()
+
+def test_fresh_cached_pages_still_follow_robots():
+    server, handler, base = start_host(robots="User-agent: *\nDisallow: /private\n")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            http_cache = HttpCache(tmp)
+            urls = [f"{base}/open", f"{base}/private/a"]
+            for url in urls:
+                PageCache(http_cache=http_cache).fetch(url)
+            # Pages fresh in the disk cache skip the host queue, but not robots.txt:
+            # first while its rules are loading, then once they are cached.
+            for _ in range(2):
+                finished = run_crawl(urls, cache=PageCache(http_cache=http_cache), host_rate=0)
+                assert finished[f"{base}/open"][0] is not None
+                assert finished[f"{base}/private/a"][0] is None
+        assert [path for path, _ in handler.requests] == ["/open", "/private/a", "/robots.txt"]
+    finally:
+        server.shutdown()
+        robots_cache._rules.clear()
+
+def test_robots_cache_expires():
+    server, handler, base = start_host(robots="User-agent: *\nDisallow: /\n")
+    try:
+        cache = RobotsCache(ttl=0)
+
+        async def load_twice():
+            async with httpx.AsyncClient() as client:
+                first = await cache.load(client, base)
+                await cache.load(client, base)
+                return first
+
+        rules = asyncio.run(load_twice())
+        assert not cache.allowed(rules, f"{base}/anything")
+        assert cache.fetches == 2
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_parse_retry_after()
+    test_robots_rules_and_crawl_delay()
+    test_disallowed_links_do_not_end_the_crawl_early()
+    test_throttled_host_backs_off_and_retries()
+    test_hosts_are_interleaved_fairly()
+    test_fresh_cached_pages_still_follow_robots()
+    test_robots_cache_expires()
@@ -0,0 +1,58 @@
+from app.scraper.render_detection import RenderDecider, RenderStats, classify_html
+
+ARTICLE = "<p>" + "Acme builds industrial pumps and valves for water utilities. " * 40 + "</p>"
+
+STATIC_PAGE = f"""<html><head><title>Acme Pumps</title></head>
+<body><h1>Acme Pumps</h1>{ARTICLE}<a href="mailto:sales@acme-pumps.com">Email</a></body></html>"""
+
+REACT_SHELL = """<html><head><title>Acme</title>
+<script src="/static/js/main.4f7a9c21.js"></script></head>
+<body><noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div></body></html>"""
+
+NEXT_SHELL = """<html><head><script src="/_next/static/chunks/webpack-1a2b3c.js"></script></head>
+<body><div id="__next"></div></body></html>"""
+
+CHALLENGE_PAGE = """<html><head><title>Just a moment...</title></head>
+<body><div id="cf-browser-verification">Checking your browser</div></body></html>"""
+
+RENDERED_PAGE = """<html><body><div id="root"><h1>Acme Pumps</h1>
+<a href="mailto:sales@acme-pumps.com">Email</a></div></body></html>"""
+
+def test_classifier_separates_shells_from_static_pages():
+    assert classify_html(STATIC_PAGE)[0] < 3
+    assert classify_html(REACT_SHELL)[0] >= 3
+    assert classify_html(NEXT_SHELL)[0] >= 3
+    assert "js-challenge" in classify_html(CHALLENGE_PAGE, 503)[1]
+    assert "js-challenge" not in classify_html(CHALLENGE_PAGE, 200)[1]
+
+def test_decider_learns_per_domain():
+    decider = RenderDecider(learn_samples=2)
+    task = RenderStats()
+
+    assert decider.should_render("https://spa.example/a", REACT_SHELL, task_stats=task)
+    assert decider.record_render("https://spa.example/a", REACT_SHELL, RENDERED_PAGE, task)
+    assert decider.record_render("https://spa.example/b", REACT_SHELL, RENDERED_PAGE)
+    assert decider.remembered("https://spa.example/c") is True
+
+    # Rendering produced the same extraction, so the domain stops paying for it.
+    assert decider.should_render("https://static.example/a", REACT_SHELL)
+    assert decider.record_render("https://static.example/a", REACT_SHELL, REACT_SHELL) is False
+    assert decider.record_render("https://static.example/b", REACT_SHELL, REACT_SHELL) is False
+    assert not decider.should_render("https://static.example/c", REACT_SHELL)
+
+    assert decider.should_render("https://other.example/", None)
+
+    stats = decider.stats()
+    print(f"📊 Render detection stats: {stats}")
+    assert stats["memory_hits"] == 1
+    assert stats["memory_misses"] == 2
+    assert stats["useful_renders"] == 2
+    # A task's own counters only see the calls made for it.
+    assert task.snapshot() == {
+        "memory_hits": 0, "memory_misses": 1, "memory_hit_rate": 0.0, "render_decisions": 1, "static_decisions": 0,
+        "renders": 1, "sampled_renders": 1, "useful_renders": 1,
+    }
+
+if __name__ == "__main__":
+    test_classifier_separates_shells_from_static_pages()
+    test_decider_learns_per_domain()
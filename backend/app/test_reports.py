@@ -0,0 +1,281 @@
+import hashlib
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+import zipfile
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import delete, update
+
+from app.conftest import make_session_factory
+from app.downloads import parse_range
+from app.events import read_events
+from app.models import ReportFile, ScrapeTask
+from app.reports import (
+    ReportArtifact,
+    ReportQueue,
+    evict_reports,
+    generate_pdf_report,
+    report_files,
+    sanitize_text_for_pdf,
+)
+from app.result_store import ResultWriter
+from app.task_queue import TaskQueue
+from app.test_db_load import BACKEND_DIR, free_port
+from app.worker import Worker
+
+def old_sanitize_text_for_pdf(text):
+    """The per-call version reports used before, kept to check the new one against."""
+    if not text:
+        return ""
+    text = str(text)
+    unicode_replacements = {
+        '\u2013': '-', '\u2014': '--', '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+        '\u2026': '...', '\u00a0': ' ', '\u00ae': '(R)', '\u00a9': '(C)', '\u2122': '(TM)',
+    }
+    for unicode_char, ascii_replacement in unicode_replacements.items():
+        text = text.replace(unicode_char, ascii_replacement)
+    emoji_pattern = re.compile(
+        "[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0\U000024C2-\U0001F251\U0001F900-\U0001F9FF\U0001FA70-\U0001FAFF]+",
+        flags=re.UNICODE,
+    )
+    text = emoji_pattern.sub('', text)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = ' '.join(text.split())
+    return re.sub(r'[^\x20-\x7E]', '', text)
+
+SAMPLES = [
+    "Acme Corp – “Building the future”™",
+    "Café Müller & Söhne © 2024…",
+    "We ❤️ clients \U0001F680\U0001F680 fast!",
+    "  tabs\tand\nnew\r\nlines \x07bell\x00 ",
+    "https://acme.example/contact?ref=home",
+    "日本語のテキスト Tokyo",
+    "",
+    None,
+    12345,
+]
+
+def make_db(db_path, records=0, **task):
+    session_factory = make_session_factory(db_path)
+    db = session_factory()
+    db.add(ScrapeTask(url="https://acme.example", **task))
+    db.commit()
+    db.close()
+    if records:
+        writer = ResultWriter(1, session_factory=session_factory)
+        for i in range(records):
+            writer.add(company_record(i))
+        writer.flush()
+    return session_factory
+
+def company_record(i):
+    return {
+        "url": f"https://acme.example/companies/{i}",
+        "company": f"Acme – Company {i}",
+        "contacts": {"emails": [f"info{i}@acme.example", f"sales{i}@acme.example"], "phones": ["+15551234567"]},
+        "tagline": "Quality “widgets” since 1990 \U0001F680",
+        "description": "We build widgets. " * 10,
+        "services": ["Design", "Manufacturing", "Support"],
+        "social_media": {"linkedin": "https://linkedin.com/company/acme", "twitter": None},
+        "industry": "Manufacturing",
+    }
+
+def test_sanitize_matches_previous_output():
+    for text in SAMPLES:
+        assert sanitize_text_for_pdf(text) == old_sanitize_text_for_pdf(text), text
+
+@pytest.mark.benchmark
+def test_benchmark_sanitize():
+    texts = [sample for sample in SAMPLES if sample] * 2000 + [f"Plain ascii company name {i}" for i in range(20000)]
+    started = time.perf_counter()
+    for text in texts:
+        old_sanitize_text_for_pdf(text)
+    old_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    for text in texts:
+        sanitize_text_for_pdf(text)
+    elapsed = time.perf_counter() - started
+    print(f"🧹 Sanitized {len(texts)} strings in {elapsed:.2f}s, {old_elapsed:.2f}s before")
+    assert elapsed < old_elapsed
+
+def test_reports_are_split_into_parts_and_capped():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "reports.db"), records=250, status="completed")
+        reports_dir = os.path.join(tmp, "reports")
+
+        tracemalloc.start()
+        artifacts = generate_pdf_report(1, session_factory, records_per_part=100, reports_dir=reports_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"📄 250 records in {len(artifacts) - 1} parts, peak memory {peak / 1024 / 1024:.1f} MiB")
+        assert [a.path.rsplit("_", 1)[1] for a in artifacts[:3]] == ["part1.pdf", "part2.pdf", "part3.pdf"]
+        assert [a.part for a in artifacts] == [1, 2, 3, 0] and artifacts[3].path.endswith(".zip")
+        for artifact in artifacts:
+            with open(artifact.path, "rb") as file:
+                data = file.read()
+            assert len(data) == artifact.size and hashlib.sha256(data).hexdigest() == artifact.checksum
+            assert data.startswith(b"%PDF-" if artifact.part else b"PK")
+        assert not [name for name in os.listdir(reports_dir) if name.endswith(".tmp")]
+
+        capped = generate_pdf_report(1, session_factory, records_per_part=100, max_records=80, reports_dir=reports_dir)
+        assert len(capped) == 1 and "_part" not in capped[0].path
+        assert capped[0].size < artifacts[0].size
+
+def test_worker_generates_reports_after_task_completes():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "stage.db"), records=30, status="completed", report_status="pending")
+        reports = ReportQueue(session_factory)
+        assert reports.pending_count() == 1
+
+        # Only one worker can claim a report; a claim older than the timeout is taken over.
+        assert reports.claim() == 1
+        assert reports.claim() is None
+        assert ReportQueue(session_factory, timeout=0).claim() == 1
+
+        db = session_factory()
+        db.get(ScrapeTask, 1).report_status = "pending"
+        db.commit()
+        db.close()
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            Worker(TaskQueue(session_factory), poll_interval=0.02, heartbeat_interval=0.2).run(stop_when_idle=True)
+        finally:
+            os.chdir(cwd)
+
+        db = session_factory()
+        task = db.get(ScrapeTask, 1)
+        assert task.status == "completed" and task.report_status == "ready"
+        db.close()
+        files = report_files(1, session_factory)
+        assert [file.path for file in files] == [task.pdf_path] and os.path.isfile(os.path.join(tmp, task.pdf_path))
+        assert files[0].size == os.path.getsize(os.path.join(tmp, task.pdf_path))
+        assert [(e["type"], e["data"]) for e in read_events([1], session_factory=session_factory)] == [
+            ("report", {"ready": True, "parts": 1})
+        ]
+        assert reports.pending_count() == 0
+
+def test_download_reports_pending_then_serves_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "download.db")
+        session_factory = make_db(db_path, records=12, status="completed", report_status="pending")
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), SCRAPER_DATABASE_URL=f"sqlite:///{db_path}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+
+            pending = httpx.get(f"{base_url}/download-pdf/1")
+            assert pending.status_code == 202 and pending.json()["status"] == "pending"
+            assert pending.headers["retry-after"]
+
+            reports = ReportQueue(session_factory)
+            assert reports.claim() == 1
+            artifacts = generate_pdf_report(1, session_factory, records_per_part=5, reports_dir=os.path.join(tmp, "reports"))
+            reports.complete(1, artifacts)
+            parts = [a for a in artifacts if a.part]
+
+            archive = httpx.get(f"{base_url}/download-pdf/1")
+            assert archive.status_code == 200 and archive.headers["content-type"] == "application/zip"
+            with zipfile.ZipFile(io.BytesIO(archive.content)) as files:
+                assert sorted(files.namelist()) == sorted(os.path.basename(a.path) for a in parts)
+            second = httpx.get(f"{base_url}/download-pdf/1", params={"part": 2})
+            assert second.status_code == 200 and second.content.startswith(b"%PDF-")
+            assert httpx.get(f"{base_url}/download-pdf/1", params={"part": 4}).status_code == 404
+            print(f"📦 Report of {len(parts)} parts served as a zip and part by part")
+
+            # A dropped download resumes from where it stopped, as long as the file is unchanged.
+            etag = second.headers["etag"]
+            assert etag == f'"{parts[1].checksum}"' and second.headers["accept-ranges"] == "bytes"
+            rest = httpx.get(f"{base_url}/download-pdf/1", params={"part": 2}, headers={"Range": "bytes=1000-", "If-Range": etag})
+            assert rest.status_code == 206 and rest.content == second.content[1000:]
+            assert rest.headers["content-range"] == f"bytes 1000-{parts[1].size - 1}/{parts[1].size}"
+            stale = httpx.get(f"{base_url}/download-pdf/1", params={"part": 2}, headers={"Range": "bytes=1000-", "If-Range": '"old"'})
+            assert stale.status_code == 200 and stale.content == second.content
+            unchanged = httpx.get(f"{base_url}/download-pdf/1", params={"part": 2}, headers={"If-None-Match": etag})
+            assert unchanged.status_code == 304
+
+            # Evicted reports are queued again on download.
+            assert evict_reports(session_factory, max_bytes=1) == [1]
+            assert not os.listdir(os.path.join(tmp, "reports"))
+            assert httpx.get(f"{base_url}/download-pdf/1").status_code == 202
+            assert reports.pending_count() == 1
+
+            # A part missing from the tracked files is a 404, not a server error.
+            assert reports.claim() == 1
+            reports.complete(1, generate_pdf_report(1, session_factory, records_per_part=5, reports_dir=os.path.join(tmp, "reports")))
+            db = session_factory()
+            db.execute(delete(ReportFile.__table__).where(ReportFile.task_id == 1, ReportFile.part == 2))
+            db.commit()
+            db.close()
+            assert httpx.get(f"{base_url}/download-pdf/1", params={"part": 2}).status_code == 404
+            assert httpx.get(f"{base_url}/download-pdf/1", params={"part": 3}).status_code == 200
+        finally:
+            server.terminate()
+            server.wait()
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=100-", 100) == (100, 100)
+    # Several ranges are answered with the whole file.
+    assert parse_range("bytes=0-1,5-9", 100) is None
+
+def test_eviction_keeps_reports_within_size_and_age():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "evict.db"), records=5, status="completed")
+        db = session_factory()
+        db.add_all(ScrapeTask(url=f"https://acme{i}.example", status="completed") for i in range(4))
+        db.commit()
+        db.close()
+        reports = ReportQueue(session_factory)
+        for task_id in range(1, 6):
+            path = os.path.join(tmp, f"scraping_report_{task_id}.pdf")
+            with open(path, "wb") as file:
+                file.write(b"%PDF-" + b"x" * 995)
+            reports.complete(task_id, [ReportArtifact(1, path, 1000, "c")])
+
+        db = session_factory()
+        db.execute(update(ReportFile.__table__).where(ReportFile.task_id == 1).values(created_at=datetime.utcnow() - timedelta(days=40)))
+        db.commit()
+        db.close()
+        assert evict_reports(session_factory, max_bytes=0, max_age_days=30) == [1]
+        # Oldest first until the rest fit; the report just written is never evicted.
+        assert evict_reports(session_factory, max_bytes=2500, max_age_days=0, keep=[2]) == [3, 4]
+        assert sorted(name for name in os.listdir(tmp) if name.endswith(".pdf")) == ["scraping_report_2.pdf", "scraping_report_5.pdf"]
+        db = session_factory()
+        assert {task.id: task.report_status for task in db.query(ScrapeTask)} == {
+            1: "evicted", 2: "ready", 3: "evicted", 4: "evicted", 5: "ready"
+        }
+        db.close()
+
+if __name__ == "__main__":
+    test_sanitize_matches_previous_output()
+    test_benchmark_sanitize()
+    test_reports_are_split_into_parts_and_capped()
+    test_worker_generates_reports_after_task_completes()
+    test_download_reports_pending_then_serves_parts()
+    test_parse_range()
+    test_eviction_keeps_reports_within_size_and_age()
@@ -0,0 +1,131 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+from app.conftest import make_session_factory
+from app.database import init_db
+from app.models import ScrapeResult, ScrapeTask
+from app.result_store import ResultWriter, count_records, iter_records, read_records
+from app.task_queue import TaskAbandoned
+
+def recording_session_factory(db_path):
+    session_factory = make_session_factory(db_path)
+    statements = []
+    event.listen(session_factory.kw["bind"], "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return session_factory, statements
+
+def add_task(session_factory, url="https://example.com"):
+    db = session_factory()
+    task = ScrapeTask(url=url, status="running")
+    db.add(task)
+    db.commit()
+    task_id = task.id
+    db.close()
+    return task_id
+
+def record(index):
+    return {"url": f"https://example.com/{index}", "page_number": 1, "company": f"Company {index}"}
+
+def test_records_are_written_in_batches_and_survive_a_crash():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory, statements = recording_session_factory(os.path.join(tmp, "results.db"))
+        task_id = add_task(session_factory)
+        writer = ResultWriter(task_id, batch_size=10, session_factory=session_factory)
+        writer.reset()
+        statements.clear()
+
+        for index in range(25):
+            if writer.add(record(index)):
+                writer.flush()
+        # The crawl "crashes" here: the last 5 records were never flushed.
+        inserts = [sql for sql in statements if sql.startswith("INSERT INTO scrape_records")]
+        assert len(inserts) == 2
+        assert count_records(task_id, session_factory) == 20
+
+        writer.flush()
+        assert count_records(task_id, session_factory) == 25
+        ResultWriter(task_id, session_factory=session_factory).reset()
+        assert count_records(task_id, session_factory) == 0
+
+def test_records_stop_once_the_task_moves_to_another_worker():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_session_factory(os.path.join(tmp, "results.db"))
+        task_id = add_task(session_factory)
+
+        def claim(worker_id):
+            db = session_factory()
+            db.get(ScrapeTask, task_id).worker_id = worker_id
+            db.commit()
+            db.close()
+
+        claim("worker-a")
+        writer = ResultWriter(task_id, session_factory=session_factory, check_owner=True, worker_id="worker-a")
+        for index in range(3):
+            writer.add(record(index))
+        assert writer.flush() == 3
+
+        # The stall check handed the task to another worker; the old one's next batch is refused.
+        claim("worker-b")
+        writer.add(record(3))
+        with pytest.raises(TaskAbandoned):
+            writer.flush()
+        assert count_records(task_id, session_factory) == 3
+        db = session_factory()
+        assert db.get(ScrapeTask, task_id).record_count == 3
+        db.close()
+
+def test_cursor_pages_cover_every_record_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_session_factory(os.path.join(tmp, "results.db"))
+        task_id = add_task(session_factory)
+        other_id = add_task(session_factory, "https://other.example.com")
+        writer = ResultWriter(task_id, batch_size=7, session_factory=session_factory)
+        other = ResultWriter(other_id, session_factory=session_factory)
+        for index in range(45):
+            writer.add(record(index))
+            other.add(record(1000 + index))
+            if index % 7 == 6:
+                writer.flush()
+                other.flush()
+        writer.flush()
+        other.flush()
+
+        pages, cursor = [], None
+        while True:
+            records, cursor = read_records(task_id, cursor, 10, session_factory)
+            pages.append(records)
+            if cursor is None:
+                break
+        assert [len(page) for page in pages] == [10, 10, 10, 10, 5]
+        assert [r["company"] for page in pages for r in page] == [f"Company {i}" for i in range(45)]
+        assert [r["company"] for r in iter_records(task_id, 4, session_factory)] == [f"Company {i}" for i in range(45)]
+
+def test_tasks_saved_as_one_blob_are_migrated_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory, statements = recording_session_factory(os.path.join(tmp, "results.db"))
+        task_id = add_task(session_factory)
+        db = session_factory()
+        db.add(ScrapeResult(task_id=task_id, data=[record(index) for index in range(12)]))
+        db.commit()
+        db.close()
+        init_db(session_factory.kw["bind"])
+        db = session_factory()
+        assert db.query(ScrapeResult).count() == 0
+        db.close()
+
+        # Pages come from scrape_records; the blob is not decoded again for each one.
+        statements.clear()
+        first, cursor = read_records(task_id, None, 5, session_factory)
+        assert not any("scrape_results" in sql for sql in statements)
+        second, cursor = read_records(task_id, cursor, 5, session_factory)
+        third, cursor = read_records(task_id, cursor, 5, session_factory)
+        assert [len(first), len(second), len(third), cursor] == [5, 5, 2, None]
+        assert count_records(task_id, session_factory) == 12
+
+if __name__ == "__main__":
+    test_records_are_written_in_batches_and_survive_a_crash()
+    test_records_stop_once_the_task_moves_to_another_worker()
+    test_cursor_pages_cover_every_record_once()
+    test_tasks_saved_as_one_blob_are_migrated_once()
@@ -1,5 +1,6 @@
+import json
+
 import requests
-import time
 
 BASE_URL = "http://localhost:8000"
 
@@ -14,22 +15,28 @@ def test_scraper():
         print(f"❌ Scrape failed: {response.status_code}")
         return
     
-    for i in range(10):
-        time.sleep(2)
-        result = requests.get(f"{BASE_URL}/result/{task_id}")
-        if result.status_code == 200:
-            data = result.json()
-            print(f"✅ Got results: {data}")
-            break
-        elif result.status_code == 404:
-            print(f"⏳ Waiting for results... ({i+1}/10)")
-        else:
-            print(f"❌ Error getting results: {result.status_code}")
-            break
+    # Follow the task's event stream instead of polling for results.
+    status = None
+    with requests.get(f"{BASE_URL}/tasks/{task_id}/events", stream=True, timeout=120) as events:
+        event_type = None
+        for line in events.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: ") and event_type == "status":
+                status = json.loads(line[len("data: "):])["status"]
+                print(f"⏳ Task status: {status}")
+                if status in ("completed", "failed"):
+                    break
+
+    result = requests.get(f"{BASE_URL}/result/{task_id}")
+    if status == "completed" and result.status_code == 200:
+        print(f"✅ Got results: {result.json()}")
+    else:
+        print(f"❌ Task ended as {status}, results: {result.status_code}")
     
     tasks = requests.get(f"{BASE_URL}/tasks")
     if tasks.status_code == 200:
-        print(f"✅ Tasks endpoint works: {len(tasks.json())} tasks")
+        print(f"✅ Tasks endpoint works: {len(tasks.json()['tasks'])} tasks")
     else:
         print(f"❌ Tasks endpoint failed: {tasks.status_code}")
 
@@ -0,0 +1,241 @@
+import asyncio
+import gzip
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+
+from app.conftest import start_local_server
+from app.scraper.crawler import crawl
+from app.scraper.engine import _seed_from_sitemaps
+from app.scraper.fetcher import new_async_client
+from app.scraper.frontier import Frontier
+from app.scraper.http_cache import HttpCache
+from app.scraper.page_cache import PageCache
+from app.scraper.politeness import RobotsCache
+from app.scraper.sitemaps import SitemapParser, parse_lastmod, sitemap_urls
+
+NAMESPACE = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"'
+
+def urlset(urls):
+    entries = "".join(
+        f"<url><loc>{url}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}"
+        f"<image:image><image:loc>{url}/photo.jpg</image:loc></image:image></url>"
+        for url, lastmod in urls
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NAMESPACE}>{entries}</urlset>'.encode()
+
+def sitemap_index(children):
+    entries = "".join(f"<sitemap><loc>{url}</loc><lastmod>{lastmod}</lastmod></sitemap>" for url, lastmod in children)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NAMESPACE}>{entries}</sitemapindex>'.encode()
+
+class SitemapSiteHandler(BaseHTTPRequestHandler):
+    """A site whose pages are only reachable through its sitemaps; the home page has no links."""
+    protocol_version = "HTTP/1.1"
+    hits = Counter()
+    lock = threading.Lock()
+    robots = ""
+    files = {}
+
+    def do_GET(self):
+        with type(self).lock:
+            type(self).hits[self.path] += 1
+        base = f"http://{self.headers['Host']}"
+        content_type = "text/html"
+        if self.path == "/robots.txt":
+            body, status = type(self).robots.format(base=base).encode(), 200
+        elif self.path in type(self).files:
+            body, status = type(self).files[self.path](base), 200
+            content_type = "application/gzip" if self.path.endswith(".gz") else "application/xml"
+        elif self.path.startswith("/sitemap-busy"):
+            body, status = b"", 429
+        elif self.path.startswith("/sitemap"):
+            body, status = b"", 404
+        else:
+            body, status = f"<html><body><h1>Acme {self.path}</h1></body></html>".encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_site(robots, files):
+    SitemapSiteHandler.hits = Counter()
+    SitemapSiteHandler.robots = robots
+    SitemapSiteHandler.files = files
+    return start_local_server(SitemapSiteHandler)
+
+def read_sitemaps(base, **kwargs):
+    async def run():
+        async with new_async_client() as client:
+            return await sitemap_urls(client, base + "/", robots=RobotsCache(), **kwargs)
+
+    return asyncio.run(run())
+
+def test_parse_lastmod():
+    assert parse_lastmod("2024-05-01T10:00:00Z") == parse_lastmod("2024-05-01T12:00:00+02:00") == 1714557600
+    assert parse_lastmod("2024-05-01") == 1714521600
+    assert parse_lastmod("2024") == parse_lastmod("2024-01-01")
+    assert parse_lastmod("2024-05-01T10:00:00.500+00:00") == 1714557600.5
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+def parse_gzipped(count):
+    data = gzip.compress(urlset((f"https://acme.example/products/item-{i}", "2024-05-01") for i in range(count)))
+    tracemalloc.start()
+    parser = SitemapParser()
+    kinds = Counter()
+    last = None
+    for start in range(0, len(data), 16384):
+        for kind, entry in parser.feed(data[start:start + 16384]):
+            kinds[kind] += 1
+            last = entry
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"🗺️  {kinds['url']} URLs from {len(data)} gzipped / {parser.size} bytes, peak memory {peak / 1024:.0f} KiB")
+    assert parser.error is None
+    return kinds, last, peak
+
+def test_parser_streams_large_gzipped_sitemap():
+    small_kinds, _, small_peak = parse_gzipped(5000)
+    kinds, last, peak = parse_gzipped(50000)
+    # Image extension <image:loc> entries are not pages.
+    assert small_kinds == {"url": 5000} and kinds == {"url": 50000}
+    assert last.url == "https://acme.example/products/item-49999" and last.lastmod == 1714521600
+    # Ten times the URLs, about the same memory.
+    assert peak < small_peak * 1.5
+
+def test_parser_stops_at_size_limit():
+    bomb = gzip.compress(b"<urlset>" + b" " * 10_000_000)
+    parser = SitemapParser(max_bytes=1_000_000)
+    assert parser.feed(bomb) == []
+    assert parser.done and "larger than" in parser.error
+
+    broken = SitemapParser()
+    entries = broken.feed(urlset([("https://acme.example/a", None)])[:-9] + b"<oops></urlset>")
+    assert [entry.url for _, entry in entries] == ["https://acme.example/a"]
+    assert broken.error.startswith("invalid XML")
+
+def test_robots_sitemaps_and_indexes():
+    files = {
+        "/sitemap_index.xml": lambda base: sitemap_index([
+            (f"{base}/sitemap-old.xml", "2020-01-01"), (f"{base}/sitemap-new.xml.gz", "2024-06-01"),
+        ]),
+        "/sitemap-new.xml.gz": lambda base: gzip.compress(urlset([(f"{base}/contact", "2024-06-01"), (f"{base}/about", None)])),
+        "/sitemap-old.xml": lambda base: urlset([(f"{base}/blog/{i}", "2020-01-01") for i in range(30)]),
+    }
+    server, base = start_site("User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap_index.xml\n", files)
+    try:
+        entries = read_sitemaps(base)
+        urls = [entry.url for entry in entries]
+        # The most recently modified child sitemap is read first.
+        assert urls[:2] == [f"{base}/contact", f"{base}/about"]
+        assert len(urls) == 32
+        assert "/sitemap.xml" not in SitemapSiteHandler.hits
+
+        capped = read_sitemaps(base, max_urls=5)
+        assert len(capped) == 5
+        single_file = read_sitemaps(base, max_files=2)
+        assert len(single_file) == 2
+    finally:
+        server.shutdown()
+
+def test_sitemap_files_are_paced_and_capped():
+    files = {"/sitemap_index.xml": lambda base: sitemap_index([(f"{base}/sitemap-{n}.xml", "2024-01-01") for n in range(8)])}
+    files.update({
+        f"/sitemap-{n}.xml": (lambda base, n=n: urlset([(f"{base}/page/{n}-{i}", None) for i in range(10)])) for n in range(8)
+    })
+    server, base = start_site("Sitemap: {base}/sitemap_index.xml\n", files)
+    try:
+        started = time.perf_counter()
+        assert len(read_sitemaps(base, rate=0)) == 80
+        unpaced = time.perf_counter() - started
+        started = time.perf_counter()
+        assert len(read_sitemaps(base, rate=4)) == 80
+        paced = time.perf_counter() - started
+        print(f"🐢 9 sitemap files in {unpaced:.2f}s unpaced, {paced:.2f}s at 4 requests/s")
+        # A burst of 5, then one file per 0.25s.
+        assert paced > unpaced + 0.5
+
+        # The crawl cannot fetch more than its page budget, so no more URLs are read.
+        frontier = Frontier([base + "/"], max_pages=15)
+        assert asyncio.run(_seed_from_sitemaps(frontier, base + "/", PageCache(), 0)) == 15
+
+        SitemapSiteHandler.files["/sitemap_index.xml"] = lambda base: sitemap_index(
+            [(f"{base}/sitemap-0.xml", "2024-01-02"), (f"{base}/sitemap-busy.xml", "2024-01-01"), (f"{base}/sitemap-1.xml", "2023-01-01")]
+        )
+        # A throttled file ends the reading instead of pressing on to the next.
+        assert len(read_sitemaps(base, rate=0)) == 10
+        assert SitemapSiteHandler.hits["/sitemap-1.xml"] == 3
+    finally:
+        server.shutdown()
+
+def test_sitemap_xml_fallback_seeds_crawl():
+    files = {
+        "/sitemap.xml": lambda base: urlset(
+            [(f"{base}/news/{i}", f"2024-01-{i + 1:02d}") for i in range(20)]
+            + [(f"{base}/contact-us", None), (f"{base}/company/about", None), ("https://other.example/page", None)]
+        ),
+    }
+    server, base = start_site("User-agent: *\nAllow: /\n", files)
+    try:
+        entries = read_sitemaps(base)
+        assert len(entries) == 23
+
+        frontier = Frontier([base + "/"], max_depth=2, max_pages=6)
+        assert frontier.add_sitemap(entries) == 22
+
+        async def consume():
+            return [url async for url, _ in crawl(frontier=frontier, max_concurrency=1, host_rate=0)]
+
+        paths = [url[len(base):] for url in asyncio.run(consume())]
+        print(f"🧭 Crawled from the sitemap: {paths}")
+        assert paths[:3] == ["/", "/contact-us", "/company/about"]
+        # Equal scores go newest first.
+        assert paths[3:] == ["/news/19", "/news/18", "/news/17"]
+        assert frontier.stats()["from_sitemap"] == 22
+    finally:
+        server.shutdown()
+
+def test_lastmod_drives_incremental_recrawl():
+    server, base = start_site("", {})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, ttl=0)
+            PageCache(http_cache=cache).fetch(f"{base}/services")
+            stored_at = time.time()
+
+            unchanged = PageCache(http_cache=cache)
+            unchanged.note_modified([(f"{base}/services", stored_at - 86400)])
+            assert unchanged.fresh_urls([f"{base}/services"]) == {f"{base}/services"}
+            unchanged.fetch(f"{base}/services")
+            assert unchanged.summary()["http_cache"]["hits"] == 1
+
+            changed = PageCache(http_cache=cache)
+            changed.note_modified([(f"{base}/services", stored_at + 60)])
+            assert not changed.fresh_urls([f"{base}/services"])
+            changed.fetch(f"{base}/services")
+            assert changed.summary()["http_cache"]["misses"] == 1
+            assert SitemapSiteHandler.hits["/services"] == 2
+
+            # A lastmod that never changes does not keep a copy fresh forever.
+            aged = PageCache(http_cache=HttpCache(tmp, ttl=0, lastmod_max_age=0))
+            aged.note_modified([(f"{base}/services", stored_at - 86400)])
+            assert not aged.fresh_urls([f"{base}/services"])
+            print("✅ Pages a sitemap marks unchanged are served from the disk cache")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_parse_lastmod()
+    test_parser_streams_large_gzipped_sitemap()
+    test_parser_stops_at_size_limit()
+    test_robots_sitemaps_and_indexes()
+    test_sitemap_files_are_paced_and_capped()
+    test_sitemap_xml_fallback_seeds_crawl()
+    test_lastmod_drives_incremental_recrawl()
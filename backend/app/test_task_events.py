@@ -0,0 +1,215 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import update
+
+from app.conftest import make_session_factory
+from app.events import EventHub, ProgressEvents, prune_events, publish, publish_events, read_events, stream_task_events
+from app.models import ScrapeTask, TaskEvent
+from app.test_db_load import BACKEND_DIR, free_port
+
+def make_db(db_path, statuses=("running",)):
+    session_factory = make_session_factory(db_path)
+    db = session_factory()
+    db.add_all(ScrapeTask(url="https://example.com", status=status) for status in statuses)
+    db.commit()
+    db.close()
+    return session_factory
+
+def run_worker(task_id, session_factory, pages=20, delay=0.02):
+    """Publishes what run_scraper would for a small crawl."""
+    publish(task_id, "discovered", {"urls": pages}, session_factory)
+    for page in range(pages):
+        time.sleep(delay)
+        publish(task_id, "page", {"url": f"https://example.com/{page}", "sent": time.time()}, session_factory)
+    publish(task_id, "status", {"status": "completed"}, session_factory)
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append(fields)
+    return events
+
+def test_many_subscribers_share_one_poller():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "events.db"), ["running", "running"])
+        hub = EventHub(poll_interval=0.05, session_factory=session_factory)
+        publish(1, "status", {"status": "running"}, session_factory)
+
+        async def subscriber(task_id):
+            return "".join([chunk async for chunk in stream_task_events(task_id, "running", hub=hub, keepalive=5)])
+
+        async def main():
+            streams = [asyncio.create_task(subscriber(1 + n % 2)) for n in range(500)]
+            while hub.subscriber_count < 500:
+                await asyncio.sleep(0.05)
+            workers = [threading.Thread(target=run_worker, args=(task_id, session_factory)) for task_id in (1, 2)]
+            for worker in workers:
+                worker.start()
+            outputs = await asyncio.gather(*streams)
+            for worker in workers:
+                worker.join()
+            return outputs
+
+        started = time.perf_counter()
+        outputs = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        for n, output in enumerate(outputs):
+            events = parse_sse(output)
+            assert [e["event"] for e in events][-22:] == ["discovered"] + ["page"] * 20 + ["status"]
+            assert (events[0]["event"] == "status") == (n % 2 == 0)
+        print(f"📡 500 subscribers on 2 tasks: {hub.polls} database polls in {elapsed:.2f}s")
+        assert hub.polls < 100
+        assert hub.subscriber_count == 0
+
+def test_finished_and_resumed_streams():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "events.db"), ["completed", "running"])
+        hub = EventHub(poll_interval=0.05, session_factory=session_factory)
+        run_worker(2, session_factory, pages=3, delay=0)
+
+        async def collect(task_id, status, after_id=0):
+            return parse_sse("".join([c async for c in stream_task_events(task_id, status, after_id, hub=hub)]))
+
+        # Task 1 finished before events existed: one synthetic final status.
+        assert asyncio.run(collect(1, "completed")) == [{"event": "status", "data": '{"status": "completed"}'}]
+        replay = asyncio.run(collect(2, "completed"))
+        assert [e["event"] for e in replay] == ["discovered", "page", "page", "page", "status"]
+        resumed = asyncio.run(collect(2, "completed", int(replay[2]["id"])))
+        assert [e["id"] for e in resumed] == [e["id"] for e in replay[3:]]
+
+def test_poller_survives_database_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "events.db"))
+        failures = []
+
+        def flaky_session_factory():
+            if failures:
+                failures.pop()
+                raise RuntimeError("database is locked")
+            return session_factory()
+
+        hub = EventHub(poll_interval=0.05, session_factory=flaky_session_factory)
+
+        async def failed_polls():
+            failures.extend([1, 1, 1])
+            while failures:
+                await asyncio.sleep(0.01)
+
+        async def main():
+            events = hub.subscribe(1)
+            publish(1, "status", {"status": "running"}, session_factory)
+            first = await asyncio.wait_for(events.__anext__(), 5)
+            await asyncio.wait_for(failed_polls(), 5)
+            publish(1, "page", {"url": "https://example.com/"}, session_factory)
+            second = await asyncio.wait_for(events.__anext__(), 5)
+            await events.aclose()
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert (first["type"], second["type"]) == ("status", "page")
+        assert hub.subscriber_count == 0
+
+def test_sse_endpoint_delivers_to_concurrent_clients():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "events.db")
+        session_factory = make_db(db_path)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), SCRAPER_DATABASE_URL=f"sqlite:///{db_path}",
+                   SCRAPER_EVENT_POLL_INTERVAL="0.05")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+
+            async def client(latencies):
+                async with httpx.AsyncClient(timeout=30) as http:
+                    async with http.stream("GET", f"{base_url}/tasks/1/events") as response:
+                        assert response.headers["content-type"].startswith("text/event-stream")
+                        body = ""
+                        async for chunk in response.aiter_text():
+                            received = time.time()
+                            body += chunk
+                            for event in parse_sse(chunk):
+                                if event.get("event") == "page":
+                                    latencies.append(received - float(event["data"].split('"sent": ')[1].rstrip("}")))
+                        return parse_sse(body)
+
+            async def main():
+                latencies = []
+                clients = [asyncio.create_task(client(latencies)) for _ in range(100)]
+                await asyncio.sleep(1.0)
+                worker = threading.Thread(target=run_worker, args=(1, session_factory))
+                worker.start()
+                results = await asyncio.gather(*clients)
+                worker.join()
+                return results, latencies
+
+            results, latencies = asyncio.run(main())
+        finally:
+            server.terminate()
+            server.wait()
+
+        assert all([e["event"] for e in events] == ["discovered"] + ["page"] * 20 + ["status"] for events in results)
+        latencies.sort()
+        print(f"📡 100 SSE clients: p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms from publish to client")
+
+def test_progress_events_are_batched_and_pruned():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = make_db(os.path.join(tmp, "events.db"), ["running", "running"])
+        writes = []
+
+        def write(task_id, events):
+            writes.append(len(events))
+            publish_events(task_id, events, session_factory)
+
+        progress = ProgressEvents(1, interval=60, max_events=10, write=write)
+        for page in range(25):
+            progress.add("discovered", {"urls": 100 + page})
+            if progress.add("page", {"url": f"https://example.com/{page}"}):
+                progress.flush()
+        progress.flush()
+        events = read_events([1], session_factory=session_factory)
+        # Three INSERTs instead of 50; each batch keeps only its latest count.
+        assert writes == [10, 10, 8]
+        assert sum(event["type"] == "page" for event in events) == 25
+        assert [event["data"]["urls"] for event in events if event["type"] == "discovered"] == [108, 117, 124]
+        assert not ProgressEvents(1, interval=60).add("page", {}) and ProgressEvents(1, interval=0).add("page", {})
+
+        publish(1, "status", {"status": "completed"}, session_factory)
+        publish(2, "page", {"url": "https://example.com/"}, session_factory)
+        assert prune_events(3600, session_factory) == 0
+        db = session_factory()
+        db.execute(update(TaskEvent.__table__).values(created_at=datetime.utcnow() - timedelta(hours=2)))
+        db.execute(update(ScrapeTask.__table__).where(ScrapeTask.id == 1).values(status="completed"))
+        db.commit()
+        db.close()
+        # Only the finished task loses its events; the running one keeps them however old.
+        assert prune_events(3600, session_factory) == len(events) + 1
+        assert read_events([1], session_factory=session_factory) == []
+        assert len(read_events([2], session_factory=session_factory)) == 1
+
+if __name__ == "__main__":
+    test_many_subscribers_share_one_poller()
+    test_finished_and_resumed_streams()
+    test_poller_survives_database_errors()
+    test_sse_endpoint_delivers_to_concurrent_clients()
+    test_progress_events_are_batched_and_pruned()
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.conftest import make_session_factory
+from app.models import ScrapeTask
+from app.scraper.engine import _settle
+from app.task_queue import TaskQueue
+from app.worker import Worker
+
+def make_queue(db_path, **kwargs):
+    return TaskQueue(make_session_factory(db_path), **kwargs)
+
+def completing_handler(queue, log_path, delay=0.05):
+    def handler(task_id, params):
+        time.sleep(delay)
+        with open(log_path, "a") as log:
+            log.write(f"{task_id}\n")
+        db = queue.session_factory()
+        try:
+            db.get(ScrapeTask, task_id).status = "completed"
+            db.commit()
+        finally:
+            db.close()
+    return handler
+
+def run_worker_process(db_path, log_path, concurrency):
+    queue = make_queue(db_path)
+    worker = Worker(
+        queue,
+        handler=completing_handler(queue, log_path),
+        concurrency=concurrency,
+        poll_interval=0.02,
+        heartbeat_interval=0.2,
+    )
+    worker.run(stop_when_idle=True)
+
+def test_workers_share_one_queue_without_double_claims():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "queue.db")
+        log_path = os.path.join(tmp, "runs.log")
+        queue = make_queue(db_path)
+        task_ids = [queue.enqueue(f"https://example{i}.com", {"url": f"https://example{i}.com"}).id for i in range(40)]
+
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=run_worker_process, args=(db_path, log_path, 2)) for _ in range(4)]
+        started = time.perf_counter()
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+            assert process.exitcode == 0
+        elapsed = time.perf_counter() - started
+
+        with open(log_path) as log:
+            runs = Counter(int(line) for line in log)
+        db = queue.session_factory()
+        tasks = db.query(ScrapeTask).all()
+        db.close()
+
+        assert sorted(runs) == task_ids
+        assert set(runs.values()) == {1}
+        assert all(task.status == "completed" and task.attempts == 1 for task in tasks)
+        owners = Counter(task.worker_id for task in tasks)
+        print(f"🏭 40 tasks across {len(owners)} workers in {elapsed:.2f}s: {sorted(owners.values())}")
+        assert len(owners) > 1
+
+def test_worker_respects_concurrency():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "queue.db"))
+        for i in range(12):
+            queue.enqueue(f"https://example{i}.com", {})
+        in_flight = 0
+        max_in_flight = 0
+        lock = threading.Lock()
+        complete = completing_handler(queue, os.path.join(tmp, "runs.log"))
+
+        def handler(task_id, params):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            try:
+                complete(task_id, params)
+            finally:
+                with lock:
+                    in_flight -= 1
+
+        Worker(queue, handler=handler, concurrency=3, poll_interval=0.01).run(stop_when_idle=True)
+        assert max_in_flight == 3
+        assert queue.stats()["tasks"] == {"completed": 12}
+
+def test_stalled_tasks_are_requeued_and_crashes_fail():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "queue.db"), stall_timeout=1, max_attempts=2)
+        stalled = queue.enqueue("https://stalled.example.com", {}).id
+        exhausted = queue.enqueue("https://exhausted.example.com", {}).id
+        crashing = queue.enqueue("https://crash.example.com", {}).id
+        db = queue.session_factory()
+        old = datetime.utcnow() - timedelta(minutes=5)
+        for task_id, attempts in ((stalled, 1), (exhausted, 2)):
+            task = db.get(ScrapeTask, task_id)
+            task.status, task.worker_id, task.heartbeat_at, task.attempts = "running", "gone", old, attempts
+        db.commit()
+        db.close()
+
+        assert queue.requeue_stalled() == {"requeued": 1, "failed": 1}
+
+        complete = completing_handler(queue, os.path.join(tmp, "runs.log"))
+
+        def handler(task_id, params):
+            if task_id == crashing:
+                raise RuntimeError("boom")
+            complete(task_id, params)
+
+        Worker(queue, handler=handler, concurrency=2, poll_interval=0.01).run(stop_when_idle=True)
+
+        db = queue.session_factory()
+        statuses = {task.id: (task.status, task.attempts) for task in db.query(ScrapeTask).all()}
+        db.close()
+        assert statuses[stalled] == ("completed", 2)
+        assert statuses[exhausted] == ("failed", 2)
+        assert statuses[crashing] == ("failed", 1)
+
+def test_lost_lease_abandons_the_task():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(os.path.join(tmp, "queue.db"))
+        task_id = queue.enqueue("https://slow.example.com", {}).id
+        abandoned = threading.Event()
+
+        def handler(task_id, params):
+            # Another worker takes the task over, as requeue_stalled would after a long pause.
+            db = queue.session_factory()
+            db.get(ScrapeTask, task_id).worker_id = "other"
+            db.commit()
+            db.close()
+            assert abandoned.wait(5)
+
+        worker = Worker(
+            queue, handler=handler, abandon=lambda task_id: abandoned.set(), worker_id="w1",
+            poll_interval=0.01, heartbeat_interval=0.05,
+        )
+        worker.run(stop_when_idle=True)
+        assert abandoned.is_set()
+
+        # The final status is only written by the worker that still owns the task.
+        db = queue.session_factory()
+        assert not _settle(db, task_id, "w1", status="completed")
+        assert _settle(db, task_id, "other", status="completed")
+        task = db.get(ScrapeTask, task_id)
+        assert (task.status, task.worker_id) == ("completed", "other")
+        db.close()
+        print("🫱 A worker that lost its lease stopped and left the new owner's task alone")
+
+if __name__ == "__main__":
+    test_workers_share_one_queue_without_double_claims()
+    test_worker_respects_concurrency()
+    test_stalled_tasks_are_requeued_and_crashes_fail()
+    test_lost_lease_abandons_the_task()
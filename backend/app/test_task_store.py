@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.conftest import make_session_factory
+from app.models import ScrapeTask
+from app.task_store import cache_totals, get_task, list_tasks, parse_fields, pool_totals, render_totals, task_counts
+
+STATUSES = ["queued", "running", "completed", "failed"]
+START = datetime(2026, 1, 1)
+
+def populate(db_path, count):
+    session_factory = make_session_factory(db_path)
+    db = session_factory()
+    db.add_all(
+        ScrapeTask(
+            url=f"https://{'shop' if i % 3 == 0 else 'blog'}{i}.example.com",
+            status=STATUSES[i % 4],
+            created_at=START + timedelta(hours=i),
+            params={"url": "x", "padding": "p" * 500},
+        )
+        for i in range(count)
+    )
+    db.commit()
+    db.close()
+    return session_factory
+
+def test_keyset_pages_filters_and_projection():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = populate(os.path.join(tmp, "tasks.db"), 230)
+
+        seen, cursor = [], None
+        while True:
+            tasks, cursor = list_tasks(cursor=cursor, limit=50, session_factory=session_factory)
+            seen.extend(task["id"] for task in tasks)
+            if cursor is None:
+                break
+        assert seen == list(range(230, 0, -1))
+        assert "params" not in tasks[0]
+
+        failed, _ = list_tasks(["id", "status"], status=["failed"], limit=500, session_factory=session_factory)
+        assert {task["status"] for task in failed} == {"failed"} and len(failed) == 57
+        assert set(failed[0]) == {"id", "status"}
+
+        shops, _ = list_tasks(["url"], url="shop", created_after=START + timedelta(hours=100),
+                              created_before=START + timedelta(hours=130), limit=500, session_factory=session_factory)
+        assert shops == [{"url": f"https://shop{i}.example.com"} for i in range(129, 99, -1) if i % 3 == 0]
+
+        assert get_task(5, parse_fields("id,status"), session_factory) == {"id": 5, "status": "queued"}
+        assert task_counts(session_factory) == {"total": 230, "by_status": {s: 58 if s in ("queued", "running") else 57 for s in STATUSES}}
+
+def test_status_poll_payload_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = populate(os.path.join(tmp, "tasks.db"), 20_000)
+        db = session_factory()
+        started = time.perf_counter()
+        everything = json.dumps([{c.name: str(getattr(t, c.name)) for c in ScrapeTask.__table__.columns} for t in db.query(ScrapeTask).all()])
+        full_ms = (time.perf_counter() - started) * 1000
+        db.close()
+
+        started = time.perf_counter()
+        poll = json.dumps(get_task(19_999, parse_fields("id,status"), session_factory))
+        page = json.dumps(list_tasks(parse_fields("id,status,url,created_at"), limit=50, session_factory=session_factory)[0], default=str)
+        bounded_ms = (time.perf_counter() - started) * 1000
+        print(f"📋 20k tasks: all rows {len(everything) / 1e6:.1f} MB in {full_ms:.0f} ms, "
+              f"status poll {len(poll)} B + first page {len(page) / 1e3:.1f} kB in {bounded_ms:.1f} ms")
+        assert len(poll) < 100 and len(page) < 10_000
+
+def test_cache_totals_sum_finished_tasks():
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = populate(os.path.join(tmp, "tasks.db"), 4)
+        db = session_factory()
+        for task_id, hits, misses in ((1, 3, 1), (2, 0, 4)):
+            db.get(ScrapeTask, task_id).stats = {
+                "fetches": hits + misses, "http_cache": {"hits": hits, "revalidated": 1, "misses": misses, "bytes_saved": 100 * hits},
+                "pool": {"requests": misses + 1, "connection_hits": misses, "new_connections": 1, "bytes_received": 10},
+                "render": {"memory_hits": hits, "memory_misses": 1, "renders": 1, "useful_renders": task_id - 1},
+            }
+        db.get(ScrapeTask, 3).stats = {"fetches": 0}
+        db.commit()
+        db.close()
+        assert cache_totals(session_factory) == {
+            "requests": 10, "hits": 3, "revalidated": 2, "misses": 5, "hit_ratio": 0.5, "bytes_saved": 300, "tasks": 2,
+        }
+        pool = pool_totals(session_factory)
+        assert (pool["requests"], pool["connection_hits"], pool["new_connections"], pool["reuse_ratio"], pool["tasks"]) == (7, 5, 2, 0.714, 2)
+        render = render_totals(session_factory)
+        assert (render["memory_hits"], render["memory_hit_rate"], render["renders"], render["useful_renders"], render["tasks"]) == (3, 0.6, 2, 1, 2)
+
+if __name__ == "__main__":
+    test_keyset_pages_filters_and_projection()
+    test_status_poll_payload_is_bounded()
+    test_cache_totals_sum_finished_tasks()
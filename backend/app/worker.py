@@ -0,0 +1,194 @@
+# python -m app.worker --concurrency 2
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Set
+
+from loguru import logger
+
+from app.config import (
+    SCRAPER_EVENT_RETENTION,
+    SCRAPER_HEARTBEAT_INTERVAL,
+    SCRAPER_QUEUE_POLL_INTERVAL,
+    SCRAPER_WORKER_CONCURRENCY,
+)
+from app.database import init_db
+from app.events import prune_events
+from app.reports import ReportQueue
+from app.task_queue import TaskQueue, task_queue
+
+# Seconds between deletions of old task events; any worker may run them.
+EVENT_PRUNE_INTERVAL = 300
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def _run_scraper(task_id, params):
+    from app.scraper.engine import run_scraper
+
+    run_scraper(task_id, params)
+
+def _abandon_scraper(task_id):
+    from app.scraper.engine import abandon_scrape
+
+    abandon_scrape(task_id)
+
+class Worker:
+    """Claims tasks from the queue and runs up to ``concurrency`` of them at once.
+
+    A separate thread generates the PDF reports of finished tasks, so report
+    rendering never holds a task slot. When a heartbeat finds a task was
+    requeued to another worker, ``abandon`` tells its handler to stop.
+    """
+
+    def __init__(
+        self,
+        queue: TaskQueue = task_queue,
+        handler: Callable[[int, dict], None] = _run_scraper,
+        abandon: Callable[[int], None] = _abandon_scraper,
+        concurrency: int = SCRAPER_WORKER_CONCURRENCY,
+        worker_id: str = None,
+        poll_interval: float = SCRAPER_QUEUE_POLL_INTERVAL,
+        heartbeat_interval: float = SCRAPER_HEARTBEAT_INTERVAL,
+        generate_reports: bool = True,
+        event_retention: float = SCRAPER_EVENT_RETENTION,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.abandon = abandon
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.event_retention = event_retention
+        self._pruned_at: Optional[float] = None
+        self.reports: Optional[ReportQueue] = ReportQueue(queue.session_factory) if generate_reports else None
+        self.active: Set[int] = set()
+        self.lost: Set[int] = set()
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._stopping = threading.Event()
+        self._drained = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _execute(self, task_id, params):
+        try:
+            self.handler(task_id, params)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} task {task_id} crashed: {str(e)}")
+        finally:
+            # Anything the handler left as running did not finish properly.
+            self.queue.finish(task_id, self.worker_id)
+            with self._lock:
+                self.active.discard(task_id)
+                self.lost.discard(task_id)
+                self.processed += 1
+            self._slots.release()
+
+    def _heartbeat_loop(self):
+        while not self._drained.wait(self.heartbeat_interval):
+            self._beat()
+
+    def _beat(self):
+        with self._lock:
+            task_ids = list(self.active - self.lost)
+        try:
+            lost = self.queue.heartbeat(self.worker_id, task_ids)
+            for task_id in lost:
+                logger.warning(f"Worker {self.worker_id} lost task {task_id} to another worker, abandoning it")
+                with self._lock:
+                    self.lost.add(task_id)
+                self.abandon(task_id)
+            self.queue.requeue_stalled()
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} heartbeat failed: {str(e)}")
+        if self.event_retention > 0 and (self._pruned_at is None or time.monotonic() - self._pruned_at >= EVENT_PRUNE_INTERVAL):
+            self._pruned_at = time.monotonic()
+            try:
+                deleted = prune_events(self.event_retention, self.queue.session_factory)
+                if deleted:
+                    logger.info(f"Worker {self.worker_id} pruned {deleted} events of finished tasks")
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} could not prune task events: {str(e)}")
+
+    def _report_loop(self):
+        while not self._stopping.is_set():
+            try:
+                task_id = self.reports.claim()
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} could not claim a report: {str(e)}")
+                task_id = None
+            if task_id is None:
+                if self._drained.wait(self.poll_interval):
+                    return
+                continue
+            logger.info(f"Worker {self.worker_id} generating the report of task {task_id}")
+            self.reports.generate(task_id)
+
+    def _reports_pending(self) -> bool:
+        return self.reports is not None and self.reports.pending_count() > 0
+
+    def run(self, stop_when_idle: bool = False):
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        self.queue.requeue_stalled()
+        beats = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        beats.start()
+        reporter = None
+        if self.reports is not None:
+            reporter = threading.Thread(target=self._report_loop, daemon=True)
+            reporter.start()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="task")
+        try:
+            while not self._stopping.is_set():
+                if not self._slots.acquire(timeout=self.poll_interval):
+                    continue
+                task = self.queue.claim(self.worker_id)
+                if task is None:
+                    self._slots.release()
+                    with self._lock:
+                        idle = not self.active
+                    if stop_when_idle and idle and not self._reports_pending():
+                        break
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                logger.info(f"Worker {self.worker_id} claimed task {task.id} (attempt {task.attempts})")
+                params = dict(task.params or {"url": task.url})
+                with self._lock:
+                    self.active.add(task.id)
+                executor.submit(self._execute, task.id, params)
+        finally:
+            # Let running tasks finish (still heartbeating); queued work stays for other workers.
+            executor.shutdown(wait=True)
+            self._drained.set()
+            beats.join()
+            if reporter is not None:
+                reporter.join()
+            logger.info(f"Worker {self.worker_id} stopped after {self.processed} tasks")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scrape tasks from the durable queue")
+    parser.add_argument("--concurrency", type=int, default=SCRAPER_WORKER_CONCURRENCY)
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--exit-when-idle", action="store_true")
+    parser.add_argument("--no-reports", action="store_true", help="leave PDF reports to other workers")
+    args = parser.parse_args()
+
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    init_db()
+    worker = Worker(concurrency=args.concurrency, worker_id=args.worker_id, generate_reports=not args.no_reports)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+    worker.run(stop_when_idle=args.exit_when_idle)
+
+if __name__ == "__main__":
+    main()
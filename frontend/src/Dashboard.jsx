@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useCallback } from "react";
 import ScrapeForm from "./ScrapeForm";
 import ResultsTable from "./ResultsTable";
 import TaskStatus from "./TaskStatus";
@@ -7,41 +7,44 @@ import api from "./api";
 export default function Dashboard() {
   const [taskId, setTaskId] = useState(null);
   const [results, setResults] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [fetching, setFetching] = useState(false);
-  const [taskStatus, setTaskStatus] = useState('');
+
+  const loadResults = async (cursor = null) => {
+    const resultsRes = await api.get(`/result/${taskId}`, {
+      params: cursor === null ? {} : { cursor }
+    });
+    if (resultsRes.data && resultsRes.data.data) {
+      setResults(prev => cursor === null ? resultsRes.data.data : [...prev, ...resultsRes.data.data]);
+      setTotal(resultsRes.data.total);
+      setNextCursor(resultsRes.data.next_cursor);
+      return true;
+    }
+    return false;
+  };
 
   useEffect(() => {
     if (!taskId) return;
     setResults([]);
+    setTotal(0);
+    setNextCursor(null);
     setFetching(true);
-    
-    let interval = setInterval(async () => {
+  }, [taskId]);
+
+  // TaskStatus reports the final status pushed by the server, so nothing polls here.
+  const handleComplete = useCallback(async (status) => {
+    if (status === 'completed') {
       try {
-        const tasksRes = await api.get('/tasks');
-        const currentTask = tasksRes.data.find(t => t.id === taskId);
-        
-        if (currentTask) {
-          setTaskStatus(currentTask.status);
-          
-          if (currentTask.status === 'completed') {
-            const resultsRes = await api.get(`/result/${taskId}`);
-            if (resultsRes.data && resultsRes.data.data) {
-              setResults(resultsRes.data.data);
-              setFetching(false);
-              clearInterval(interval);
-            }
-          } else if (currentTask.status === 'failed') {
-            setFetching(false);
-            clearInterval(interval);
-            alert('Scraping task failed. Please try again.');
-          }
-        }
+        await loadResults();
       } catch (error) {
-        console.error('Error checking task status:', error);
+        console.error('Error loading results:', error);
       }
-    }, 2000);
-    
-    return () => clearInterval(interval);
+      setFetching(false);
+    } else {
+      setFetching(false);
+      alert('Scraping task failed. Please try again.');
+    }
   }, [taskId]);
 
   return (
@@ -59,7 +62,7 @@ export default function Dashboard() {
         {taskId && (
           <TaskStatus 
             taskId={taskId} 
-            onComplete={() => setFetching(false)} 
+            onComplete={handleComplete}
           />
         )}
         
@@ -70,7 +73,12 @@ export default function Dashboard() {
           </div>
         )}
         
-        <ResultsTable data={results} taskId={taskId} />
+        <ResultsTable
+          data={results}
+          total={total}
+          taskId={taskId}
+          onLoadMore={nextCursor !== null ? () => loadResults(nextCursor) : null}
+        />
       </div>
     </div>
   );
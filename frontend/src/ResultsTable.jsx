@@ -2,7 +2,7 @@
 import { useState } from "react";
 import api from "./api";
 
-export default function ResultsTable({ data, taskId }) {
+export default function ResultsTable({ data, total, taskId, onLoadMore }) {
   const [downloading, setDownloading] = useState(false);
 
   const downloadPDF = async () => {
@@ -14,12 +14,21 @@ export default function ResultsTable({ data, taskId }) {
         responseType: 'blob'
       });
 
-      const pdfBlob = new Blob([response.data], { type: 'application/pdf' });
-      const url = window.URL.createObjectURL(pdfBlob);
+      // 202: the report is rendered after the task completes and is not ready yet.
+      if (response.status === 202) {
+        alert('The PDF report is still being generated. Please try again in a few seconds.');
+        return;
+      }
+
+      // Reports with several parts arrive as one zip file.
+      const contentType = response.headers['content-type'] || 'application/pdf';
+      const extension = contentType.includes('zip') ? 'zip' : 'pdf';
+      const fileBlob = new Blob([response.data], { type: contentType });
+      const url = window.URL.createObjectURL(fileBlob);
 
       const link = document.createElement('a');
       link.href = url;
-      link.download = `scraping_report_${taskId}.pdf`;
+      link.download = `scraping_report_${taskId}.${extension}`;
       document.body.appendChild(link);
       link.click();
 
@@ -45,7 +54,7 @@ export default function ResultsTable({ data, taskId }) {
   return (
     <div className="results-section">
       <div className="results-header">
-        <h2>Scraping Results ({data.length} sites)</h2>
+        <h2>Scraping Results ({total || data.length} sites)</h2>
         <button 
           className="download-btn" 
           onClick={downloadPDF}
@@ -144,6 +153,12 @@ export default function ResultsTable({ data, taskId }) {
           </tbody>
         </table>
       </div>
+
+      {onLoadMore && (
+        <button className="download-btn load-more-btn" onClick={onLoadMore}>
+          Load more ({data.length} of {total})
+        </button>
+      )}
     </div>
   );
 }
\ No newline at end of file
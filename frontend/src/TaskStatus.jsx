@@ -1,25 +1,37 @@
 import { useEffect, useState } from "react";
-import api from "./api";
+import { taskEventsUrl } from "./api";
 
 export default function TaskStatus({ taskId, onComplete }) {
   const [status, setStatus] = useState("queued");
+  const [progress, setProgress] = useState({ urls: 0, pages: 0, records: 0 });
 
   useEffect(() => {
     if (!taskId) return;
-    let interval = setInterval(async () => {
-      try {
-        const res = await api.get(`/tasks`);
-        const task = res.data.find(t => t.id === taskId);
-        if (task) {
-          setStatus(task.status);
-          if (task.status === "completed") {
-            clearInterval(interval);
-            onComplete();
-          }
-        }
-      } catch {}
-    }, 1200);
-    return () => clearInterval(interval);
+    setStatus("queued");
+    setProgress({ urls: 0, pages: 0, records: 0 });
+
+    // One subscription instead of polling; the server closes it after the final status.
+    const source = new EventSource(taskEventsUrl(taskId));
+    source.addEventListener("discovered", (e) => {
+      const data = JSON.parse(e.data);
+      setProgress(p => ({ ...p, urls: data.urls }));
+    });
+    source.addEventListener("page", () => {
+      setProgress(p => ({ ...p, pages: p.pages + 1 }));
+    });
+    source.addEventListener("records", (e) => {
+      const data = JSON.parse(e.data);
+      setProgress(p => ({ ...p, records: data.count }));
+    });
+    source.addEventListener("status", (e) => {
+      const data = JSON.parse(e.data);
+      setStatus(data.status);
+      if (data.status === "completed" || data.status === "failed") {
+        source.close();
+        onComplete(data.status);
+      }
+    });
+    return () => source.close();
   }, [taskId, onComplete]);
 
   return (
@@ -28,7 +40,13 @@ export default function TaskStatus({ taskId, onComplete }) {
         {status === "queued" && "Queued"}
         {status === "running" && "Scraping..."}
         {status === "completed" && "Done!"}
+        {status === "failed" && "Failed"}
       </span>
+      {status === "running" && (
+        <span className="task-progress">
+          {progress.pages}/{progress.urls} pages, {progress.records} records
+        </span>
+      )}
     </div>
   );
-}
\ No newline at end of file
+}
@@ -1,3 +1,7 @@
 import axios from "axios";
 const api = axios.create({ baseURL: "http://localhost:8000" });
-export default api;
\ No newline at end of file
+
+// Server-Sent Events stream with a task's progress; see GET /tasks/{id}/events.
+export const taskEventsUrl = (taskId) => `${api.defaults.baseURL}/tasks/${taskId}/events`;
+
+export default api;